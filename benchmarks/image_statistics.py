@@ -0,0 +1,43 @@
+"""
+Compares the single-pass CASA image statistics against two imstat calls in speed and result.
+
+Usage: python image_statistics.py <restored image> <residual image> [pixels]
+
+The images are CASA images, e.g. the .image and .residual products of tclean.
+"""
+import sys
+import time
+
+import numpy as np
+from casatasks import imstat
+
+from snow.utils import calculate_psnr_ms
+
+if __name__ == '__main__':
+    signal_ms_name = sys.argv[1].rstrip("/")
+    residual_ms_name = sys.argv[2].rstrip("/")
+    pixels = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    box = ""
+    if pixels is not None:
+        box = "0,0," + str(pixels - 1) + "," + str(pixels - 1)
+
+    start = time.perf_counter()
+    imstat_peak = imstat(signal_ms_name, box=box)["max"][0]
+    imstat_rms = imstat(residual_ms_name, box=box)["rms"][0]
+    imstat_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    psnr, peak, stdv = calculate_psnr_ms(signal_ms_name, residual_ms_name, pixels)
+    native_time = time.perf_counter() - start
+
+    print("imstat: {0:0.3f} s".format(imstat_time))
+    print(
+        "single pass: {0:0.3f} s (speed-up {1:0.1f}x)".format(
+            native_time, imstat_time / native_time
+        )
+    )
+    print("Peak: {0:0.6e} imstat, {1:0.6e} single pass".format(imstat_peak, peak))
+    print("RMS: {0:0.6e} imstat, {1:0.6e} single pass".format(imstat_rms, stdv))
+    if not np.isclose(peak, imstat_peak, rtol=1e-6) or not np.isclose(stdv, imstat_rms, rtol=1e-5):
+        sys.exit("The single-pass statistics do not match imstat")
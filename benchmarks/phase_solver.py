@@ -0,0 +1,98 @@
+"""
+Compares the native phase-only solver against casatasks.gaincal in speed and agreement.
+
+Usage: python phase_solver.py <visfile> <solint> <refant> [gaintype] [combine]
+
+The measurement set needs a MODEL_DATA column.
+"""
+import sys
+import time
+
+import numpy as np
+from casatasks import gaincal, rmtables
+from casatools import table
+
+from snow.selfcalibration.phase_solver import native_gaincal
+
+tb = table()
+
+
+def read_solutions(caltable):
+    tb.open(tablename=caltable)
+    keys = zip(
+        np.round(tb.getcol("TIME"), 1), tb.getcol("SPECTRAL_WINDOW_ID"), tb.getcol("ANTENNA1")
+    )
+    cparam = tb.getcol("CPARAM")[:, 0, :]
+    flag = tb.getcol("FLAG")[:, 0, :]
+    tb.close()
+    return {key: (cparam[:, row], flag[:, row]) for row, key in enumerate(keys)}
+
+
+if __name__ == '__main__':
+    visfile = sys.argv[1]
+    solint = sys.argv[2]
+    refant = sys.argv[3]
+    gaintype = sys.argv[4] if len(sys.argv) > 4 else "T"
+    combine = sys.argv[5] if len(sys.argv) > 5 else ""
+
+    gaincal_table = "bench_gaincal.pcal"
+    native_table = "bench_native.pcal"
+    rmtables([gaincal_table, native_table])
+
+    start = time.perf_counter()
+    gaincal(
+        vis=visfile,
+        caltable=gaincal_table,
+        gaintype=gaintype,
+        calmode="p",
+        solint=solint,
+        refant=refant,
+        combine=combine,
+        minsnr=3.0,
+        minblperant=4
+    )
+    gaincal_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    native_gaincal(
+        vis=visfile,
+        caltable=native_table,
+        gaintype=gaintype,
+        solint=solint,
+        refant=refant,
+        combine=combine,
+        minsnr=3.0,
+        minblperant=4
+    )
+    native_time = time.perf_counter() - start
+
+    gaincal_solutions = read_solutions(gaincal_table)
+    native_solutions = read_solutions(native_table)
+    common = sorted(set(gaincal_solutions) & set(native_solutions))
+    phase_differences = []
+    flag_agreement = []
+    for key in common:
+        gaincal_gain, gaincal_flag = gaincal_solutions[key]
+        native_gain, native_flag = native_solutions[key]
+        valid = ~gaincal_flag & ~native_flag
+        phase_differences.extend(
+            np.angle(native_gain[valid] * np.conj(gaincal_gain[valid]), deg=True)
+        )
+        flag_agreement.extend(gaincal_flag == native_flag)
+
+    print("gaincal: {0:0.3f} s".format(gaincal_time))
+    print("native: {0:0.3f} s (speed-up {1:0.1f}x)".format(native_time, gaincal_time / native_time))
+    print(
+        "Matched solutions: {0} of {1} gaincal and {2} native".format(
+            len(common), len(gaincal_solutions), len(native_solutions)
+        )
+    )
+    if phase_differences:
+        phase_differences = np.abs(phase_differences)
+        print(
+            "Phase difference: median {0:0.3f} deg, 95th percentile {1:0.3f} deg".format(
+                np.median(phase_differences), np.percentile(phase_differences, 95)
+            )
+        )
+    if flag_agreement:
+        print("Flag agreement: {0:0.2f} %".format(100.0 * np.mean(flag_agreement)))
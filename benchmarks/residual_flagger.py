@@ -0,0 +1,101 @@
+"""
+Compares the native residual flagger against flagdata in rflag mode in speed and flag agreement.
+
+Usage: python residual_flagger.py <visfile> [datacolumn] [timedevscale] [freqdevscale] [workers]
+
+The measurement set needs a MODEL_DATA column. It is not modified: each flagger runs on its own copy.
+"""
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+from casatasks import flagdata
+from casatools import table
+
+from snow.selfcalibration.residual_flagger import native_flagdata
+
+tb = table()
+
+
+def read_flags(vis):
+    tb.open(tablename=vis)
+    flag = tb.getcol("FLAG")
+    tb.close()
+    return flag
+
+
+if __name__ == '__main__':
+    visfile = sys.argv[1].rstrip("/")
+    datacolumn = sys.argv[2] if len(sys.argv) > 2 else "residual_data"
+    timedevscale = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+    freqdevscale = float(sys.argv[4]) if len(sys.argv) > 4 else 3.0
+    workers = int(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    rflag_vis = visfile + ".bench_rflag"
+    native_vis = visfile + ".bench_native"
+    for vis in (rflag_vis, native_vis):
+        if os.path.exists(vis):
+            shutil.rmtree(vis)
+        shutil.copytree(visfile, vis, symlinks=True)
+    initial_flags = read_flags(visfile)
+
+    start = time.perf_counter()
+    flagdata(
+        vis=rflag_vis,
+        mode="rflag",
+        datacolumn=datacolumn,
+        timecutoff=5.0,
+        freqcutoff=5.0,
+        freqfit='line',
+        flagdimension='freq',
+        extendflags=False,
+        timedevscale=timedevscale,
+        freqdevscale=freqdevscale,
+        spectralmax=500,
+        extendpols=False,
+        growaround=False,
+        flagneartime=False,
+        flagnearfreq=False,
+        ntime="scan",
+        action='apply',
+        flagbackup=False,
+        overwrite=True,
+        writeflags=True
+    )
+    rflag_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    native_flagdata(
+        vis=native_vis,
+        datacolumn=datacolumn,
+        timedevscale=timedevscale,
+        freqdevscale=freqdevscale,
+        workers=workers
+    )
+    native_time = time.perf_counter() - start
+
+    rflag_new = read_flags(rflag_vis) & ~initial_flags
+    native_new = read_flags(native_vis) & ~initial_flags
+    unflagged = ~initial_flags
+    both = np.count_nonzero(rflag_new & native_new)
+    either = np.count_nonzero(rflag_new | native_new)
+
+    print("rflag: {0:0.3f} s".format(rflag_time))
+    print("native: {0:0.3f} s (speed-up {1:0.1f}x)".format(native_time, rflag_time / native_time))
+    print(
+        "Newly flagged: {0:0.3f} % rflag, {1:0.3f} % native".format(
+            100.0 * np.count_nonzero(rflag_new) / max(np.count_nonzero(unflagged), 1),
+            100.0 * np.count_nonzero(native_new) / max(np.count_nonzero(unflagged), 1)
+        )
+    )
+    print(
+        "Flag agreement: {0:0.2f} % of the samples, intersection over union {1:0.3f}".format(
+            100.0 * np.mean(rflag_new[unflagged] == native_new[unflagged]),
+            both / either if either > 0 else 1.0
+        )
+    )
+
+    for vis in (rflag_vis, native_vis):
+        shutil.rmtree(vis)
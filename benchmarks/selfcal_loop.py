@@ -0,0 +1,182 @@
+"""
+Times the Phasecal, Ampcal and AmpPhasecal loops with a Tclean imager on synthetic measurement sets.
+
+Every run reports the wall time of each self-calibration object, the time spent on each stage (gain solving,
+calibration, flagging, flag backups, measurement set copies, imaging and statistics) and the PSNR before and after
+self-calibration. With --sweep the number of integrations is multiplied by each factor and the scaling exponent of
+every stage with the number of visibilities is fitted, so super-linear stages stand out. Only CPUs are needed.
+
+With --parallel the working measurement set is partitioned into a multi-MS. Launch the script with
+mpirun -n N python selfcal_loop.py --parallel ... (or mpicasa) and compare the applycal and imager_run stages for
+different N to measure the MPI scaling.
+
+Usage: python selfcal_loop.py --workdir /tmp/snow_bench [--antennas 27] [--times 60] [--channels 8]
+                              [--sweep 1,2,4,8] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from snow.imaging import Tclean
+from snow.selfcalibration import Ampcal, AmpPhasecal, Phasecal
+from snow.utils import tracer
+from synthetic_ms import antenna_names, simulate_ms
+
+
+def run_loop(visfile, workdir, args):
+    """
+    Runs phase, amplitude and amplitude-phase self-calibration on a measurement set
+
+    Returns
+    -------
+    A list with the timings and PSNR of each self-calibration object
+    """
+    imager = Tclean(
+        inputvis=visfile,
+        output=os.path.join(workdir, "bench"),
+        cell="1arcsec",
+        M=args.imsize,
+        N=args.imsize,
+        niter=args.niter,
+        robust=0.5,
+        specmode="mfs",
+        use_mask="user",
+        verbose=False
+    )
+    shared = {
+        "imager": imager,
+        "refant": antenna_names(args.antennas)[0],
+        "minblperant": 4,
+        "gaintype": "T",
+        "want_plot": False,
+        "minsnr": 3.0,
+        "parallel": args.parallel
+    }
+    results = []
+    previous = None
+    for selfcal_class, solint in (
+        (Phasecal, args.phase_solint.split(",")), (Ampcal, args.amp_solint.split(",")),
+        (AmpPhasecal, args.ap_solint.split(","))
+    ):
+        tracer.reset()
+        start = time.perf_counter()
+        selfcal = selfcal_class(
+            visfile=visfile if previous is None else previous.visfile,
+            solint=solint,
+            previous_selfcal=previous,
+            **shared
+        )
+        selfcal.run()
+        wall_time = time.perf_counter() - start
+        results.append(
+            {
+                "selfcal": selfcal_class.__name__,
+                "wall_time_s": wall_time,
+                "psnr_start": selfcal._psnr_history[0],
+                "psnr_end": selfcal._psnr_history[-1],
+                "stages": tracer.summary()
+            }
+        )
+        previous = selfcal
+    return results
+
+
+def print_results(results, nvis):
+    print("Visibilities: {0}".format(nvis))
+    for result in results:
+        print(
+            "  {0}: {1:0.2f} s - PSNR {2:0.2f} -> {3:0.2f}".format(
+                result["selfcal"], result["wall_time_s"], result["psnr_start"], result["psnr_end"]
+            )
+        )
+        for stage, summary in sorted(
+            result["stages"].items(), key=lambda item: -item[1]["wall_time_s"]
+        ):
+            print(
+                "    {0:<20} {1:>4} calls {2:>9.2f} s wall {3:>9.2f} s cpu {4:>9.1f} MB read {5:>9.1f} MB written"
+                .format(
+                    stage, summary["calls"], summary["wall_time_s"], summary["cpu_time_s"],
+                    summary["read_bytes"] / 1e6, summary["write_bytes"] / 1e6
+                )
+            )
+
+
+def print_scaling(sweep):
+    """
+    Fits wall_time ~ nvis^exponent for every self-calibration object and stage
+    """
+    nvis = np.array([point["nvis"] for point in sweep], dtype=float)
+    timings = {}
+    for point in sweep:
+        for result in point["results"]:
+            timings.setdefault((result["selfcal"], "total"), []).append(result["wall_time_s"])
+            for stage, summary in result["stages"].items():
+                timings.setdefault((result["selfcal"], stage), []).append(summary["wall_time_s"])
+    print("Scaling exponents (wall time ~ visibilities^exponent):")
+    for (selfcal, stage), values in sorted(timings.items()):
+        if len(values) != nvis.size or np.any(np.array(values) <= 0.0):
+            continue
+        exponent = np.polyfit(np.log(nvis), np.log(values), 1)[0]
+        print(
+            "  {0:<12} {1:<20} {2:0.2f}{3}".format(
+                selfcal, stage, exponent, " super-linear" if exponent > 1.1 else ""
+            )
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workdir", required=True)
+    parser.add_argument("--antennas", type=int, default=27)
+    parser.add_argument("--times", type=int, default=60)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--integration", type=float, default=10.0)
+    parser.add_argument("--phase-rms", type=float, default=30.0)
+    parser.add_argument("--amplitude-rms", type=float, default=0.1)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--imsize", type=int, default=256)
+    parser.add_argument("--niter", type=int, default=200)
+    parser.add_argument("--phase-solint", default="inf,120s,60s")
+    parser.add_argument("--amp-solint", default="inf")
+    parser.add_argument("--ap-solint", default="inf")
+    parser.add_argument(
+        "--parallel", action="store_true", help="Partition the data into a multi-MS"
+    )
+    parser.add_argument("--sweep", default="1", help="Comma separated factors applied to --times")
+    parser.add_argument("--output", default=None, help="JSON file where the results are written")
+    args = parser.parse_args()
+
+    sweep = []
+    for factor in [int(factor) for factor in args.sweep.split(",")]:
+        workdir = os.path.join(args.workdir, "times{0}".format(args.times * factor))
+        if os.path.exists(workdir):
+            shutil.rmtree(workdir)
+        os.makedirs(workdir)
+        visfile = simulate_ms(
+            os.path.join(workdir, "synthetic.ms"),
+            nantennas=args.antennas,
+            ntimes=args.times * factor,
+            nchannels=args.channels,
+            integration=args.integration,
+            phase_rms=args.phase_rms,
+            amplitude_rms=args.amplitude_rms,
+            noise=args.noise,
+            seed=args.seed
+        )
+        nbaselines = args.antennas * (args.antennas - 1) // 2
+        nvis = nbaselines * args.times * factor * args.channels
+        results = run_loop(visfile, workdir, args)
+        print_results(results, nvis)
+        sweep.append({"factor": factor, "nvis": nvis, "results": results})
+
+    if len(sweep) > 1:
+        print_scaling(sweep)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(sweep, f, indent=2)
@@ -0,0 +1,180 @@
+"""
+Generates reproducible synthetic measurement sets with the casatools simulator.
+
+The sky is a 1 Jy point source at the phase center plus a 0.3 Jy point source 20 arcsec away, observed by a random
+array of 25 m dishes at 5 GHz. Antenna-based phase and amplitude errors and thermal noise are injected with a seeded
+random number generator, so the same arguments always produce the same visibilities.
+
+Usage: python synthetic_ms.py <visfile> [nantennas] [ntimes] [nchannels]
+"""
+import os
+import shutil
+import sys
+
+import numpy as np
+from casatools import componentlist, measures, simulator, table
+
+PHASE_CENTER = ("J2000", "12h00m00.0s", "+40d00m00.0s")
+FREQUENCY = "5.0GHz"
+
+
+def antenna_names(nantennas=27):
+    return ["A{0:02d}".format(k) for k in range(nantennas)]
+
+
+def _create_component_list(path):
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    cl = componentlist()
+    cl.addcomponent(
+        dir=" ".join(PHASE_CENTER), flux=1.0, fluxunit="Jy", freq=FREQUENCY, shape="point"
+    )
+    cl.addcomponent(
+        dir="J2000 12h00m00.0s +40d00m20.0s",
+        flux=0.3,
+        fluxunit="Jy",
+        freq=FREQUENCY,
+        shape="point"
+    )
+    cl.rename(path)
+    cl.close()
+    return path
+
+
+def _corrupt(vis, phase_rms, amplitude_rms, noise, rng):
+    tb = table()
+    tb.open(tablename=vis, nomodify=False)
+    for column in ("MODEL_DATA", "CORRECTED_DATA"):
+        if column in tb.colnames():
+            tb.removecols(column)
+    time = tb.getcol("TIME")
+    antenna1 = tb.getcol("ANTENNA1")
+    antenna2 = tb.getcol("ANTENNA2")
+    data = tb.getcol("DATA")
+
+    nantennas = max(antenna1.max(), antenna2.max()) + 1
+    unique_times, time_index = np.unique(time, return_inverse=True)
+    # Phases are a constant offset plus a random walk, amplitudes a constant offset plus a slow drift
+    steps = rng.normal(0.0, 1.0, (nantennas, unique_times.size))
+    walk = np.cumsum(steps, axis=1) / np.sqrt(unique_times.size)
+    phase = np.deg2rad(phase_rms) * (rng.normal(0.0, 1.0, (nantennas, 1)) + walk)
+    amplitude = 1.0 + amplitude_rms * (
+        rng.normal(0.0, 1.0, (nantennas, 1)) + 0.5 * np.sin(
+            np.linspace(0.0, np.pi, unique_times.size)[None, :] +
+            rng.uniform(0.0, 2.0 * np.pi, (nantennas, 1))
+        )
+    )
+    gains = np.clip(amplitude, 0.05, None) * np.exp(1j * phase)
+
+    corruption = gains[antenna1, time_index] * np.conj(gains[antenna2, time_index])
+    thermal = noise / np.sqrt(2.0) * (
+        rng.normal(0.0, 1.0, data.shape) + 1j * rng.normal(0.0, 1.0, data.shape)
+    )
+    tb.putcol("DATA", (data * corruption[None, None, :] + thermal).astype(data.dtype))
+    tb.flush()
+    tb.close()
+    tb.done()
+
+
+def simulate_ms(
+    vis="synthetic.ms",
+    nantennas=27,
+    ntimes=60,
+    nchannels=8,
+    integration=10.0,
+    max_baseline=3000.0,
+    phase_rms=30.0,
+    amplitude_rms=0.1,
+    noise=0.05,
+    seed=42
+):
+    """
+    Creates a synthetic measurement set
+
+    Parameters
+    ----------
+    vis :
+        Absolute path to the output measurement set. It is overwritten if it exists
+    nantennas :
+        Number of antennas
+    ntimes :
+        Number of integrations
+    nchannels :
+        Number of 16 MHz channels
+    integration :
+        Integration time in seconds
+    max_baseline :
+        Diameter in meters of the area where the antennas are placed
+    phase_rms :
+        RMS of the injected antenna phase errors in degrees
+    amplitude_rms :
+        RMS of the injected antenna amplitude errors
+    noise :
+        Thermal noise per visibility and correlation in Jy
+    seed :
+        Seed of the random number generator
+
+    Returns
+    -------
+    The absolute path to the measurement set
+    """
+    if os.path.exists(vis):
+        shutil.rmtree(vis)
+    rng = np.random.default_rng(seed)
+    radius = 0.5 * max_baseline * np.sqrt(rng.uniform(0.0, 1.0, nantennas))
+    angle = rng.uniform(0.0, 2.0 * np.pi, nantennas)
+    names = antenna_names(nantennas)
+
+    me = measures()
+    sm = simulator()
+    sm.open(vis)
+    sm.setconfig(
+        telescopename="VLA",
+        x=radius * np.cos(angle),
+        y=radius * np.sin(angle),
+        z=np.zeros(nantennas),
+        dishdiameter=[25.0] * nantennas,
+        mount=["alt-az"] * nantennas,
+        antname=names,
+        padname=names,
+        coordsystem="local",
+        referencelocation=me.observatory("VLA")
+    )
+    sm.setspwindow(
+        spwname="SPW0",
+        freq=FREQUENCY,
+        deltafreq="16MHz",
+        freqresolution="16MHz",
+        nchannels=nchannels,
+        stokes="RR LL"
+    )
+    sm.setfeed(mode="perfect R L")
+    sm.setfield(sourcename="synthetic", sourcedirection=me.direction(*PHASE_CENTER))
+    sm.setlimits(shadowlimit=0.001, elevationlimit="8.0deg")
+    sm.setauto(autocorrwt=0.0)
+    sm.settimes(
+        integrationtime="{0}s".format(integration),
+        usehourangle=True,
+        referencetime=me.epoch("UTC", "2020/01/01/00:00:00")
+    )
+    sm.observe(
+        sourcename="synthetic",
+        spwname="SPW0",
+        starttime="0s",
+        stoptime="{0}s".format(ntimes * integration)
+    )
+    sm.predict(complist=_create_component_list(vis + ".cl"))
+    sm.close()
+    me.done()
+    shutil.rmtree(vis + ".cl")
+
+    _corrupt(vis, phase_rms, amplitude_rms, noise, rng)
+    return vis
+
+
+if __name__ == '__main__':
+    visfile = sys.argv[1]
+    nantennas = int(sys.argv[2]) if len(sys.argv) > 2 else 27
+    ntimes = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    nchannels = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    simulate_ms(visfile, nantennas=nantennas, ntimes=ntimes, nchannels=nchannels)
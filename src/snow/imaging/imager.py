@@ -1,12 +1,15 @@
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from dataclasses import field as _field
 
 from typing import Union
 
 from astropy.units import Quantity
 
-from ..utils import (calculate_number_antennas, calculate_psnr_fits, calculate_psnr_ms)
+from ..utils import (
+    ImagingCache, calculate_number_antennas, calculate_psnr_fits, calculate_psnr_ms, parameters_key,
+    tracer
+)
 
 
 @dataclass(init=True, repr=True)
@@ -53,6 +56,17 @@ class Imager(metaclass=ABCMeta):
             Whether to save the model column or not
         verbose :
             Whether to use verbose option for imagers
+        parallel :
+            Whether to run the imager in parallel over the MPI processes started with mpicasa/mpirun (casampi)
+        cache_dir :
+            Absolute path to a directory where imaging results are cached. run_cached() skips the imaging if the
+            measurement set and the imager parameters have not changed since a previous run
+        cache_size :
+            Maximum disk usage of the imaging cache, in bytes or as a string with units, e.g "50GB". The least
+            recently used results are evicted beyond it. Default is None, and it means no bound
+        warm_start :
+            Whether to start the deconvolution from the model of start_model instead of an empty model. The
+            self-calibration sets start_model to the image name of the last accepted iteration. Only Tclean uses it
     """
     inputvis: str = ""
     output: str = ""
@@ -71,6 +85,11 @@ class Imager(metaclass=ABCMeta):
     noise_pixels: int = None
     save_model: bool = True
     verbose: bool = True
+    parallel: bool = False
+    cache_dir: str = None
+    cache_size: Union[int, float, str] = None
+    warm_start: bool = False
+    start_model: str = _field(init=False, default=None)
     psnr: float = _field(init=False, default=0.0)
     peak: float = _field(init=False, default=0.0)
     stdv: float = _field(init=False, default=0.0)
@@ -96,14 +115,15 @@ class Imager(metaclass=ABCMeta):
         stdv_pixels :
             Pixels where to calculate the RMS
         """
-        if stdv_pixels is None:
-            psnr, peak, stdv = calculate_psnr_fits(
-                signal_fits_name, residual_fits_name, self.noise_pixels
-            )
-        else:
-            psnr, peak, stdv = calculate_psnr_fits(
-                signal_fits_name, residual_fits_name, stdv_pixels
-            )
+        with tracer.span("statistics", category="imaging", image=signal_fits_name):
+            if stdv_pixels is None:
+                psnr, peak, stdv = calculate_psnr_fits(
+                    signal_fits_name, residual_fits_name, self.noise_pixels
+                )
+            else:
+                psnr, peak, stdv = calculate_psnr_fits(
+                    signal_fits_name, residual_fits_name, stdv_pixels
+                )
 
         self.psnr = peak / stdv
         self.peak = peak
@@ -124,10 +144,13 @@ class Imager(metaclass=ABCMeta):
         stdv_pixels :
             Pixels where to calculate the RMS
         """
-        if stdv_pixels is None:
-            psnr, peak, stdv = calculate_psnr_ms(
-                signal_ms_name, residual_ms_name, self.noise_pixels
-            )
+        with tracer.span("statistics", category="imaging", image=signal_ms_name):
+            if stdv_pixels is None:
+                psnr, peak, stdv = calculate_psnr_ms(
+                    signal_ms_name, residual_ms_name, self.noise_pixels
+                )
+            else:
+                psnr, peak, stdv = calculate_psnr_ms(signal_ms_name, residual_ms_name, stdv_pixels)
 
         self.psnr = peak / stdv
         self.peak = peak
@@ -148,6 +171,72 @@ class Imager(metaclass=ABCMeta):
                 )
         return aux_reference_freq
 
+    def _cache_parameters(self) -> dict:
+        """
+        Returns the imager parameters that determine the imaging result
+        """
+        excluded = (
+            "inputvis", "output", "verbose", "cache_dir", "cache_size", "psnr", "peak", "stdv",
+            "name", "nantennas"
+        )
+        parameters = {
+            f.name: getattr(self, f.name)
+            for f in fields(self) if f.name not in excluded and not f.name.startswith("_")
+        }
+        parameters["imager"] = type(self).__name__
+        return parameters
+
+    def _parameters_key(self, names: tuple = (), signature: str = "") -> str:
+        """
+        Returns the key shared by the runs with the same values of the given parameters on data with the same
+        signature
+        """
+        return parameters_key({name: getattr(self, name) for name in names}, signature)
+
+    def run_cached(self, imagename=""):
+        """
+        Runs the imager through the imaging cache. If an identical imaging run has been cached, its products, model
+        column and statistics are restored instead of imaging again. Without a cache directory this is the same as
+        calling run().
+
+        Parameters
+        ----------
+        imagename :
+            The absolute path to the output image name
+        """
+        if self.cache_dir is None:
+            with tracer.span("imager_run", category="imaging", imager=type(self).__name__):
+                self.run(imagename)
+            return
+
+        cache = ImagingCache(self.cache_dir, self.cache_size)
+        key = cache.key(self.inputvis, self._cache_parameters())
+        if cache.exists(key):
+            with tracer.span("imager_cache_load", category="imaging", imagename=imagename):
+                statistics = cache.load(key, imagename, self.inputvis)
+            if statistics is not None:
+                print("Restoring cached imaging result for {0}".format(imagename))
+                self.psnr = statistics["psnr"]
+                self.peak = statistics["peak"]
+                self.stdv = statistics["stdv"]
+                return
+
+        previous_products = cache.snapshot_products(imagename)
+        with tracer.span("imager_run", category="imaging", imager=type(self).__name__):
+            self.run(imagename)
+        cache.save(
+            key,
+            imagename,
+            self.inputvis,
+            statistics={
+                "psnr": self.psnr,
+                "peak": self.peak,
+                "stdv": self.stdv
+            },
+            previous_products=previous_products,
+            save_model=self.save_model
+        )
+
     @abstractmethod
     def run(self, imagename=""):
         return
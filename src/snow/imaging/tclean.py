@@ -1,8 +1,22 @@
+import os
+import shutil
+
 from casatasks import tclean
 
 from dataclasses import dataclass, field
+from ..utils import coverage_change, fingerprint_ms, tracer, uv_coverage_signature
 from .imager import Imager
 
+# Image products that depend only on the uv sampling, the weights and the imaging geometry
+PSF_PRODUCTS = (".psf", ".sumwt", ".pb", ".weight")
+
+# Imager parameters that determine the PSF products
+PSF_PARAMETERS = (
+    "cell", "M", "N", "weighting", "robust", "field", "spw", "stokes", "phase_center",
+    "reference_freq", "specmode", "gridder", "wproj_planes", "deconvolver", "nterms", "uvtaper",
+    "uvrange"
+)
+
 
 @dataclass(init=True, repr=True)
 class Tclean(Imager):
@@ -61,6 +75,12 @@ class Tclean(Imager):
             Maximum number of minor-cycle iterations (per plane) before triggering a major cycle
         clean_savemodel :
             Options to save model visibilities (none, virtual, modelcolumn)
+        reuse_psf :
+            Whether to reuse the PSF, sum of weights, primary beam and weight images of the previous run, restarting
+            tclean with calcpsf=False, when the flags and weights have not changed
+        psf_reuse_tolerance :
+            Maximum relative change of the unflagged weights for which the previous PSF is still reused. Zero
+            reuses it only when the flags and weights are identical
         kwargs :
             General imager arguments
     """
@@ -86,6 +106,13 @@ class Tclean(Imager):
     pbcor: bool = False
     cycle_niter: int = 0
     clean_savemodel: str = field(init=False, repr=True, default=None)
+    reuse_psf: bool = False
+    psf_reuse_tolerance: float = 0.0
+    _psf_name: str = field(init=False, repr=False, default=None)
+    _psf_parameters: str = field(init=False, repr=False, default=None)
+    _psf_fingerprint: str = field(init=False, repr=False, default=None)
+    _psf_signature: str = field(init=False, repr=False, default=None)
+    _psf_row_weights: object = field(init=False, repr=False, default=None)
 
     def __post_init__(self):
 
@@ -94,8 +121,96 @@ class Tclean(Imager):
         if self.save_model:
             self.clean_savemodel = "modelcolumn"
 
+        if self.psf_reuse_tolerance < 0.0:
+            raise ValueError("Error, psf_reuse_tolerance cannot be negative")
+
+    @staticmethod
+    def _psf_products(imagename: str = "") -> list:
+        """
+        Returns the existing PSF products of an image name, e.g. the Taylor terms of mtmfs
+        """
+        directory = os.path.dirname(os.path.abspath(imagename))
+        basename = os.path.basename(imagename)
+        return [
+            product[len(basename):] for product in sorted(os.listdir(directory))
+            if product.startswith(basename) and product[len(basename):].startswith(PSF_PRODUCTS)
+        ]
+
+    def _check_psf_reuse(self) -> bool:
+        """
+        Checks whether the PSF products of the previous run can be reused. The storage managers of the flags and
+        weights are fingerprinted first, which only needs their sizes and modification times. If they were written
+        since the previous run, the unflagged weights are read and compared with the ones of the PSF.
+
+        Returns
+        -------
+        True if the previous PSF products are still valid
+        """
+        parameters = self._parameters_key(PSF_PARAMETERS)
+        # Every column but the visibilities
+        ms_fingerprint = fingerprint_ms(
+            self.inputvis, excluded_columns=("DATA", "CORRECTED_DATA", "MODEL_DATA")
+        )
+        if self._psf_name is None or parameters != self._psf_parameters or not self._psf_products(
+            self._psf_name
+        ):
+            signature, row_weights = uv_coverage_signature(self.inputvis)
+            reuse = False
+        elif ms_fingerprint == self._psf_fingerprint:
+            return True
+        else:
+            signature, row_weights = uv_coverage_signature(self.inputvis)
+            if signature == self._psf_signature:
+                reuse = True
+            else:
+                change = coverage_change(self._psf_row_weights, row_weights)
+                reuse = change <= self.psf_reuse_tolerance
+                print("The unflagged weights changed by {0:0.3e}".format(change))
+
+        self._psf_fingerprint = ms_fingerprint
+        # Only a new PSF updates the reference weights, so changes below the tolerance do not accumulate
+        if not reuse:
+            self._psf_parameters = parameters
+            self._psf_signature = signature
+            self._psf_row_weights = row_weights
+        return reuse
+
+    def _start_model_images(self):
+        """
+        Returns the model images of start_model, one per Taylor term for mtmfs, or an empty string if there are
+        none
+        """
+        if not self.warm_start or self.start_model is None:
+            return ""
+        if self.deconvolver == "mtmfs":
+            model_images = [
+                self.start_model + ".model.tt{0}".format(term) for term in range(self.nterms)
+            ]
+        else:
+            model_images = [self.start_model + ".model"]
+        if not all(os.path.exists(model_image) for model_image in model_images):
+            print(
+                "The model of {0} does not exist - Starting from an empty model".format(
+                    self.start_model
+                )
+            )
+            return ""
+        return model_images if len(model_images) > 1 else model_images[0]
+
     def run(self, imagename=""):
         __imsize = [self.M, self.N]
+        start_model = self._start_model_images()
+        calcpsf = True
+        if self.reuse_psf:
+            with tracer.span("psf_reuse_check", category="imaging", vis=self.inputvis):
+                reuse = self._check_psf_reuse()
+            if reuse:
+                # tclean restarts from the products that already exist with the new image name
+                for product in self._psf_products(self._psf_name):
+                    if os.path.exists(imagename + product):
+                        shutil.rmtree(imagename + product)
+                    shutil.copytree(self._psf_name + product, imagename + product, symlinks=True)
+                calcpsf = False
         aux_reference_freq = self._check_reference_frequency()
         tclean(
             vis=self.inputvis,
@@ -131,9 +246,15 @@ class Tclean(Imager):
             minbeamfrac=self.min_beam_frac,
             growiterations=self.grow_iterations,
             cycleniter=self.cycle_niter,
+            startmodel=start_model,
+            calcpsf=calcpsf,
+            parallel=self.parallel,
             verbose=self.verbose
         )
 
+        if self.reuse_psf:
+            self._psf_name = imagename
+
         if self.deconvolver != "mtmfs":
             restored_image = imagename + ".image"
             residual_image = imagename + ".residual"
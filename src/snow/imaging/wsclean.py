@@ -1,17 +1,263 @@
-from dataclasses import dataclass
+import os
+import shlex
+import shutil
+import subprocess
+
+import astropy.units as u
+from astropy.units import Quantity
+from dataclasses import dataclass, field
+
+from ..utils import (
+    fingerprint_ms, get_sub_ms_names, is_multims, metadata, tracer, uv_coverage_signature
+)
 from .imager import Imager
 
+# Names of the WSClean data columns for each data_column value
+DATA_COLUMNS = {"data": "DATA", "corrected": "CORRECTED_DATA"}
+
+# Weightings supported by WSClean
+WEIGHTINGS = ("natural", "uniform", "briggs")
+
+# Imager parameters that determine the PSF
+PSF_PARAMETERS = (
+    "cell", "M", "N", "weighting", "robust", "field", "spw", "stokes", "phase_center", "taper",
+    "extra_args"
+)
+
 
 @dataclass(init=True, repr=True)
 class WSClean(Imager):
+    """
+        WSClean imager object
+
+        Parameters
+        ----------
+        executable :
+            Name or absolute path of the wsclean executable
+        threads :
+            Number of threads used by WSClean (-j). Default is None, and it means to use all the cores
+        mgain :
+            Major cycle gain. Each major cycle subtracts this fraction of the peak and predicts the model
+            visibilities
+        gain :
+            Minor cycle gain
+        threshold :
+            Absolute stopping threshold in Jy. Default is None, and it means no absolute threshold
+        auto_threshold :
+            Stopping threshold relative to the residual noise. Default is None
+        auto_mask :
+            Masking threshold relative to the residual noise. Default is None
+        taper :
+            Gaussian uv-taper, e.g "0.05asec". Default is None
+        extra_args :
+            Additional WSClean command line arguments, e.g ["-multiscale", "-parallel-gridding", "4"]
+        reuse_psf :
+            Whether to reuse the PSF of the previous run when the uv sampling, the weights and the imaging
+            parameters have not changed
+        reuse_dirty :
+            Whether to reuse the dirty image of the previous run when the measurement set and the imaging
+            parameters have not changed
+        kwargs :
+            General imager arguments
+    """
+    executable: str = "wsclean"
+    threads: int = None
+    mgain: float = 0.8
+    gain: float = 0.1
+    threshold: float = None
+    auto_threshold: float = None
+    auto_mask: float = None
+    taper: str = None
+    extra_args: list = field(init=True, repr=True, default_factory=list)
+    reuse_psf: bool = False
+    reuse_dirty: bool = False
+    _psf_key: str = field(init=False, repr=False, default=None)
+    _psf_name: str = field(init=False, repr=False, default=None)
+    _dirty_key: str = field(init=False, repr=False, default=None)
+    _dirty_name: str = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+
+        super().__post_init__()
+
+        if self.threads is not None and self.threads < 1:
+            raise ValueError("Error, threads should be at least 1")
+        if self.data_column not in DATA_COLUMNS:
+            raise ValueError("Error, data_column should be one of " + ", ".join(DATA_COLUMNS))
+        if self.weighting not in WEIGHTINGS:
+            raise ValueError("Error, weighting should be one of " + ", ".join(WEIGHTINGS))
+        if ":" in self.spw:
+            raise ValueError(
+                "Error, WSClean cannot select channels, spw should only select windows"
+            )
+
+    def _scale(self) -> str:
+        """
+        Returns the pixel size in the units of WSClean
+        """
+        cell = self.cell[0] if isinstance(self.cell, (list, tuple)) else self.cell
+        if isinstance(cell, (int, float)):
+            return "{0}asec".format(cell)
+        return "{0}asec".format(Quantity(cell).to(u.arcsec).value)
+
+    def _field_ids(self) -> str:
+        """
+        Returns the comma separated field ids of the field selection
+        """
+        field_names = metadata.fields(self.inputvis)["name"]
+        field_ids = []
+        for selected_field in self.field.split(","):
+            selected_field = selected_field.strip()
+            if selected_field.isdigit():
+                field_ids.append(selected_field)
+            elif selected_field in field_names:
+                field_ids.append(str(field_names.index(selected_field)))
+            else:
+                raise ValueError(
+                    "Error, field " + selected_field + " is not in the measurement set"
+                )
+        return ",".join(field_ids)
+
+    def _build_args(
+        self, imagename: str = "", reuse_psf: str = None, reuse_dirty: str = None
+    ) -> list:
+        """
+        Builds the WSClean command line
+
+        Parameters
+        ----------
+        imagename :
+            The absolute path to the output image name
+        reuse_psf :
+            Image name of a previous run whose PSF is reused
+        reuse_dirty :
+            Image name of a previous run whose dirty image is reused
+
+        Returns
+        -------
+        The list of arguments
+        """
+        args = [self.executable, "-name", imagename, "-size", str(self.M), str(self.N)]
+        args += ["-scale", self._scale()]
+
+        if self.weighting == "briggs":
+            args += ["-weight", "briggs", str(self.robust)]
+        else:
+            args += ["-weight", self.weighting]
+
+        args += ["-niter", str(self.niter), "-gain", str(self.gain)]
+        if self.mgain is not None:
+            args += ["-mgain", str(self.mgain)]
+        if self.threshold is not None:
+            args += ["-threshold", str(self.threshold)]
+        if self.auto_threshold is not None:
+            args += ["-auto-threshold", str(self.auto_threshold)]
+        if self.auto_mask is not None:
+            args += ["-auto-mask", str(self.auto_mask)]
+        if self.taper is not None:
+            args += ["-taper-gaussian", self.taper]
+
+        args += ["-data-column", DATA_COLUMNS[self.data_column], "-pol", self.stokes]
+
+        if self.field != "":
+            args += ["-field", self._field_ids()]
+        if self.spw != "":
+            args += ["-spws", self.spw.replace(" ", "")]
+        if self.phase_center != "":
+            # WSClean takes the right ascension and declination without the reference frame
+            args += ["-shift"] + self.phase_center.split()[-2:]
+
+        if self.threads is not None:
+            args += ["-j", str(self.threads)]
+        if not self.save_model:
+            args += ["-no-update-model-required"]
+        if not self.verbose:
+            args += ["-quiet"]
+        if reuse_psf is not None:
+            args += ["-reuse-psf", reuse_psf]
+        if reuse_dirty is not None:
+            args += ["-reuse-dirty", reuse_dirty]
+
+        args += [str(arg) for arg in self.extra_args]
+        # A multi-MS is imaged from its sub-MSs, which WSClean grids together
+        if is_multims(self.inputvis):
+            args += get_sub_ms_names(self.inputvis)
+        else:
+            args += [self.inputvis]
+        return args
+
+    @staticmethod
+    def _product(imagename: str = "", product: str = "image") -> str:
+        """
+        Returns the FITS file of an image product. Runs with several output channels write the MFS products
+        """
+        mfs_product = imagename + "-MFS-" + product + ".fits"
+        if os.path.exists(mfs_product):
+            return mfs_product
+        return imagename + "-" + product + ".fits"
 
     def run(self, imagename=""):
         """
-        Method that runs WSClean
+        Method that runs WSClean using subprocess
 
         Parameters
         ----------
         imagename :
             The absolute path to the output image name
         """
-        raise NotImplementedError("This function has not been implemented yet")
+        psf_key = None
+        dirty_key = None
+        reuse_psf = None
+        reuse_dirty = None
+        if self.reuse_psf or self.reuse_dirty:
+            with tracer.span("reuse_fingerprint", category="imaging", vis=self.inputvis):
+                if self.reuse_psf:
+                    psf_key = self._parameters_key(
+                        PSF_PARAMETERS,
+                        uv_coverage_signature(self.inputvis)[0]
+                    )
+                if self.reuse_dirty:
+                    dirty_key = self._parameters_key(
+                        PSF_PARAMETERS + ("data_column", ), fingerprint_ms(self.inputvis)
+                    )
+            if psf_key is not None and psf_key == self._psf_key and os.path.exists(
+                self._product(self._psf_name, "psf")
+            ):
+                reuse_psf = self._psf_name
+            if dirty_key is not None and dirty_key == self._dirty_key and os.path.exists(
+                self._product(self._dirty_name, "dirty")
+            ):
+                reuse_dirty = self._dirty_name
+
+        args = self._build_args(imagename, reuse_psf, reuse_dirty)
+        print(" ".join(shlex.quote(arg) for arg in args))
+
+        # Run WSClean and wait until it finishes
+        p = subprocess.Popen(args, env=os.environ)
+        returncode = p.wait()
+        if returncode != 0:
+            raise RuntimeError("WSClean finished with exit code {0}".format(returncode))
+
+        # Reused products are not written again, so they are copied to keep them with the latest run
+        for reused_name, product in ((reuse_psf, "psf"), (reuse_dirty, "dirty")):
+            if reused_name is not None and not os.path.exists(self._product(imagename, product)):
+                reused_product = self._product(reused_name, product)
+                shutil.copy(reused_product, imagename + reused_product[len(reused_name):])
+        if psf_key is not None:
+            self._psf_key = psf_key
+            self._psf_name = imagename
+        if dirty_key is not None:
+            self._dirty_key = dirty_key
+            self._dirty_name = imagename
+
+        restored_image = self._product(imagename, "image")
+        residual_image = self._product(imagename, "residual")
+        if not os.path.exists(residual_image):
+            # Runs without cleaning do not write a residual image
+            residual_image = self._product(imagename, "dirty")
+        if not os.path.exists(restored_image) or not os.path.exists(residual_image):
+            raise FileNotFoundError("The WSClean images have not been created")
+
+        self._calculate_statistics_fits(
+            signal_fits_name=restored_image, residual_fits_name=residual_image
+        )
@@ -2,3 +2,4 @@ from .ampcal import Ampcal
 from .apcal import AmpPhasecal
 from .phasecal import Phasecal
 from .selfcal import Selfcal
+from .sweep import ParameterSweep
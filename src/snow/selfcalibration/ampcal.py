@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 
-from casatasks import applycal, gaincal, rmtables
+from casatasks import gaincal, rmtables
 
 from .selfcal import Selfcal
+from ..utils.instrumentation import tracer
 
 
 @dataclass(init=False, repr=True)
@@ -34,24 +35,46 @@ class Ampcal(Selfcal):
         """
         self._init_run("before_ampcal")
 
-        for i in range(0, self._loops):
+        for i in range(self._first_iteration, self._loops):
             caltable = self.output_caltables + 'ampcal_' + str(i)
             self._caltables.append(caltable)
             rmtables(caltable)
 
             self._set_attributes_from_dicts(i)
 
+            self._run_iteration(caltable, i)
+
+            if self._finish_selfcal_iteration(i):
+                break
+
+    def _calibrate(self, caltable: str = "", current_iteration: int = 0) -> bool:
+        """
+        Protected method that solves and applies the amplitude-only gains of one iteration
+
+        Parameters
+        ----------
+        caltable :
+            Output calibration table
+        current_iteration :
+            Iteration number during the self-calibration loop
+
+        Returns
+        -------
+        True if the residual outliers were flagged while applying the gains
+        """
+        solve_vis = self._solve_vis()
+        with tracer.span("gaincal", solint=self.solint[current_iteration]):
             gaincal(
-                vis=self.visfile,
+                vis=solve_vis,
                 field=self.imager.field,
                 caltable=caltable,
                 spw=self.imager.spw,
                 uvrange=self.uvrange,
                 gaintype=self.gaintype,
                 refant=self.refant,
-                calmode=self.calmode,
+                calmode=self._calmode,
                 combine=self.combine,
-                solint=self.solint[i],
+                solint=self.solint[current_iteration],
                 minsnr=self.minsnr,
                 minblperant=self.minblperant,
                 gaintable=self.input_caltable,
@@ -59,39 +82,22 @@ class Ampcal(Selfcal):
                 solnorm=self.__solnorm
             )
 
-            self._plot_selfcal(
-                caltable,
-                xaxis="time",
-                yaxis="amp",
-                iteration="antenna",
-                subplot=[4, 2],
-                plotrange=[0, 0, 0.2, 1.8],
-                want_plot=self.want_plot
-            )
-
-            version_name = 'before_ampcal_' + str(i)
-            self._save_selfcal(caltable_version=version_name, overwrite=True)
-            self._caltables_versions.append(version_name)
-
-            print("Applying calibration tables to {0} file".format(self.visfile))
-            applycal(
-                vis=self.visfile,
-                spw=self.imager.spw,
-                spwmap=[self.spwmap, self.spwmap],
-                field=self.imager.field,
-                gaintable=[self.input_caltable, caltable],
-                gainfield='',
-                calwt=False,
-                flagbackup=False,
-                interp=self.interp,
-                applymode=self.applymode
-            )
-            self.input_caltable = caltable
-
-            if self.flag_dataset:
-                self._flag_dataset(mode=self.flag_mode)
-
-            self._run_imager(i)
-
-            if self._finish_selfcal_iteration(i):
-                break
+        self._plot_selfcal(
+            caltable,
+            xaxis="time",
+            yaxis="amp",
+            iteration="antenna",
+            subplot=[4, 2],
+            plotrange=[0, 0, 0.2, 1.8],
+            want_plot=self.want_plot
+        )
+
+        version_name = 'before_ampcal_' + str(current_iteration)
+        self._save_selfcal(caltable_version=version_name, overwrite=True)
+        self._caltables_versions.append(version_name)
+
+        flagged = self._applycal(
+            gaintable=[self.input_caltable, caltable], spwmap=[self.spwmap, self.spwmap]
+        )
+        self.input_caltable = caltable
+        return flagged
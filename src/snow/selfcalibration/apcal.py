@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 
-from casatasks import applycal, gaincal, rmtables
+from casatasks import gaincal, rmtables
 
 from .selfcal import Selfcal
+from ..utils.instrumentation import tracer
 
 
 @dataclass(init=False, repr=True)
@@ -34,16 +35,38 @@ class AmpPhasecal(Selfcal):
     def run(self):
         self._init_run("before_apcal")
 
-        for i in range(0, self._loops):
+        for i in range(self._first_iteration, self._loops):
             caltable = self.output_caltables + 'apcal_' + str(i)
             self._caltables.append(caltable)
             rmtables(caltable)
 
             self._set_attributes_from_dicts(i)
 
+            self._run_iteration(caltable, i)
+
+            if self._finish_selfcal_iteration(i):
+                break
+
+    def _calibrate(self, caltable: str = "", current_iteration: int = 0) -> bool:
+        """
+        Protected method that solves and applies the amplitude-phase gains of one iteration
+
+        Parameters
+        ----------
+        caltable :
+            Output calibration table
+        current_iteration :
+            Iteration number during the self-calibration loop
+
+        Returns
+        -------
+        True if the residual outliers were flagged while applying the gains
+        """
+        solve_vis = self._solve_vis()
+        with tracer.span("gaincal", solint=self.solint[current_iteration]):
             if self.__incremental:
                 gaincal(
-                    vis=self.visfile,
+                    vis=solve_vis,
                     field=self.imager.field,
                     caltable=caltable,
                     spw=self.imager.spw,
@@ -52,7 +75,7 @@ class AmpPhasecal(Selfcal):
                     refant=self.refant,
                     calmode=self._calmode,
                     combine=self.combine,
-                    solint=self.solint[i],
+                    solint=self.solint[current_iteration],
                     minsnr=self.minsnr,
                     minblperant=self.minblperant,
                     gaintable=self.input_caltable,
@@ -61,7 +84,7 @@ class AmpPhasecal(Selfcal):
                 )
             else:
                 gaincal(
-                    vis=self.visfile,
+                    vis=solve_vis,
                     field=self.imager.field,
                     caltable=caltable,
                     spw=self.imager.spw,
@@ -70,59 +93,32 @@ class AmpPhasecal(Selfcal):
                     refant=self.refant,
                     calmode=self._calmode,
                     combine=self.combine,
-                    solint=self.solint[i],
+                    solint=self.solint[current_iteration],
                     minsnr=self.minsnr,
                     minblperant=self.minblperant,
                     spwmap=self.spwmap,
                     solnorm=self.__solnorm
                 )
 
-            self._plot_selfcal(
-                caltable,
-                xaxis="time",
-                yaxis="amp",
-                iteration="antenna",
-                subplot=[4, 2],
-                plotrange=[0, 0, 0.2, 1.8],
-                want_plot=self.want_plot
+        self._plot_selfcal(
+            caltable,
+            xaxis="time",
+            yaxis="amp",
+            iteration="antenna",
+            subplot=[4, 2],
+            plotrange=[0, 0, 0.2, 1.8],
+            want_plot=self.want_plot
+        )
+
+        version_name = 'before_apcal_' + str(current_iteration)
+        self._save_selfcal(caltable_version=version_name, overwrite=True)
+        self._caltables_versions.append(version_name)
+
+        if self.__incremental:
+            flagged = self._applycal(
+                gaintable=[self.input_caltable, caltable], spwmap=[self.spwmap, self.spwmap]
             )
-
-            version_name = 'before_apcal_' + str(i)
-            self._save_selfcal(caltable_version=version_name, overwrite=True)
-            self._caltables_versions.append(version_name)
-
-            print("Applying calibration tables to {0} file".format(self.visfile))
-            if self.__incremental:
-                applycal(
-                    vis=self.visfile,
-                    spw=self.imager.spw,
-                    spwmap=[self.spwmap, self.spwmap],
-                    field=self.imager.field,
-                    gaintable=[self.input_caltable, caltable],
-                    gainfield='',
-                    calwt=False,
-                    flagbackup=False,
-                    interp=self.interp,
-                    applymode=self.applymode
-                )
-                self.input_caltable = caltable
-            else:
-                applycal(
-                    vis=self.visfile,
-                    spw=self.imager.spw,
-                    spwmap=self.spwmap,
-                    field=self.imager.field,
-                    gaintable=[caltable],
-                    gainfield='',
-                    calwt=False,
-                    flagbackup=False,
-                    interp=self.interp,
-                    applymode=self.applymode
-                )
-            if self.flag_dataset:
-                self._flag_dataset(mode=self.flag_mode)
-
-            self._run_imager(i)
-
-            if self._finish_selfcal_iteration(i):
-                break
+            self.input_caltable = caltable
+            return flagged
+        else:
+            return self._applycal(gaintable=[caltable], spwmap=self.spwmap)
@@ -0,0 +1,322 @@
+from typing import Tuple
+
+import numpy as np
+from casatools import ms
+
+from ..utils.ms_metadata import metadata, open_table
+from .residual_flagger import baseline_outlier_flags
+
+# Receptor indexes of the two antennas of each CASA correlation type: RR, RL, LR, LL, XX, XY, YX, YY
+CORRELATION_RECEPTORS = {
+    5: (0, 0),
+    6: (0, 1),
+    7: (1, 0),
+    8: (1, 1),
+    9: (0, 0),
+    10: (0, 1),
+    11: (1, 0),
+    12: (1, 1)
+}
+
+APPLY_MODES = ("calflag", "calflagstrict", "calonly", "flagonly")
+
+
+class GainTable:
+
+    def __init__(self, caltable: str = "", interp: str = "linear"):
+        """
+        In-memory antenna-based gain table that interpolates the solutions in time
+
+        Parameters
+        ----------
+        caltable :
+            Absolute path to the single channel CASA calibration table
+        interp :
+            Temporal interpolation ("linear" or "nearest"). Only the time part of CASA interp strings is used
+        """
+        self.caltable = caltable
+        self.interp = "nearest" if interp.split(",")[0].startswith("nearest") else "linear"
+
+        with open_table(caltable) as mytb:
+            time = mytb.getcol("TIME")
+            spw = mytb.getcol("SPECTRAL_WINDOW_ID")
+            antenna = mytb.getcol("ANTENNA1")
+            # Arrays are (pol, channel, row)
+            cparam = mytb.getcol("CPARAM")
+            flag = mytb.getcol("FLAG")
+
+        if cparam.shape[1] != 1:
+            raise ValueError(
+                "Error, only single channel calibration tables can be applied natively"
+            )
+        self.npol = cparam.shape[0]
+        # Spectral windows with at least one row, even if every solution is flagged
+        self.spws = set(spw.tolist())
+        self.solutions = {}
+        for key in set(zip(spw.tolist(), antenna.tolist())):
+            rows = np.flatnonzero((spw == key[0]) & (antenna == key[1]))
+            rows = rows[np.argsort(time[rows])]
+            # A solution is usable when every polarization has been solved
+            usable = rows[~np.any(flag[:, 0, rows], axis=0)]
+            if usable.size > 0:
+                self.solutions[key] = (time[usable], cparam[:, 0, usable])
+
+    def gains(self,
+              spw: int = 0,
+              antenna: int = 0,
+              time: np.ndarray = None) -> Tuple[np.ndarray, bool]:
+        """
+        Interpolates the gains of an antenna at the given times
+
+        Parameters
+        ----------
+        spw :
+            Spectral window of the calibration table
+        antenna :
+            Antenna index
+        time :
+            Times where the gains are needed
+
+        Returns
+        -------
+        tuple:
+            A tuple with the gains (pol, time) and whether the antenna has any valid solution
+        """
+        if (spw, antenna) not in self.solutions:
+            return np.ones((self.npol, time.size), dtype=np.complex128), False
+        solution_time, solution_gain = self.solutions[(spw, antenna)]
+        if self.interp == "nearest" or solution_time.size == 1:
+            index = np.clip(np.searchsorted(solution_time, time), 1, max(solution_time.size - 1, 1))
+            previous_closer = np.abs(time - solution_time[index - 1]) <= np.abs(
+                time - solution_time[np.minimum(index, solution_time.size - 1)]
+            )
+            index = np.where(previous_closer, index - 1, np.minimum(index, solution_time.size - 1))
+            return solution_gain[:, index], True
+        amplitude = np.array([np.interp(time, solution_time, np.abs(g)) for g in solution_gain])
+        phase = np.array(
+            [np.interp(time, solution_time, np.unwrap(np.angle(g))) for g in solution_gain]
+        )
+        return amplitude * np.exp(1j * phase), True
+
+
+def check_native_apply(applymode: str = "calflag", gaintables: list = None) -> None:
+    """
+    Function that checks that the native apply engine supports an apply mode and a list of calibration tables, so
+    unsupported settings are rejected before any solving. Only complex, single channel tables such as the ones
+    written by gaincal and native_gaincal are supported.
+
+    Parameters
+    ----------
+    applymode :
+        Calibration mode
+    gaintables :
+        List of calibration tables. Empty names are skipped
+    """
+    if applymode not in APPLY_MODES + ("", ):
+        raise ValueError(
+            "Error, the native apply engine supports the apply modes " + ", ".join(APPLY_MODES)
+        )
+    for caltable in gaintables if gaintables is not None else []:
+        if caltable == "":
+            continue
+        with open_table(caltable) as mytb:
+            if "CPARAM" not in mytb.colnames():
+                raise ValueError(
+                    "Error, the native apply engine cannot apply the real-valued table " + caltable
+                )
+            if mytb.nrows() > 0 and mytb.getcell("CPARAM", 0).shape[1] != 1:
+                raise ValueError(
+                    "Error, the native apply engine cannot apply the multi-channel table " +
+                    caltable
+                )
+
+
+def _normalize_spwmaps(spwmaps, ntables: int = 1) -> list:
+    if spwmaps is None or len(spwmaps) == 0:
+        return [[] for _ in range(ntables)]
+    if not isinstance(spwmaps[0], (list, tuple)):
+        # A single list maps the first table only
+        return [list(spwmaps)] + [[] for _ in range(ntables - 1)]
+    return [list(spwmap) for spwmap in spwmaps] + [[] for _ in range(ntables - len(spwmaps))]
+
+
+def _add_corrected_column(vis: str = "", chunk_rows: int = 100000) -> None:
+    """
+    Function that adds a CORRECTED_DATA column with the same description as the DATA column and fills it with DATA,
+    like applycal does, so the rows outside the field and spectral window selection are not left at zero
+    """
+    with open_table(vis, nomodify=False) as mytb:
+        description = mytb.getcoldesc("DATA")
+        description["comment"] = "The corrected data column"
+        mytb.addcols(
+            {"CORRECTED_DATA": description}, {
+                "TYPE": "TiledShapeStMan",
+                "NAME": "CorrectedTiled",
+                "SPEC": {
+                    "DEFAULTTILESHAPE": np.array([4, 32, 128], dtype=np.int32)
+                }
+            }
+        )
+        # Each data description can have a different shape
+        for ddid in np.unique(mytb.getcol("DATA_DESC_ID")).tolist():
+            subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid))
+            for start in range(0, subtable.nrows(), chunk_rows):
+                nrow = min(chunk_rows, subtable.nrows() - start)
+                subtable.putcol(
+                    "CORRECTED_DATA",
+                    subtable.getcol("DATA", startrow=start, nrow=nrow),
+                    startrow=start
+                )
+            subtable.close()
+        mytb.flush()
+
+
+def apply_gains(
+    vis: str = "",
+    gaintables: list = None,
+    spwmaps: list = None,
+    field: str = "",
+    spw: str = "",
+    interp: str = "linear",
+    applymode: str = "calflag",
+    flag_residuals: bool = False,
+    timedevscale: float = 3.0,
+    freqdevscale: float = 3.0,
+    chunk_rows: int = 100000
+) -> bool:
+    """
+    Function that applies antenna-based gain tables in a single streaming pass over the measurement set. DATA is
+    read once per chunk of rows, divided by the interpolated gains and written to CORRECTED_DATA. If requested,
+    residual outliers (CORRECTED_DATA - MODEL_DATA) are flagged in the same pass. A missing CORRECTED_DATA column is
+    created as a copy of DATA, so rows outside the selection are left uncalibrated.
+
+    Parameters
+    ----------
+    vis :
+        Input visibility measurement set
+    gaintables :
+        List of calibration tables to apply. Empty names are skipped
+    spwmaps :
+        Spectral window map for each gain table, or a single list for the first table
+    field :
+        Select field
+    spw :
+        Select spectral window
+    interp :
+        Temporal interpolation for each gaintable ("linear" or "nearest")
+    applymode :
+        Calibration mode ("calflag", "calflagstrict", "calonly" or "flagonly"). Data of spectral windows without
+        solutions in a table are passed through by "calflag" and flagged by "calflagstrict". "flagonly" writes the
+        flags and leaves CORRECTED_DATA untouched
+    flag_residuals :
+        Whether to flag residual outliers in the same pass. Ignored if MODEL_DATA does not exist
+    timedevscale :
+        For time analysis, flag a point if its deviation is larger than timedevscale times the robust deviation
+    freqdevscale :
+        For spectral analysis, flag a point if its deviation is larger than freqdevscale times the robust deviation
+    chunk_rows :
+        Maximum number of rows read at once
+
+    Returns
+    -------
+    True if residual outliers were flagged
+    """
+    check_native_apply(applymode)
+    if applymode == "":
+        applymode = "calflag"
+    spwmaps = _normalize_spwmaps(spwmaps, len(gaintables))
+    tables = [
+        (GainTable(caltable, interp), spwmap) for caltable, spwmap in zip(gaintables, spwmaps)
+        if caltable != ""
+    ]
+
+    myms = ms()
+    selection = myms.msseltoindex(vis=vis, field=field, spw=spw)
+    myms.done()
+
+    with open_table(vis + "/DATA_DESCRIPTION") as mytb:
+        dd_spw = mytb.getcol("SPECTRAL_WINDOW_ID")
+        dd_pol = mytb.getcol("POLARIZATION_ID")
+    with open_table(vis + "/POLARIZATION") as mytb:
+        corr_types = [mytb.getcell("CORR_TYPE", row) for row in range(mytb.nrows())]
+
+    ddids = [ddid for ddid in range(len(dd_spw)) if spw == "" or dd_spw[ddid] in selection["spw"]]
+    where = "DATA_DESC_ID IN [{0}]".format(",".join(map(str, ddids)))
+    if field != "":
+        where += " && FIELD_ID IN [{0}]".format(",".join(map(str, selection["field"])))
+
+    colnames = metadata.colnames(vis)
+    if "CORRECTED_DATA" not in colnames:
+        _add_corrected_column(vis, chunk_rows)
+    flag_residuals = flag_residuals and "MODEL_DATA" in colnames
+
+    with open_table(vis, nomodify=False) as mytb:
+        selected = mytb.query(where)
+        for ddid in ddids:
+            spw_id = int(dd_spw[ddid])
+            receptors = [CORRELATION_RECEPTORS[corr_type] for corr_type in corr_types[dd_pol[ddid]]]
+            subtable = selected.query("DATA_DESC_ID=={0}".format(ddid))
+            for start in range(0, subtable.nrows(), chunk_rows):
+                nrow = min(chunk_rows, subtable.nrows() - start)
+                time = subtable.getcol("TIME", startrow=start, nrow=nrow)
+                antenna1 = subtable.getcol("ANTENNA1", startrow=start, nrow=nrow)
+                antenna2 = subtable.getcol("ANTENNA2", startrow=start, nrow=nrow)
+                # Arrays are (correlation, channel, row)
+                data = subtable.getcol("DATA", startrow=start, nrow=nrow)
+                flag = subtable.getcol("FLAG", startrow=start, nrow=nrow)
+
+                jones = np.ones((len(receptors), nrow), dtype=np.complex128)
+                valid = np.ones(nrow, dtype=bool)
+                for gain_table, spwmap in tables:
+                    cal_spw = spwmap[spw_id] if spw_id < len(spwmap) else spw_id
+                    if cal_spw not in gain_table.spws:
+                        if applymode == "calflagstrict":
+                            valid[:] = False
+                        continue
+                    gain1 = np.ones((gain_table.npol, nrow), dtype=np.complex128)
+                    gain2 = np.ones((gain_table.npol, nrow), dtype=np.complex128)
+                    for antenna in np.unique(np.concatenate([antenna1, antenna2])):
+                        for antennas, gains in ((antenna1, gain1), (antenna2, gain2)):
+                            rows = antennas == antenna
+                            if np.any(rows):
+                                gains[:, rows], solved = gain_table.gains(
+                                    cal_spw, antenna, time[rows]
+                                )
+                                valid[rows] &= solved
+                    for c, (p, q) in enumerate(receptors):
+                        p = p if gain_table.npol > 1 else 0
+                        q = q if gain_table.npol > 1 else 0
+                        jones[c] *= gain1[p] * np.conj(gain2[q])
+                valid &= np.all(jones != 0.0, axis=0)
+
+                if applymode == "flagonly":
+                    # Like applycal, only the flags are written
+                    corrected = subtable.getcol("CORRECTED_DATA", startrow=start, nrow=nrow)
+                else:
+                    corrected = np.where(
+                        valid[None, None, :], data / np.where(jones == 0.0, 1.0, jones)[:, None, :],
+                        data
+                    )
+                if applymode != "calonly":
+                    flag |= ~valid[None, None, :]
+                if flag_residuals and not np.all(flag):
+                    model = subtable.getcol("MODEL_DATA", startrow=start, nrow=nrow)
+                    # The statistics run along the time series and the spectrum of each baseline
+                    flag = baseline_outlier_flags(
+                        corrected - model,
+                        flag,
+                        antenna1,
+                        antenna2,
+                        time,
+                        timedevscale=timedevscale,
+                        freqdevscale=freqdevscale
+                    )
+
+                if applymode != "flagonly":
+                    subtable.putcol("CORRECTED_DATA", corrected.astype(data.dtype), startrow=start)
+                subtable.putcol("FLAG", flag, startrow=start)
+                subtable.putcol("FLAG_ROW", np.all(flag, axis=(0, 1)), startrow=start)
+            subtable.close()
+        selected.close()
+        mytb.flush()
+    return flag_residuals
@@ -0,0 +1,589 @@
+from typing import Tuple
+
+import numpy as np
+from casatools import calibrater, ms
+
+from ..utils.ms_metadata import open_table
+from ..utils.selfcal_utils import parse_solint, parse_uvrange
+
+SPEED_OF_LIGHT = 299792458.0
+
+# CASA Stokes enumeration of the parallel hand correlations: RR, LL, XX, YY
+PARALLEL_HANDS = (5, 8, 9, 12)
+
+
+def _unit_phasor(x: np.ndarray) -> np.ndarray:
+    amplitude = np.abs(x)
+    return np.where(amplitude > 0.0, x / np.where(amplitude > 0.0, amplitude, 1.0), 1.0 + 0.0j)
+
+
+def stefcal_phase(
+    coherency: np.ndarray,
+    weight: np.ndarray,
+    maxiter: int = 100,
+    tolerance: float = 1e-6
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Function that solves antenna-based phase-only gains with StEFCal-style alternating least squares. The solution
+    maximizes Re(sum_pq g_p^* C_pq g_q) over unit-modulus gains, which minimizes sum_pq w|V_pq - g_p g_q^* M_pq|^2.
+    All leading axes (e.g. solution interval, spectral window, polarization) are solved at once.
+
+    Parameters
+    ----------
+    coherency :
+        Hermitian array (..., nant, nant) with the weighted sums of V_pq conj(M_pq)
+    weight :
+        Symmetric array (..., nant, nant) with the weighted sums of |M_pq|^2
+    maxiter :
+        Maximum number of iterations
+    tolerance :
+        Convergence tolerance on the gain update
+
+    Returns
+    -------
+    tuple:
+        A tuple with the unit-modulus gains (..., nant) and their signal-to-noise ratios (..., nant)
+    """
+    gains = np.ones(coherency.shape[:-1], dtype=np.complex128)
+    if gains.size == 0:
+        return gains, np.zeros(gains.shape)
+    for iteration in range(maxiter):
+        new_gains = _unit_phasor(np.einsum("...pq,...q->...p", coherency, gains))
+        if iteration % 2 == 1:
+            new_gains = _unit_phasor(0.5 * (new_gains + gains))
+        converged = np.max(np.abs(new_gains - gains)) < tolerance
+        gains = new_gains
+        if converged:
+            break
+    signal = np.abs(np.einsum("...pq,...q->...p", coherency, gains))
+    noise = np.sqrt(weight.sum(axis=-1))
+    snr = np.where(noise > 0.0, signal / np.where(noise > 0.0, noise, 1.0), 0.0)
+    return gains, snr
+
+
+def flag_minblperant(weight: np.ndarray, minblperant: int = 4) -> np.ndarray:
+    """
+    Function that iteratively discards antennas with fewer than minblperant unflagged baselines
+
+    Parameters
+    ----------
+    weight :
+        Symmetric array (..., nant, nant) with the baseline weights
+    minblperant :
+        Minimum number of baselines per antenna
+
+    Returns
+    -------
+    Boolean array (..., nant) that is True for the antennas that can be solved
+    """
+    baselines = weight > 0.0
+    antenna_ok = np.ones(weight.shape[:-1], dtype=bool)
+    for _ in range(weight.shape[-1]):
+        valid = baselines & antenna_ok[..., :, None] & antenna_ok[..., None, :]
+        new_antenna_ok = antenna_ok & (valid.sum(axis=-1) >= minblperant)
+        if np.array_equal(new_antenna_ok, antenna_ok):
+            break
+        antenna_ok = new_antenna_ok
+    return antenna_ok
+
+
+def reference_phases(gains: np.ndarray,
+                     flags: np.ndarray,
+                     refants: list = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Function that references the phases to the first unflagged antenna in refants. If none of them has a valid
+    solution the first unflagged antenna is used.
+
+    Parameters
+    ----------
+    gains :
+        Complex gains (..., nant)
+    flags :
+        Gain flags (..., nant)
+    refants :
+        Antenna indexes in order of preference
+
+    Returns
+    -------
+    tuple:
+        A tuple with the referenced gains and the reference antenna index of each solution
+    """
+    if refants is None:
+        refants = []
+    reference = np.full(flags.shape[:-1], -1)
+    for refant in refants[::-1]:
+        reference = np.where(~flags[..., refant], refant, reference)
+    reference = np.where(reference < 0, np.argmax(~flags, axis=-1), reference)
+    reference_gain = np.take_along_axis(gains, reference[..., None], axis=-1)
+    gains = gains * np.conj(reference_gain)
+    return np.where(flags, 1.0 + 0.0j, gains), reference
+
+
+def dense_baselines(
+    values: np.ndarray, antenna1: np.ndarray, antenna2: np.ndarray, nant: int = 0
+) -> np.ndarray:
+    """
+    Function that expands per baseline values (..., baseline) into antenna matrices (..., nant, nant). Complex
+    values are filled as a Hermitian matrix and real values as a symmetric one
+
+    Parameters
+    ----------
+    values :
+        Values of each baseline, with the first antenna lower than the second
+    antenna1 :
+        First antenna of each baseline
+    antenna2 :
+        Second antenna of each baseline
+    nant :
+        Number of antennas
+
+    Returns
+    -------
+    The antenna matrices with zeros on the diagonal and on the missing baselines
+    """
+    dense = np.zeros(values.shape[:-1] + (nant, nant), dtype=values.dtype)
+    dense[..., antenna1, antenna2] = values
+    dense[..., antenna2, antenna1] = np.conj(values)
+    return dense
+
+
+def solve_phase_intervals(
+    coherency: np.ndarray,
+    weight: np.ndarray,
+    antenna1: np.ndarray,
+    antenna2: np.ndarray,
+    nant: int = 0,
+    minblperant: int = 4,
+    maxiter: int = 100,
+    tolerance: float = 1e-6,
+    batch_intervals: int = 64
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function that solves the phase-only gains of per baseline coherencies (interval, spw, pol, baseline) in batches
+    of solution intervals. Only the antenna matrices of one batch are held in memory at once, so the memory does
+    not grow with the number of intervals times the square of the number of antennas.
+
+    Parameters
+    ----------
+    coherency :
+        Weighted sums of V_pq conj(M_pq) of each baseline
+    weight :
+        Weighted sums of |M_pq|^2 of each baseline
+    antenna1 :
+        First antenna of each baseline
+    antenna2 :
+        Second antenna of each baseline
+    nant :
+        Number of antennas
+    minblperant :
+        Minimum baseline per antenna
+    maxiter :
+        Maximum number of solver iterations
+    tolerance :
+        Convergence tolerance of the solver
+    batch_intervals :
+        Number of solution intervals solved at once
+
+    Returns
+    -------
+    tuple:
+        A tuple with the gains, their SNR and whether each antenna has enough baselines, with shape
+        (interval, spw, pol, antenna)
+    """
+    shape = coherency.shape[:-1] + (nant, )
+    gains = np.ones(shape, dtype=np.complex128)
+    snr = np.zeros(shape)
+    antenna_ok = np.zeros(shape, dtype=bool)
+    for start in range(0, coherency.shape[0], batch_intervals):
+        batch = slice(start, start + batch_intervals)
+        batch_weight = dense_baselines(weight[batch], antenna1, antenna2, nant)
+        antenna_ok[batch] = flag_minblperant(batch_weight, minblperant)
+        baseline_ok = antenna_ok[batch][..., :, None] & antenna_ok[batch][..., None, :]
+        gains[batch], snr[batch] = stefcal_phase(
+            np.where(baseline_ok, dense_baselines(coherency[batch], antenna1, antenna2, nant), 0.0),
+            np.where(baseline_ok, batch_weight, 0.0),
+            maxiter=maxiter,
+            tolerance=tolerance
+        )
+    return gains, snr, antenna_ok
+
+
+def _solution_intervals(
+    time: np.ndarray, scan: np.ndarray, solint: float = np.inf, combine_scan: bool = False
+):
+    """
+    Function that assigns every row to a solution interval. Intervals start at the beginning of each scan and do
+    not cross scan boundaries unless scans are combined.
+
+    Returns
+    -------
+    tuple:
+        A tuple with the interval index of each row and the number of intervals
+    """
+    group = np.zeros(time.shape, dtype=np.int64) if combine_scan else scan.astype(np.int64)
+    _, group_index = np.unique(group, return_inverse=True)
+    start = np.full(group_index.max() + 1, np.inf)
+    np.minimum.at(start, group_index, time)
+    if solint == 0.0:
+        _, bins = np.unique(time, return_inverse=True)
+    elif np.isinf(solint):
+        bins = np.zeros(time.shape, dtype=np.int64)
+    else:
+        bins = np.floor((time - start[group_index]) / solint + 1e-6).astype(np.int64)
+    keys = np.stack([group_index, bins], axis=-1)
+    _, interval_index = np.unique(keys, axis=0, return_inverse=True)
+    interval_index = interval_index.ravel()
+    return interval_index, interval_index.max() + 1
+
+
+def _parse_refants(refant: str = "", antenna_names: list = None) -> list:
+    """
+    Function that converts a comma separated list of reference antenna names or indexes into antenna indexes
+    """
+    refants = []
+    for name in refant.split(","):
+        name = name.strip()
+        if name in antenna_names:
+            refants.append(antenna_names.index(name))
+        elif name.isdigit():
+            refants.append(int(name))
+    return refants
+
+
+def _select_visibilities(vis: str = "", field: str = "", spw: str = "") -> dict:
+    """
+    Function that resolves a field and spectral window selection into the data descriptions, channel masks and
+    TaQL query of the cross-correlation rows to solve
+
+    Returns
+    -------
+    A dictionary with the antenna names, the selected spectral windows and data descriptions, the data description
+    spectral windows, the parallel hand correlations and channel mask of each data description, the channel
+    frequencies of each spectral window and the TaQL query
+    """
+    myms = ms()
+    selection = myms.msseltoindex(vis=vis, field=field, spw=spw)
+    myms.done()
+
+    with open_table(vis + "/ANTENNA") as mytb:
+        antenna_names = list(mytb.getcol("NAME"))
+    with open_table(vis + "/DATA_DESCRIPTION") as mytb:
+        dd_spw = mytb.getcol("SPECTRAL_WINDOW_ID")
+        dd_pol = mytb.getcol("POLARIZATION_ID")
+    with open_table(vis + "/POLARIZATION") as mytb:
+        corr_types = [mytb.getcell("CORR_TYPE", row) for row in range(mytb.nrows())]
+    with open_table(vis + "/SPECTRAL_WINDOW") as mytb:
+        chan_freqs = [mytb.getcell("CHAN_FREQ", row) for row in range(mytb.nrows())]
+
+    spws = np.unique(selection["spw"]).tolist() if spw != "" else sorted(np.unique(dd_spw).tolist())
+    ddids = [ddid for ddid in range(len(dd_spw)) if dd_spw[ddid] in spws]
+    channel_masks = {}
+    for spw_id in spws:
+        mask = np.zeros(len(chan_freqs[spw_id]),
+                        dtype=bool) if spw != "" else np.ones(len(chan_freqs[spw_id]), dtype=bool)
+        if spw != "":
+            for spw_sel, start, end, step in np.atleast_2d(selection["channel"]):
+                if spw_sel == spw_id:
+                    mask[start:end + 1:max(step, 1)] = True
+        channel_masks[spw_id] = mask
+
+    where = "ANTENNA1 != ANTENNA2 && DATA_DESC_ID IN [{0}]".format(",".join(map(str, ddids)))
+    if field != "":
+        where += " && FIELD_ID IN [{0}]".format(",".join(map(str, selection["field"])))
+
+    return {
+        "antenna_names": antenna_names,
+        "spws": spws,
+        "ddids": ddids,
+        "dd_spw": dd_spw,
+        "parallel_hands": {
+            ddid: [
+                k for k, corr_type in enumerate(corr_types[dd_pol[ddid]])
+                if corr_type in PARALLEL_HANDS
+            ]
+            for ddid in ddids
+        },
+        "channel_masks": channel_masks,
+        "chan_freqs": chan_freqs,
+        "where": where
+    }
+
+
+def _read_rows(vis: str = "", selection: dict = None) -> dict:
+    """
+    Function that reads the time, scan, data description, field and integration time of the selected rows
+
+    Returns
+    -------
+    A dictionary with one array per column, in the order the rows are visited by _coherency_chunks
+    """
+    with open_table(vis) as mytb:
+        if "MODEL_DATA" not in mytb.colnames():
+            raise ValueError("The native solver needs a MODEL_DATA column in " + vis)
+        selected = mytb.query(selection["where"])
+        rows = {
+            "time": selected.getcol("TIME"),
+            "scan": selected.getcol("SCAN_NUMBER"),
+            "ddid": selected.getcol("DATA_DESC_ID"),
+            "field": selected.getcol("FIELD_ID"),
+            "interval": selected.getcol("INTERVAL")
+        }
+        selected.close()
+    return rows
+
+
+def _coherency_chunks(
+    vis: str = "", selection: dict = None, uvrange: str = "", chunk_rows: int = 100000
+):
+    """
+    Generator that reads DATA, MODEL_DATA, WEIGHT (or WEIGHT_SPECTRUM) and FLAG in row chunks and reduces them over
+    channels to the weighted sums of V_pq conj(M_pq) and |M_pq|^2 of the parallel hands
+
+    Yields
+    ------
+    tuple:
+        A tuple with the indexes of the chunk rows in the arrays returned by _read_rows, the spectral window, the
+        antennas of each row and the (parallel hand, row) arrays of coherencies and model power
+    """
+    lower_uv, upper_uv, uv_in_wavelengths = parse_uvrange(uvrange)
+    with open_table(vis) as mytb:
+        has_weight_spectrum = "WEIGHT_SPECTRUM" in mytb.colnames()
+        selected = mytb.query(selection["where"])
+        row_ddid = selected.getcol("DATA_DESC_ID")
+        for ddid in selection["ddids"]:
+            spw_id = selection["dd_spw"][ddid]
+            parallel = selection["parallel_hands"][ddid]
+            rows = np.flatnonzero(row_ddid == ddid)
+            subtable = selected.query("DATA_DESC_ID=={0}".format(ddid))
+            for start in range(0, subtable.nrows(), chunk_rows):
+                nrow = min(chunk_rows, subtable.nrows() - start)
+                antenna1 = subtable.getcol("ANTENNA1", startrow=start, nrow=nrow)
+                antenna2 = subtable.getcol("ANTENNA2", startrow=start, nrow=nrow)
+                # Arrays are (correlation, channel, row)
+                data = subtable.getcol("DATA", startrow=start, nrow=nrow)[parallel]
+                model = subtable.getcol("MODEL_DATA", startrow=start, nrow=nrow)[parallel]
+                flag = subtable.getcol("FLAG", startrow=start, nrow=nrow)[parallel]
+                flag |= subtable.getcol("FLAG_ROW", startrow=start, nrow=nrow)[None, None, :]
+                if has_weight_spectrum:
+                    weight = subtable.getcol("WEIGHT_SPECTRUM", startrow=start, nrow=nrow)[parallel]
+                else:
+                    weight = subtable.getcol("WEIGHT", startrow=start, nrow=nrow)[parallel][:,
+                                                                                            None, :]
+                weight = np.where(flag, 0.0, weight) * selection["channel_masks"][spw_id][None, :,
+                                                                                          None]
+                if uvrange != "":
+                    uvw = subtable.getcol("UVW", startrow=start, nrow=nrow)
+                    uvdist = np.hypot(uvw[0], uvw[1])[None, :]
+                    if uv_in_wavelengths:
+                        uvdist = uvdist * selection["chan_freqs"][spw_id][:, None] / SPEED_OF_LIGHT
+                    weight = weight * ((uvdist >= lower_uv) & (uvdist <= upper_uv))[None]
+                # Flagged samples might hold NaNs
+                data = np.where(weight > 0.0, data, 0.0)
+                model = np.where(weight > 0.0, model, 0.0)
+                yield (
+                    rows[start:start + nrow], spw_id, antenna1, antenna2,
+                    np.sum(weight * data * np.conj(model),
+                           axis=1), np.sum(weight * np.abs(model)**2, axis=1)
+                )
+            subtable.close()
+        selected.close()
+
+
+def native_gaincal(
+    vis: str = "",
+    caltable: str = "",
+    field: str = "",
+    spw: str = "",
+    uvrange: str = "",
+    refant: str = "",
+    solint: str = "inf",
+    combine: str = "",
+    minsnr: float = 3.0,
+    minblperant: int = 4,
+    gaintype: str = "G",
+    chunk_rows: int = 100000,
+    maxiter: int = 100,
+    tolerance: float = 1e-6,
+    pyramid=None,
+    batch_intervals: int = 64
+) -> None:
+    """
+    Function that solves phase-only antenna gains with NumPy and writes them as a standard CASA caltable. DATA,
+    MODEL_DATA, WEIGHT (or WEIGHT_SPECTRUM) and FLAG are read in row chunks and reduced to per solution interval
+    and baseline coherencies, which are solved by stefcal_phase in batches of solution intervals.
+
+    Parameters
+    ----------
+    vis :
+        Input visibility measurement set
+    caltable :
+        Output calibration table
+    field :
+        Select field
+    spw :
+        Select spectral window/channels
+    uvrange :
+        Select data within uvrange (default units meters)
+    refant :
+        Reference antenna names or indexes, separated by commas in order of preference
+    solint :
+        Solution interval: e.g "inf", "60s", "int"
+    combine :
+        Data axes to combine for solving ("scan" and/or "spw")
+    minsnr :
+        Reject solutions below this SNR
+    minblperant :
+        Minimum baseline per antenna
+    gaintype :
+        Type of gain solution ("G" solves each parallel hand, "T" solves both together)
+    chunk_rows :
+        Maximum number of rows read at once
+    maxiter :
+        Maximum number of solver iterations
+    tolerance :
+        Convergence tolerance of the solver
+    pyramid :
+        TimePyramid of the measurement set built with the same field, spw and uvrange. If given, the coherencies
+        are aggregated from it instead of reading the visibilities
+    batch_intervals :
+        Number of solution intervals solved at once
+    """
+    if gaintype not in ("G", "T"):
+        raise ValueError("Error, the native solver only supports the G and T gain types")
+
+    if pyramid is not None:
+        if (pyramid.vis, pyramid.field, pyramid.spw, pyramid.uvrange) != (vis, field, spw, uvrange):
+            raise ValueError("The time pyramid does not match the visibility selection")
+        refants = _parse_refants(refant, pyramid.antenna_names)
+        nant = len(pyramid.antenna_names)
+        aggregated = pyramid.aggregate(solint, combine, gaintype, dense=False)
+        antenna1 = aggregated["antenna1"]
+        antenna2 = aggregated["antenna2"]
+        coherency = aggregated["coherency"]
+        weight_sum = aggregated["weight"]
+        interval_start = aggregated["interval_start"]
+        interval_end = aggregated["interval_end"]
+        interval_scan = aggregated["interval_scan"]
+        interval_field = aggregated["interval_field"]
+        solution_spws = aggregated["spws"]
+    else:
+        combine_scan = "scan" in combine
+        combine_spw = "spw" in combine
+
+        selection = _select_visibilities(vis, field, spw)
+        antenna_names = selection["antenna_names"]
+        nant = len(antenna_names)
+        refants = _parse_refants(refant, antenna_names)
+        spws = selection["spws"]
+        rows = _read_rows(vis, selection)
+
+        interval_index, nint = _solution_intervals(
+            rows["time"], rows["scan"], parse_solint(solint), combine_scan=combine_scan
+        )
+        interval_start = np.full(nint, np.inf)
+        interval_end = np.full(nint, -np.inf)
+        np.minimum.at(interval_start, interval_index, rows["time"] - 0.5 * rows["interval"])
+        np.maximum.at(interval_end, interval_index, rows["time"] + 0.5 * rows["interval"])
+        interval_scan = np.zeros(nint, dtype=np.int64)
+        interval_field = np.zeros(nint, dtype=np.int64)
+        interval_scan[interval_index] = rows["scan"]
+        interval_field[interval_index] = rows["field"]
+
+        nspw_solution = 1 if combine_spw else len(spws)
+        npol = 1 if gaintype == "T" else 2
+        antenna1, antenna2 = np.triu_indices(nant, k=1)
+        # Each baseline is stored once, whatever the order of its antennas in the measurement set
+        baseline_index = np.zeros((nant, nant), dtype=np.int64)
+        baseline_index[antenna1, antenna2] = np.arange(antenna1.size)
+        baseline_index[antenna2, antenna1] = np.arange(antenna1.size)
+        shape = (nint, nspw_solution, npol, antenna1.size)
+        coherency = np.zeros(shape, dtype=np.complex128)
+        weight_sum = np.zeros(shape, dtype=np.float64)
+
+        chunks = _coherency_chunks(vis, selection, uvrange, chunk_rows)
+        for rows_index, spw_id, row_antenna1, row_antenna2, visibility_model, model_power in chunks:
+            spw_index = 0 if combine_spw else spws.index(spw_id)
+            chunk_interval = interval_index[rows_index]
+            visibility_model = np.where(
+                row_antenna1 < row_antenna2, visibility_model, np.conj(visibility_model)
+            )
+            if gaintype == "T":
+                visibility_model = visibility_model.sum(axis=0, keepdims=True)
+                model_power = model_power.sum(axis=0, keepdims=True)
+            pol_index = np.arange(visibility_model.shape[0])[:, None]
+            index = ((chunk_interval[None, :] * nspw_solution + spw_index) * npol +
+                     pol_index) * antenna1.size + baseline_index[row_antenna1,
+                                                                 row_antenna2][None, :]
+            unique_index, inverse = np.unique(index.ravel(), return_inverse=True)
+            coherency.ravel()[unique_index] += np.bincount(
+                inverse, weights=visibility_model.real.ravel()
+            ) + 1j * np.bincount(inverse, weights=visibility_model.imag.ravel())
+            weight_sum.ravel()[unique_index] += np.bincount(inverse, weights=model_power.ravel())
+        solution_spws = [min(spws)] if combine_spw else spws
+
+    gains, snr, antenna_ok = solve_phase_intervals(
+        coherency,
+        weight_sum,
+        antenna1,
+        antenna2,
+        nant,
+        minblperant=minblperant,
+        maxiter=maxiter,
+        tolerance=tolerance,
+        batch_intervals=batch_intervals
+    )
+    flags = ~antenna_ok | (snr < minsnr)
+    gains, reference = reference_phases(gains, flags, refants)
+
+    _write_caltable(
+        vis, caltable, gains, snr, flags, reference[:, :, 0], interval_start, interval_end,
+        interval_scan, interval_field, solution_spws, gaintype
+    )
+
+
+def _write_caltable(
+    vis, caltable, gains, snr, flags, reference, interval_start, interval_end, interval_scan,
+    interval_field, spws, gaintype
+) -> None:
+    """
+    Function that writes gains with shape (interval, spw, pol, antenna) into a new CASA caltable
+    """
+    nint, nspw, npol, nant = gains.shape
+    cb = calibrater()
+    cb.open(filename=vis, compress=False, addcorr=False, addmodel=False)
+    cb.createcaltable(
+        caltable=caltable, partype="Complex", caltype=gaintype + " Jones", singlechan=True
+    )
+    cb.close()
+
+    # One row per interval, spectral window and antenna
+    interval_grid, spw_grid, antenna_grid = np.meshgrid(
+        np.arange(nint), np.arange(nspw), np.arange(nant), indexing="ij"
+    )
+    interval_grid = interval_grid.ravel()
+    spw_grid = spw_grid.ravel()
+    antenna_grid = antenna_grid.ravel()
+    nrows = interval_grid.size
+    # Rows are (interval, spw, antenna) and parameters are (pol, channel, row)
+    cparam = np.moveaxis(gains, 2, -1).reshape(nrows, npol).T[:, None, :]
+    snr_rows = np.moveaxis(snr, 2, -1).reshape(nrows, npol).T[:, None, :]
+    flag_rows = np.moveaxis(flags, 2, -1).reshape(nrows, npol).T[:, None, :]
+    paramerr = np.where(snr_rows > 0.0, 1.0 / np.where(snr_rows > 0.0, snr_rows, 1.0), 0.0)
+
+    with open_table(caltable, nomodify=False) as mytb:
+        mytb.addrows(nrows)
+        mytb.putcol("TIME", 0.5 * (interval_start + interval_end)[interval_grid])
+        mytb.putcol("INTERVAL", (interval_end - interval_start)[interval_grid])
+        mytb.putcol("FIELD_ID", interval_field[interval_grid].astype(np.int32))
+        mytb.putcol("SPECTRAL_WINDOW_ID", np.asarray(spws, dtype=np.int32)[spw_grid])
+        mytb.putcol("ANTENNA1", antenna_grid.astype(np.int32))
+        mytb.putcol("ANTENNA2", reference.ravel()[interval_grid * nspw + spw_grid].astype(np.int32))
+        mytb.putcol("SCAN_NUMBER", interval_scan[interval_grid].astype(np.int32))
+        mytb.putcol("OBSERVATION_ID", np.zeros(nrows, dtype=np.int32))
+        mytb.putcol("CPARAM", cparam)
+        mytb.putcol("PARAMERR", paramerr.astype(np.float32))
+        mytb.putcol("SNR", snr_rows.astype(np.float32))
+        mytb.putcol("FLAG", flag_rows)
+        if "WEIGHT" in mytb.colnames():
+            mytb.putcol("WEIGHT", np.ones(cparam.shape, dtype=np.float32))
+        mytb.flush()
@@ -1,91 +1,124 @@
 from dataclasses import dataclass
 
-from casatasks import applycal, gaincal, rmtables
+from casatasks import gaincal, rmtables
 
+from .phase_solver import native_gaincal
 from .selfcal import Selfcal
+from ..utils.instrumentation import tracer
 
 
 @dataclass(init=False, repr=True)
 class Phasecal(Selfcal):
 
-    def __init__(self, **kwargs):
+    def __init__(self, solver: str = "gaincal", **kwargs):
         """
         Phase only self-calibration object
 
         Parameters
         ----------
+        solver :
+            Gain solver to use. "gaincal" runs the CASA gaincal task, "native" solves the phases with NumPy and only
+            supports the G and T gain types
         kwargs :
             General self-calibration arguments
         """
         super().__init__(**kwargs)
 
+        if solver not in ("gaincal", "native"):
+            raise ValueError("Error, solver should be either 'gaincal' or 'native'")
+        self.__solver = solver
+
         self._calmode = 'p'
+        if solver == "native":
+            if self.gaintype not in ("G", "T"):
+                raise ValueError("Error, the native solver only supports the G and T gain types")
+            if self._calmode != 'p':
+                raise ValueError("Error, the native solver only solves phase-only gains")
         self._loops = len(self.solint)
 
         self._copy_directory_at_start()
         self._init_selfcal()
 
     def run(self):
-        caltable = "before_selfcal"
-        self._save_selfcal(caltable_version=caltable, overwrite=True)
-        self._caltables_versions.append(caltable)
+        # A run resumed before its initial imaging finished saves the first version again
+        if not self._initialized:
+            caltable = "before_selfcal"
+            self._save_selfcal(caltable_version=caltable, overwrite=True)
+            self._caltables_versions.append(caltable)
         self._init_run("_original")
 
-        for i in range(0, self._loops):
+        for i in range(self._first_iteration, self._loops):
             caltable = self.output_caltables + 'pcal' + str(i)
             self._caltables.append(caltable)
             rmtables(caltable)
 
             self._set_attributes_from_dicts(i)
 
-            gaincal(
-                vis=self.visfile,
-                caltable=caltable,
-                field=self.imager.field,
-                spw=self.imager.spw,
-                uvrange=self.uvrange,
-                gaintype=self.gaintype,
-                refant=self.refant,
-                calmode=self._calmode,
-                combine=self.combine,
-                solint=self.solint[i],
-                minsnr=self.minsnr,
-                spwmap=self.spwmap,
-                minblperant=self.minblperant
-            )
-
-            self._plot_selfcal(
-                caltable,
-                xaxis="time",
-                yaxis="phase",
-                iteration="antenna",
-                subplot=[4, 2],
-                plotrange=[0, 0, -180, 180],
-                want_plot=self.want_plot
-            )
-
-            version_name = 'before_phasecal_' + str(i)
-            self._save_selfcal(caltable_version=version_name, overwrite=True)
-            self._caltables_versions.append(version_name)
-
-            print("Applying calibration tables to {0} file".format(self.visfile))
-            applycal(
-                vis=self.visfile,
-                field=self.imager.field,
-                spw=self.imager.spw,
-                spwmap=self.spwmap,
-                gaintable=[caltable],
-                gainfield='',
-                calwt=False,
-                flagbackup=False,
-                interp=self.interp,
-                applymode=self.applymode
-            )
-
-            if self.flag_dataset:
-                self._flag_dataset(mode=self.flag_mode)
-
-            self._run_imager(i)
+            self._run_iteration(caltable, i)
 
             if self._finish_selfcal_iteration(i):
                 break
+
+    def _calibrate(self, caltable: str = "", current_iteration: int = 0) -> bool:
+        """
+        Protected method that solves and applies the phase-only gains of one iteration
+
+        Parameters
+        ----------
+        caltable :
+            Output calibration table
+        current_iteration :
+            Iteration number during the self-calibration loop
+
+        Returns
+        -------
+        True if the residual outliers were flagged while applying the gains
+        """
+        solve_vis = self._solve_vis()
+        with tracer.span("gaincal", solver=self.__solver, solint=self.solint[current_iteration]):
+            if self.__solver == "native":
+                native_gaincal(
+                    vis=solve_vis,
+                    caltable=caltable,
+                    field=self.imager.field,
+                    spw=self.imager.spw,
+                    uvrange=self.uvrange,
+                    refant=self.refant,
+                    solint=self.solint[current_iteration],
+                    combine=self.combine,
+                    minsnr=self.minsnr,
+                    minblperant=self.minblperant,
+                    gaintype=self.gaintype
+                )
+            else:
+                gaincal(
+                    vis=solve_vis,
+                    caltable=caltable,
+                    field=self.imager.field,
+                    spw=self.imager.spw,
+                    uvrange=self.uvrange,
+                    gaintype=self.gaintype,
+                    refant=self.refant,
+                    calmode=self._calmode,
+                    combine=self.combine,
+                    solint=self.solint[current_iteration],
+                    minsnr=self.minsnr,
+                    spwmap=self.spwmap,
+                    minblperant=self.minblperant
+                )
+
+        self._plot_selfcal(
+            caltable,
+            xaxis="time",
+            yaxis="phase",
+            iteration="antenna",
+            subplot=[4, 2],
+            plotrange=[0, 0, -180, 180],
+            want_plot=self.want_plot
+        )
+
+        version_name = 'before_phasecal_' + str(current_iteration)
+        self._save_selfcal(caltable_version=version_name, overwrite=True)
+        self._caltables_versions.append(version_name)
+
+        return self._applycal(gaintable=[caltable], spwmap=self.spwmap)
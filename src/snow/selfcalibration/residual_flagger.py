@@ -0,0 +1,222 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+import numpy as np
+from casatools import ms
+
+from ..utils.flag_utils import residual_outlier_flags
+from ..utils.ms_metadata import metadata, open_table
+from ..utils.workspace import parse_size
+
+DATACOLUMNS = {"residual": "CORRECTED_DATA", "residual_data": "DATA"}
+
+# Estimated peak bytes per visibility sample of a chunk in flight: the data, model and flags that are read, the
+# residuals, the dense (baseline, correlation, channel, time) cubes and the temporaries of the robust statistics
+BYTES_PER_SAMPLE = 64
+
+# Default maximum number of threads. The statistics are memory bound, so more threads mostly add chunks in flight
+MAX_DEFAULT_WORKERS = 4
+
+
+def baseline_outlier_flags(
+    residual: np.ndarray,
+    flag: np.ndarray,
+    antenna1: np.ndarray,
+    antenna2: np.ndarray,
+    time: np.ndarray,
+    timedevscale: float = 3.0,
+    freqdevscale: float = 3.0
+) -> np.ndarray:
+    """
+    Function that flags residual outliers of a chunk of rows. The rows are gridded into a
+    (baseline, correlation, channel, time) cube so the robust statistics along time are calculated per baseline
+    and channel, and the statistics along frequency per baseline and time, all at once.
+
+    Parameters
+    ----------
+    residual :
+        Complex residual visibilities with shape (correlation, channel, row)
+    flag :
+        Current flags with the same shape as the residuals
+    antenna1 :
+        First antenna of each row
+    antenna2 :
+        Second antenna of each row
+    time :
+        Time of each row
+    timedevscale :
+        Flag a point if its deviation along time is larger than timedevscale times the robust deviation
+    freqdevscale :
+        Flag a point if its deviation along frequency is larger than freqdevscale times the robust deviation
+
+    Returns
+    -------
+    The updated flags with shape (correlation, channel, row)
+    """
+    ncorr, nchan, nrow = residual.shape
+    _, baseline_index = np.unique(
+        antenna1.astype(np.int64) * (antenna2.max() + 1) + antenna2, return_inverse=True
+    )
+    _, time_index = np.unique(time, return_inverse=True)
+    nbaselines = baseline_index.max() + 1
+    ntimes = time_index.max() + 1
+
+    # Missing baseline and time samples are flagged so they never enter the statistics
+    residual_cube = np.zeros((nbaselines, ntimes, ncorr, nchan), dtype=residual.dtype)
+    flag_cube = np.ones((nbaselines, ntimes, ncorr, nchan), dtype=bool)
+    residual_cube[baseline_index, time_index] = np.moveaxis(residual, 2, 0)
+    flag_cube[baseline_index, time_index] = np.moveaxis(flag, 2, 0)
+
+    # residual_outlier_flags works on (independent, channel, time) arrays
+    shape = (nbaselines * ncorr, nchan, ntimes)
+    flag_cube = residual_outlier_flags(
+        np.moveaxis(residual_cube, 1, 3).reshape(shape),
+        np.moveaxis(flag_cube, 1, 3).reshape(shape),
+        timedevscale=timedevscale,
+        freqdevscale=freqdevscale
+    ).reshape(nbaselines, ncorr, nchan, ntimes)
+    return np.moveaxis(flag_cube[baseline_index, :, :, time_index], 0, 2)
+
+
+def _flag_chunk(
+    data: np.ndarray, model: np.ndarray, flag: np.ndarray, antenna1: np.ndarray,
+    antenna2: np.ndarray, time: np.ndarray, timedevscale: float, freqdevscale: float
+) -> np.ndarray:
+    if np.all(flag):
+        return flag
+    return baseline_outlier_flags(
+        data - model,
+        flag,
+        antenna1,
+        antenna2,
+        time,
+        timedevscale=timedevscale,
+        freqdevscale=freqdevscale
+    )
+
+
+def native_flagdata(
+    vis: str = "",
+    datacolumn: str = "residual",
+    field: str = "",
+    spw: str = "",
+    timedevscale: float = 3.0,
+    freqdevscale: float = 3.0,
+    memory_budget: Union[int, float, str] = "2GB",
+    chunk_rows: int = None,
+    workers: int = None
+) -> int:
+    """
+    Function that flags residual visibility outliers with NumPy as an alternative to flagdata in rflag mode. Row
+    chunks are read sequentially, their robust per-baseline, per-time and per-channel MAD statistics are calculated
+    in a thread pool while the next chunks are read, and the flags of the chunks that changed are written back with
+    a single putcol per column. The number of rows per chunk is derived from a memory budget shared by all the
+    chunks in flight and from the number of channels and correlations of each data description.
+
+    Parameters
+    ----------
+    vis :
+        Input visibility measurement set. It needs a MODEL_DATA column
+    datacolumn :
+        "residual" (CORRECTED_DATA - MODEL_DATA) or "residual_data" (DATA - MODEL_DATA)
+    field :
+        Select field
+    spw :
+        Select spectral window
+    timedevscale :
+        For time analysis, flag a point if its deviation is larger than timedevscale times the robust deviation
+    freqdevscale :
+        For spectral analysis, flag a point if its deviation is larger than freqdevscale times the robust deviation
+    memory_budget :
+        Approximate maximum memory used by the chunks in flight, in bytes or as a string with units, e.g "2GB"
+    chunk_rows :
+        Maximum number of rows flagged at once. Default is None, and it means that only the memory budget bounds
+        the chunks
+    workers :
+        Number of threads. Default is the number of CPUs, up to 4
+
+    Returns
+    -------
+    The number of newly flagged samples
+    """
+    if datacolumn not in DATACOLUMNS:
+        raise ValueError("Error, datacolumn should be either 'residual' or 'residual_data'")
+    colnames = metadata.colnames(vis)
+    if "MODEL_DATA" not in colnames:
+        raise ValueError("The native flagger needs a MODEL_DATA column in " + vis)
+    if DATACOLUMNS[datacolumn] not in colnames:
+        raise ValueError("There is no " + DATACOLUMNS[datacolumn] + " column in " + vis)
+    if workers is None:
+        workers = min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1)
+    memory_budget = parse_size(memory_budget)
+    if memory_budget <= 0:
+        raise ValueError("Error, memory_budget should be positive")
+
+    myms = ms()
+    selection = myms.msseltoindex(vis=vis, field=field, spw=spw)
+    myms.done()
+
+    with open_table(vis + "/DATA_DESCRIPTION") as mytb:
+        dd_spw = mytb.getcol("SPECTRAL_WINDOW_ID")
+
+    ddids = [ddid for ddid in range(len(dd_spw)) if spw == "" or dd_spw[ddid] in selection["spw"]]
+    where = "ANTENNA1 != ANTENNA2 && DATA_DESC_ID IN [{0}]".format(",".join(map(str, ddids)))
+    if field != "":
+        where += " && FIELD_ID IN [{0}]".format(",".join(map(str, selection["field"])))
+
+    nflagged = 0
+
+    def write_flags(subtable, start, flag, new_flag):
+        nonlocal nflagged
+        changed = np.count_nonzero(new_flag & ~flag)
+        if changed > 0:
+            subtable.putcol("FLAG", new_flag, startrow=start)
+            subtable.putcol("FLAG_ROW", np.all(new_flag, axis=(0, 1)), startrow=start)
+            nflagged += changed
+
+    with open_table(vis, nomodify=False) as mytb:
+        selected = mytb.query(where)
+        # The table tool is not thread safe, so reads and writes stay in this thread
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for ddid in ddids:
+                subtable = selected.query("DATA_DESC_ID=={0}".format(ddid))
+                if subtable.nrows() == 0:
+                    subtable.close()
+                    continue
+                # Up to workers + 1 chunks are in flight
+                ncorr, nchan = subtable.getcell("FLAG", 0).shape
+                ddid_chunk_rows = max(
+                    1, memory_budget // ((workers + 1) * ncorr * nchan * BYTES_PER_SAMPLE)
+                )
+                if chunk_rows is not None:
+                    ddid_chunk_rows = min(chunk_rows, ddid_chunk_rows)
+                pending = deque()
+                for start in range(0, subtable.nrows(), ddid_chunk_rows):
+                    nrow = min(ddid_chunk_rows, subtable.nrows() - start)
+                    flag = subtable.getcol("FLAG", startrow=start, nrow=nrow)
+                    future = executor.submit(
+                        _flag_chunk,
+                        # Arrays are (correlation, channel, row)
+                        subtable.getcol(DATACOLUMNS[datacolumn], startrow=start, nrow=nrow),
+                        subtable.getcol("MODEL_DATA", startrow=start, nrow=nrow),
+                        flag,
+                        subtable.getcol("ANTENNA1", startrow=start, nrow=nrow),
+                        subtable.getcol("ANTENNA2", startrow=start, nrow=nrow),
+                        subtable.getcol("TIME", startrow=start, nrow=nrow),
+                        timedevscale,
+                        freqdevscale
+                    )
+                    pending.append((start, flag, future))
+                    # Bounding the chunks in flight keeps the memory within the budget
+                    while len(pending) > workers:
+                        pending_start, pending_flag, pending_future = pending.popleft()
+                        write_flags(subtable, pending_start, pending_flag, pending_future.result())
+                while pending:
+                    pending_start, pending_flag, pending_future = pending.popleft()
+                    write_flags(subtable, pending_start, pending_flag, pending_future.result())
+                subtable.close()
+        selected.close()
+        mytb.flush()
+    return nflagged
@@ -1,20 +1,65 @@
 from __future__ import annotations
 
 import copy
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import shutil
 import warnings
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
 from dataclasses import dataclass
+from typing import Union
 
-from casatasks import (clearcal, delmod, flagdata, flagmanager, split, statwt, uvsub)
-from casatools import table
+import numpy as np
+from casatasks import (
+    applycal, clearcal, delmod, flagdata, flagmanager, partition, split, statwt, uvsub
+)
 
 from ..imaging.imager import Imager
-from ..utils.selfcal_utils import is_column_in_ms
-
-tb = table()
+from ..utils.column_checkpoint import ColumnCheckpoint
+from ..utils.flag_store import FlagStore
+from ..utils.instrumentation import tracer
+from ..utils.parallel_utils import get_mpi_world_size, is_mpi_enabled, is_multims
+from ..utils.run_manifest import RunManifest, checksum_path
+from ..utils.ms_metadata import metadata, open_table
+from ..utils.selfcal_utils import is_column_in_ms, parse_solint
+from ..utils.snapshot_utils import get_mutable_storage_managers, snapshot_ms
+from ..utils.solve_cache import SolveCache
+from ..utils.workspace import Workspace
+from .apply_engine import apply_gains, check_native_apply
+from .residual_flagger import native_flagdata
+from .time_pyramid import TimePyramid
+from .vis_quality import visibility_quality
+
+
+def _evaluate_candidate(selfcal: Selfcal, caltable: str = "", current_iteration: int = 0) -> dict:
+    """
+    Function that runs one self-calibration iteration of a candidate in a worker process
+
+    Parameters
+    ----------
+    selfcal :
+        Self-calibration object working on its own measurement set snapshot
+    caltable :
+        Output calibration table of the candidate
+    current_iteration :
+        Iteration number during the self-calibration loop
+
+    Returns
+    -------
+    A dictionary with the state of the candidate after the iteration
+    """
+    selfcal._run_iteration(caltable, current_iteration)
+    return {
+        "psnr": selfcal.imager.psnr,
+        "peak": selfcal.imager.peak,
+        "stdv": selfcal.imager.stdv,
+        "visfile": selfcal.visfile,
+        "input_caltable": selfcal.input_caltable,
+        "caltables_versions": selfcal._caltables_versions,
+        "imagename": selfcal._last_image
+    }
 
 
 @dataclass(init=False, repr=True)
@@ -43,7 +88,24 @@ class Selfcal(metaclass=ABCMeta):
         combine: str = "",
         flag_dataset: bool = False,
         restore_psnr: bool = False,
-        subtract_source: bool = False
+        subtract_source: bool = False,
+        snapshot_mode: str = "copy",
+        rollback_mode: str = "snapshot",
+        checkpoint_compress: bool = False,
+        async_snapshot: bool = False,
+        run_manifest: str = None,
+        candidate_workers: int = None,
+        apply_engine: str = "applycal",
+        trace_file: str = None,
+        acceptance: str = "psnr",
+        proxy_tolerance: float = 0.0,
+        parallel: bool = False,
+        separationaxis: str = "auto",
+        numsubms: int = None,
+        flag_backend: str = "flagmanager",
+        solve_average: bool = False,
+        solve_chanbin: int = 1,
+        disk_budget: Union[int, float, str] = None
     ):
         """
         General self-calibration class
@@ -69,7 +131,9 @@ class Selfcal(metaclass=ABCMeta):
         uvrange :
             Select data within uvrange (default units meters)
         solint :
-            Solution interval: e.g "inf", "60s", "int"
+            Solution interval: e.g "inf", "60s", "int". An entry can also be a list of candidates, e.g. ["60s", "30s"]
+            or [{"solint": "60s", "minsnr": 2.0}, {"solint": "60s", "combine": "spw"}], that are evaluated
+            concurrently on their own measurement set snapshots. The candidate with the highest PSNR is kept
         varchange_imager :
             Dictionary of imager variables that change on each iteration
         varchange_selfcal :
@@ -85,7 +149,9 @@ class Selfcal(metaclass=ABCMeta):
         applymode :
             Calibration mode - ””=”calflag”, ”calflagstrict”, ”trial”, ”flagonly”, ”flagonlystrict”, or ”calonly”
         flag_mode :
-            Flag mode operation. e.g : "manual", "clip", "quack", "shadow", "elevation", "tfcrop", "rflag"
+            Flag mode operation. e.g : "manual", "clip", "quack", "shadow", "elevation", "tfcrop", "rflag". "native"
+            flags the residual outliers with robust per-baseline, per-time and per-channel statistics computed with
+            NumPy in a thread pool instead of calling flagdata
         combine :
             Data axes to combine for solving
         flag_dataset :
@@ -94,6 +160,66 @@ class Selfcal(metaclass=ABCMeta):
             Restores the dataset if the peak signal-to-noise ratio decreases
         subtract_source :
             Subtract source model if needed
+        snapshot_mode :
+            How measurement set copies are created. "copy" copies the whole measurement set, "link" hard-links the
+            files of columns that are never written during self-calibration and only copies the mutated ones
+        rollback_mode :
+            How the last accepted state is kept when restore_psnr is True. "snapshot" keeps a copy of the measurement
+            set per improving iteration, "checkpoint" only saves the CORRECTED_DATA, FLAG, FLAG_ROW and MODEL_DATA
+            columns and restores them in place
+        checkpoint_compress :
+            Whether to compress the column checkpoints or not
+        async_snapshot :
+            Whether to copy the accepted measurement set in a background thread while the next gain solution is
+            calculated. The loop only waits for the copy before the measurement set is modified or restored
+        run_manifest :
+            Absolute path to a JSON file where the state of the run is recorded after every iteration. If the file
+            already exists the object is restored from it instead of copying the input measurement set, and the
+            run can be continued with resume()
+        candidate_workers :
+            Maximum number of processes evaluating candidates concurrently. Default is one per candidate
+        apply_engine :
+            How the calibration tables are applied. "applycal" uses the CASA task, "native" applies the antenna gains
+            in a single pass over the measurement set and, if flag_dataset is True, flags the residual outliers in
+            that same pass instead of running flagdata afterwards
+        trace_file :
+            Absolute path to a JSON file where the timing, CPU, memory and I/O spans of every stage (gain solving,
+            calibration, flagging, flag backups, measurement set copies, imaging and statistics) are written in the
+            Chrome trace format after the initial imaging and after every iteration
+        acceptance :
+            How iterations are accepted. "psnr" images every iteration and compares the PSNR. "proxy" first compares
+            the residual visibility RMS (CORRECTED_DATA - MODEL_DATA) before and after applying the new gains, on the
+            same visibility samples and before flagging, and only images if it drops more than expected from fitting
+            the gains to noise, or at the final iteration. Iterations whose proxy does not improve are rejected
+            without imaging and recorded as such in the run manifest. The closure-phase scatter and the gain SNR are
+            recorded with each iteration. It needs restore_psnr to be True
+        proxy_tolerance :
+            Minimum fractional decrease of the residual visibility RMS, beyond the decrease expected from fitting the
+            gains to noise, for the proxy to count as an improvement
+        parallel :
+            Whether to partition the working measurement set into a multi-MS when it is copied at the start. When
+            CASA runs under MPI (mpicasa/mpirun with casampi), applycal and flagdata then process the sub-MSs in
+            parallel and the imager is run with parallel=True
+        separationaxis :
+            Axis used to partition the multi-MS ("auto", "scan", "spw" or "baseline")
+        numsubms :
+            Number of sub-MSs. Default is one per MPI process, or "auto" when MPI is not enabled
+        flag_backend :
+            How flag versions are saved and restored. "flagmanager" uses the CASA flag manager, which writes a full
+            copy of the flags per version. "native" keeps run-length encoded differences against the first saved
+            version in a .flagstore directory next to the measurement set
+        solve_average :
+            Whether to solve the gains on a copy of the measurement set averaged to the shortest solution interval
+            of the loop. The copy is reused by every iteration until the model, the flags or the weights change
+        solve_chanbin :
+            Number of channels averaged together in the solve copy. It needs a spectral window selection without
+            channel ranges, since the channels of the averaged copy no longer match them
+        disk_budget :
+            Enables the managed workspace. Measurement set copies, calibration tables and images of rejected
+            iterations are deleted as soon as they are rejected, and superseded measurement set copies are deleted
+            from the oldest while the artifacts use more than disk_budget bytes (or a string with units, e.g
+            "500GB"). A budget of zero deletes them as soon as they are superseded. The input measurement set is
+            never deleted. Default is None, which keeps every artifact
         """
         # Public variables
         self.visfile = visfile
@@ -118,14 +244,50 @@ class Selfcal(metaclass=ABCMeta):
         self.flag_dataset = flag_dataset
         self.restore_psnr = restore_psnr
         self.subtract_source = subtract_source
+        self.snapshot_mode = snapshot_mode
+        self.rollback_mode = rollback_mode
+        self.checkpoint_compress = checkpoint_compress
+        self.async_snapshot = async_snapshot
+        self.run_manifest = run_manifest
+        self.candidate_workers = candidate_workers
+        self.apply_engine = apply_engine
+        self.trace_file = trace_file
+        self.acceptance = acceptance
+        self.proxy_tolerance = proxy_tolerance
+        self.parallel = parallel
+        self.separationaxis = separationaxis
+        self.numsubms = numsubms
+        self.flag_backend = flag_backend
+        self.solve_average = solve_average
+        self.solve_chanbin = solve_chanbin
+        self.disk_budget = disk_budget
 
         # Protected variables
         self._caltables = []
         self._caltables_versions = []
+        # Number of flag versions saved up to the last completed iteration
+        self._completed_versions = 0
+        self._checksum_cache = {}
         self._psnr_history = []
         self._calmode = ""
         self._loops = 0
         self._psnr_visfile_backup = self.visfile
+        self._checkpoint = None
+        self._snapshot_executor = None
+        self._snapshot_future = None
+        self._original_visfile = self.visfile
+        self._first_iteration = 0
+        self._iterations = []
+        self._solve_cache = None
+        self._workspace = Workspace(disk_budget) if disk_budget is not None else None
+        self._initialized = False
+        self._working_ms_flag_version = ""
+        self._finished = False
+        self._resumed = False
+        self._quality = None
+        self._proxy_rejected = False
+        self._last_image = None
+        self._accepted_model = None
 
         if self.imager is None:
             self._image_name = ""
@@ -133,21 +295,46 @@ class Selfcal(metaclass=ABCMeta):
         if output_caltables is None:
             self.output_caltables = self.imager.output
 
+        self._check_varchange(len(self.solint))
+
+        if self.snapshot_mode not in ("copy", "link"):
+            raise ValueError("Error, snapshot_mode should be either 'copy' or 'link'")
+
+        if self.rollback_mode not in ("snapshot", "checkpoint"):
+            raise ValueError("Error, rollback_mode should be either 'snapshot' or 'checkpoint'")
+
+        if self.apply_engine not in ("applycal", "native"):
+            raise ValueError("Error, apply_engine should be either 'applycal' or 'native'")
+
+        if self.apply_engine == "native":
+            check_native_apply(self.applymode, [self.input_caltable])
+
+        if self.acceptance not in ("psnr", "proxy"):
+            raise ValueError("Error, acceptance should be either 'psnr' or 'proxy'")
+
+        if self.acceptance == "proxy" and not self.restore_psnr:
+            raise ValueError("Error, the proxy acceptance needs restore_psnr to be True")
+
+        if self.flag_backend not in ("flagmanager", "native"):
+            raise ValueError("Error, flag_backend should be either 'flagmanager' or 'native'")
+
+        if self.solve_chanbin < 1:
+            raise ValueError("Error, solve_chanbin should be at least 1")
+
+        spws = [self.imager.spw]
         if self.varchange_imager is not None:
-            list_of_values = [value for key, value in self.varchange_imager.items()]
-            it = iter(list_of_values)
-            if not all(len(l) == len(self.solint) for l in it):
-                raise ValueError(
-                    "Error, length of solint and variable that changes through iterations must be the same"
-                )
+            spws += list(self.varchange_imager.get("spw", []))
+        if self.solve_chanbin > 1 and any(":" in spw for spw in spws):
+            raise ValueError(
+                "Error, solve_chanbin cannot be larger than 1 with a channel selection in the spw"
+            )
 
-        if self.varchange_selfcal is not None:
-            list_of_values = [value for key, value in self.varchange_selfcal.items()]
-            it = iter(list_of_values)
-            if not all(len(l) == len(self.solint) for l in it):
-                raise ValueError(
-                    "Error, length of solint and variable that changes through iterations must be the same"
+        if self.parallel:
+            if not is_mpi_enabled():
+                warnings.warn(
+                    "CASA is not running under MPI, the measurement set is partitioned but tasks run serially"
                 )
+            self.imager.parallel = True
 
         if self.subtract_source:
             if self.imager.getPhaseCenter() != "":
@@ -155,6 +342,13 @@ class Selfcal(metaclass=ABCMeta):
                     "Error, phase center needs to be set if a source is going to be subtracted"
                 )
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Executors and futures cannot be sent to worker processes
+        state["_snapshot_executor"] = None
+        state["_snapshot_future"] = None
+        return state
+
     @property
     def imager(self):
         return self.__imager
@@ -194,6 +388,10 @@ class Selfcal(metaclass=ABCMeta):
             self.__input_caltable = ""
 
     def _copy_directory_at_start(self):
+        if self.run_manifest is not None and os.path.exists(self.run_manifest):
+            self._load_run_manifest()
+            return
+
         if self.visfile is not None:
             path_object = Path(self.visfile)
 
@@ -204,11 +402,44 @@ class Selfcal(metaclass=ABCMeta):
             # Copying dataset and overwriting if it has already been created
             if os.path.exists(current_visfile):
                 shutil.rmtree(current_visfile)
-            shutil.copytree(self.visfile, current_visfile)
+            if self.parallel and not is_multims(self.visfile):
+                self._partition_ms(current_visfile)
+            else:
+                snapshot_ms(self.visfile, current_visfile, mode=self.snapshot_mode)
             self.visfile = current_visfile
             self.imager.inputvis = current_visfile
+            self._track_artifact(current_visfile, "accepted", "ms")
+
+        self._write_run_manifest()
+
+    def _partition_ms(self, output_visfile: str = "") -> None:
+        """
+        Protected function that partitions the input measurement set into a multi-MS that is used as the working copy
+
+        Parameters
+        ----------
+        output_visfile :
+            Absolute path to the output multi-MS
+        """
+        numsubms = self.numsubms
+        if numsubms is None:
+            numsubms = "auto"
+            if is_mpi_enabled():
+                # One sub-MS per server, the first MPI process is the client
+                numsubms = max(get_mpi_world_size() - 1, 1)
+        print("Partitioning {0} into a multi-MS by {1}".format(self.visfile, self.separationaxis))
+        with tracer.span("partition", separationaxis=self.separationaxis, numsubms=numsubms):
+            partition(
+                vis=self.visfile,
+                outputvis=output_visfile,
+                createmms=True,
+                separationaxis=self.separationaxis,
+                numsubms=numsubms,
+                datacolumn="all",
+                flagbackup=False
+            )
 
-    def _copy_directory_during_iterations(self, iteration):
+    def _copy_directory_during_iterations(self, iteration, background=False):
         path_object = Path(self.visfile)
 
         current_visfile = "{0}_{2}{1}".format(
@@ -218,13 +449,212 @@ class Selfcal(metaclass=ABCMeta):
         # Copying dataset and overwriting if it has already been created
         if os.path.exists(current_visfile):
             shutil.rmtree(current_visfile)
-        shutil.copytree(self.visfile, current_visfile)
+        if background:
+            mutable_storage_managers = None
+            if self.snapshot_mode == "link":
+                # The table tool is only used from the main thread
+                mutable_storage_managers = get_mutable_storage_managers(self.visfile)
+            if self._snapshot_executor is None:
+                self._snapshot_executor = ThreadPoolExecutor(max_workers=1)
+            self._snapshot_future = self._snapshot_executor.submit(
+                snapshot_ms,
+                self.visfile,
+                current_visfile,
+                mode=self.snapshot_mode,
+                mutable_storage_managers=mutable_storage_managers
+            )
+        else:
+            snapshot_ms(self.visfile, current_visfile, mode=self.snapshot_mode)
 
         return current_visfile
 
+    def _wait_for_snapshot(self) -> None:
+        """
+        Protected function that blocks until the background copy of the measurement set, if any, has finished
+        """
+        if self._snapshot_future is not None:
+            self._snapshot_future.result()
+            self._snapshot_future = None
+
+    def _write_run_manifest(self) -> None:
+        """
+        Protected function that records the current state of the run in the run manifest, if any
+        """
+        if self.run_manifest is None:
+            return
+        artifacts = [caltable for caltable in self._caltables if os.path.exists(caltable)]
+        if self.input_caltable != "":
+            artifacts.append(self.input_caltable)
+        state = {
+            "calmode": self._calmode,
+            "original_visfile": self._original_visfile,
+            "visfile": self.visfile,
+            "backup_visfile": self._psnr_visfile_backup,
+            "initialized": self._initialized,
+            "working_ms_flag_version": self._working_ms_flag_version,
+            "finished": self._finished,
+            "solint": self.solint,
+            "input_caltable": self.input_caltable,
+            "caltables": self._caltables,
+            "caltables_versions": self._caltables_versions,
+            "completed_caltables_versions": self._completed_versions,
+            "psnr_history": self._psnr_history,
+            "iterations": self._iterations,
+            "accepted_model": self._accepted_model,
+            # Unchanged calibration tables are not read again
+            "checksums": {
+                artifact: checksum_path(artifact, self._checksum_cache)
+                for artifact in artifacts
+            }
+        }
+        RunManifest(self.run_manifest).save(state)
+
+    def _write_trace(self) -> None:
+        """
+        Protected function that writes the recorded instrumentation spans to the trace file, if any
+        """
+        if self.trace_file is not None:
+            tracer.save(self.trace_file)
+
+    def _load_run_manifest(self) -> None:
+        """
+        Protected function that restores the state of the run from the run manifest. If an iteration was interrupted
+        after the working measurement set was modified, the measurement set is brought back to the last accepted
+        state before resuming.
+        """
+        manifest = RunManifest(self.run_manifest)
+        state = manifest.load()
+        if state["calmode"] != self._calmode or state["original_visfile"] != self._original_visfile:
+            raise ValueError(
+                "Error, the run manifest " + self.run_manifest +
+                " does not belong to this self-calibration object"
+            )
+        manifest.verify_checksums(state, self._checksum_cache)
+        print("Restoring self-calibration run from {0}".format(self.run_manifest))
+
+        self.visfile = state["visfile"]
+        self.imager.inputvis = state["visfile"]
+        self._psnr_visfile_backup = state["backup_visfile"]
+        self._initialized = state["initialized"]
+        self._working_ms_flag_version = state["working_ms_flag_version"]
+        self._finished = state["finished"]
+        self.solint = state["solint"]
+        self.input_caltable = state["input_caltable"]
+        self._caltables = state["caltables"]
+        self._caltables_versions = state["caltables_versions"]
+        self._completed_versions = state.get(
+            "completed_caltables_versions", len(self._caltables_versions)
+        )
+        self._psnr_history = state["psnr_history"]
+        self._iterations = state["iterations"]
+        self._accepted_model = state.get("accepted_model")
+        self._first_iteration = len(self._iterations)
+        self._resumed = True
+
+        # The original measurement set is never overwritten
+        has_accepted_copy = self._psnr_visfile_backup not in (self.visfile, self._original_visfile)
+        if self._working_ms_flag_version != "" and not self._finished:
+            print("The last iteration was interrupted - restoring the last accepted state...")
+            if self.rollback_mode == "checkpoint" and self.restore_psnr:
+                self._checkpoint = ColumnCheckpoint(
+                    directory=self.visfile + ".checkpoints", compress=self.checkpoint_compress
+                )
+                self._checkpoint.restore(self.visfile, "accepted")
+            elif has_accepted_copy:
+                shutil.rmtree(self.visfile)
+                snapshot_ms(self._psnr_visfile_backup, self.visfile, mode=self.snapshot_mode)
+            else:
+                warnings.warn(
+                    "There is no copy of the last accepted state, only the flags are restored"
+                )
+                self._restore_flag_version(self._working_ms_flag_version)
+            self._working_ms_flag_version = ""
+        elif self.async_snapshot and has_accepted_copy:
+            # The background copy might have been interrupted
+            shutil.rmtree(self._psnr_visfile_backup, ignore_errors=True)
+            snapshot_ms(self.visfile, self._psnr_visfile_backup, mode=self.snapshot_mode)
+        # Discarding the calibration table and the flag versions of the interrupted iteration
+        self._caltables = self._caltables[:self._first_iteration]
+        self._caltables_versions = self._caltables_versions[:self._completed_versions]
+
+    def resume(self) -> None:
+        """
+        Public function that resumes a self-calibration run from its run manifest, skipping the initial imaging and
+        every iteration that was already completed
+        """
+        if not self._resumed:
+            raise ValueError("Error, the object was not restored from an existing run manifest")
+        if self._finished:
+            print(
+                "The self-calibration run recorded in {0} has already finished".format(
+                    self.run_manifest
+                )
+            )
+            return
+        self.run()
+
+    def _check_varchange(self, iterations: int = 0) -> None:
+        """
+        Protected method that checks that the variables that change through the iterations have one value per
+        iteration
+
+        Parameters
+        ----------
+        iterations :
+            Number of iterations
+        """
+        for varchange in (self.varchange_imager, self.varchange_selfcal):
+            if varchange is not None and not all(
+                len(values) == iterations for values in varchange.values()
+            ):
+                raise ValueError(
+                    "Error, length of solint and variable that changes through iterations must be the same"
+                )
+
+    def _track_artifact(
+        self, path: str = "", role: str = "intermediate", kind: str = "file"
+    ) -> None:
+        """
+        Protected function that registers an artifact in the managed workspace, if it is enabled
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the artifact
+        role :
+            Role of the artifact ("accepted", "rejected" or "intermediate")
+        kind :
+            "ms", "image" or "file"
+        """
+        if self._workspace is not None:
+            self._workspace.track(path, role, kind)
+
+    def _mark_artifact(self, path: str = "", role: str = "intermediate") -> None:
+        """
+        Protected function that changes the role of an artifact of the managed workspace, if it is registered
+        """
+        if self._workspace is not None:
+            self._workspace.mark(path, role)
+
+    def _collect_artifacts(self) -> None:
+        """
+        Protected function that deletes the rejected artifacts and enforces the disk budget of the managed workspace.
+        When the loop has finished, the measurement set copies other than the current one are no longer needed to
+        roll back and become intermediate.
+        """
+        if self._workspace is None:
+            return
+        if self._finished:
+            self._wait_for_snapshot()
+            for path in self._workspace.artifacts("accepted", kind="ms"):
+                if path != os.path.abspath(self.visfile):
+                    self._workspace.mark(path, "intermediate")
+        with tracer.span("collect_artifacts"):
+            self._workspace.collect()
+
     def _save_selfcal(self, caltable_version="", overwrite=True) -> None:
         """
-        Protected function that saves the flags using CASA flag manager
+        Protected function that saves the flags using CASA flag manager or the native flag store
 
         Parameters
         ----------
@@ -237,9 +667,34 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        if overwrite:
-            flagmanager(vis=self.visfile, mode='delete', versionname=caltable_version)
-        flagmanager(vis=self.visfile, mode='save', versionname=caltable_version)
+        # The measurement set is about to be modified
+        self._wait_for_snapshot()
+        if self._initialized:
+            self._working_ms_flag_version = caltable_version
+            self._write_run_manifest()
+        with tracer.span("save_selfcal", version=caltable_version, backend=self.flag_backend):
+            if self.flag_backend == "native":
+                # Versions with the same name are always overwritten
+                FlagStore(self.visfile + ".flagstore").save(self.visfile, caltable_version)
+            else:
+                if overwrite:
+                    flagmanager(vis=self.visfile, mode='delete', versionname=caltable_version)
+                flagmanager(vis=self.visfile, mode='save', versionname=caltable_version)
+
+    def _restore_flag_version(self, caltable_version="") -> None:
+        """
+        Protected function that restores the flags of the current measurement set to a saved version
+
+        Parameters
+        ----------
+        caltable_version :
+            Calibration table version
+        """
+        with tracer.span("restore_flags", version=caltable_version, backend=self.flag_backend):
+            if self.flag_backend == "native":
+                FlagStore(self.visfile + ".flagstore").restore(self.visfile, caltable_version)
+            else:
+                flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
 
     def _reset_selfcal(self, caltable_version="") -> None:
         """
@@ -254,7 +709,7 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
+        self._restore_flag_version(caltable_version)
         clearcal(self.visfile)
         delmod(vis=self.visfile, otf=True, scr=True)
 
@@ -271,7 +726,7 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        flagmanager(vis=self.visfile, mode='restore', versionname=caltable_version)
+        self._restore_flag_version(caltable_version)
         delmod(vis=self.visfile, otf=True, scr=True)
 
     def _init_selfcal(self) -> None:
@@ -283,12 +738,15 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
+        if self._resumed:
+            return
         if self.previous_selfcal is not None:
             if self.previous_selfcal._caltables:
                 self.input_caltable = self.previous_selfcal._caltables[-1]
             else:
                 self.input_caltable = ""
             self._psnr_history = copy.deepcopy(self.previous_selfcal._psnr_history)
+            self._accepted_model = self.previous_selfcal._accepted_model
 
     def _init_run(self, image_name_string: str = "") -> None:
         """
@@ -300,14 +758,50 @@ class Selfcal(metaclass=ABCMeta):
         image_name_string :
             The string of the resulting CASA image name
         """
+        if self._resumed and self._initialized:
+            return
+
         if not self._ismodel_in_dataset() or self.previous_selfcal is None:
             imagename = self._image_name + image_name_string
-            self.imager.run(imagename)
+            self._run_imager_from_accepted_model(imagename)
+            self._accepted_model = imagename
             print("Original: - PSNR: {0:0.3f}".format(self.imager.psnr))
             print("Peak: {0:0.3f} mJy/beam".format(self.imager.peak * 1000.0))
             print("Noise: {0:0.3f} mJy/beam".format(self.imager.stdv * 1000.0))
             self._psnr_history.append(self.imager.psnr)
 
+        self._checkpoint_accepted_state()
+        self._initialized = True
+        self._completed_versions = len(self._caltables_versions)
+        self._write_run_manifest()
+        self._write_trace()
+
+    def _checkpoint_accepted_state(self) -> None:
+        """
+        Protected function that saves the mutable columns of the current measurement set as the last accepted state
+        when the rollback mode is "checkpoint"
+        """
+        if self.restore_psnr and self.rollback_mode == "checkpoint":
+            if self._checkpoint is None:
+                self._checkpoint = ColumnCheckpoint(
+                    directory=self.visfile + ".checkpoints", compress=self.checkpoint_compress
+                )
+            self._checkpoint.save(self.visfile, "accepted")
+
+    def _run_imager_from_accepted_model(self, imagename: str = "") -> None:
+        """
+        Protected method that runs the imager, starting the deconvolution from the model of the last accepted
+        imaging run if the imager uses warm starts
+
+        Parameters
+        ----------
+        imagename :
+            The absolute path to the output image name
+        """
+        self.imager.start_model = self._accepted_model if self.imager.warm_start else None
+        self.imager.run_cached(imagename)
+        self._last_image = imagename
+
     def _run_imager(self, current_iteration: int = 0) -> None:
         """
         Protected method that runs the imager at a certain self-calibration iteration
@@ -319,7 +813,7 @@ class Selfcal(metaclass=ABCMeta):
         """
         imagename = self._image_name + '_' + self._calmode + str(current_iteration)
 
-        self.imager.run(imagename)
+        self._run_imager_from_accepted_model(imagename)
 
         self._psnr_history.append(self.imager.psnr)
 
@@ -331,7 +825,253 @@ class Selfcal(metaclass=ABCMeta):
         print("Peak: {0:0.3f} mJy/beam".format(self.imager.peak * 1000.0))
         print("Noise: {0:0.3f} mJy/beam".format(self.imager.stdv * 1000.0))
 
+    def _run_iteration(self, caltable: str = "", current_iteration: int = 0) -> None:
+        """
+        Protected method that calibrates, flags and images the dataset during one self-calibration iteration
+
+        Parameters
+        ----------
+        caltable :
+            Output calibration table
+        current_iteration :
+            Iteration number during the self-calibration loop
+        """
+        if isinstance(self.solint[current_iteration], list):
+            self._run_candidates(caltable, current_iteration)
+            return
+
+        if self.acceptance == "proxy":
+            with tracer.span("visibility_quality"):
+                quality_before = visibility_quality(
+                    self.visfile, field=self.imager.field, spw=self.imager.spw
+                )
+
+        flagged = self._calibrate(caltable, current_iteration)
+
+        if self.acceptance == "proxy":
+            # Measured before flagging the residual outliers and on the same sample as before the calibration
+            with tracer.span("visibility_quality"):
+                self._quality = visibility_quality(
+                    self.visfile,
+                    caltable=caltable,
+                    field=self.imager.field,
+                    spw=self.imager.spw,
+                    sample_flags=quality_before["sample_flags"]
+                )
+            del self._quality["sample_flags"]
+            improved = self._proxy_improved(quality_before, self._quality)
+            if not improved and current_iteration + 1 < self._loops:
+                print("Visibility proxy did not improve - skipping imaging...")
+                self._proxy_rejected = True
+                return
+
+        if self.flag_dataset and not flagged:
+            self._flag_dataset(mode=self.flag_mode)
+
+        self._run_imager(current_iteration)
+
+    def _proxy_improved(self, quality_before: dict = None, quality_after: dict = None) -> bool:
+        """
+        Protected method that decides whether the residual visibility RMS improved with the new gains. Fitting gains
+        lowers the residuals even if the data are pure noise: with p free gain parameters fitted to N real data
+        values the residual RMS of noise drops by sqrt(1 - p / N). The RMS therefore has to drop below that level,
+        further reduced by proxy_tolerance, to count as an improvement.
+
+        Returns
+        -------
+        True if the proxy improved
+        """
+        parameters_per_solution = 2 if self._calmode == "ap" else 1
+        nparameters = parameters_per_solution * quality_after["gain_solutions"]
+        # Each complex visibility sample is two real values
+        nvalues = 2 * max(quality_after["nsamples"], 1)
+        noise_factor = np.sqrt(max(1.0 - nparameters / nvalues, 0.0))
+        threshold = quality_before["residual_rms"] * noise_factor * (1.0 - self.proxy_tolerance)
+        print(
+            "Residual visibility RMS {0:0.5f} -> {1:0.5f} (threshold {2:0.5f}) - closure phase scatter {3:0.3f} deg - "
+            "gain SNR {4:0.2f}".format(
+                quality_before["residual_rms"], quality_after["residual_rms"], threshold,
+                quality_after["closure_phase_scatter"], quality_after["gain_snr"]
+            )
+        )
+        return quality_after["residual_rms"] < threshold
+
+    def _run_candidates(self, caltable: str = "", current_iteration: int = 0) -> None:
+        """
+        Protected method that evaluates the candidates of an iteration concurrently in a process pool. Each candidate
+        works on its own snapshot of the current measurement set. The candidate with the highest PSNR becomes the
+        result of the iteration while the current measurement set is kept untouched as the last accepted state.
+
+        Parameters
+        ----------
+        caltable :
+            Output calibration table
+        current_iteration :
+            Iteration number during the self-calibration loop
+        """
+        self._wait_for_snapshot()
+        candidates = []
+        for candidate in self.solint[current_iteration]:
+            if not isinstance(candidate, dict):
+                candidate = {"solint": candidate}
+            if "solint" not in candidate:
+                raise ValueError("Error, every candidate needs a solint")
+            candidates.append(candidate)
+
+        path_object = Path(self.visfile)
+        candidate_objects = []
+        for k, candidate in enumerate(candidates):
+            candidate_visfile = "{0}_{2}{1}".format(
+                Path.joinpath(path_object.parent, path_object.stem), path_object.suffix,
+                self._calmode + str(current_iteration) + "cand" + str(k)
+            )
+            if os.path.exists(candidate_visfile):
+                shutil.rmtree(candidate_visfile)
+            snapshot_ms(self.visfile, candidate_visfile, mode=self.snapshot_mode)
+
+            candidate_selfcal = copy.deepcopy(self)
+            candidate_selfcal.visfile = candidate_visfile
+            candidate_selfcal.imager.inputvis = candidate_visfile
+            candidate_selfcal.run_manifest = None
+            candidate_selfcal._solve_cache = None
+            candidate_selfcal._workspace = None
+            # Candidates are always compared by their PSNR
+            candidate_selfcal.acceptance = "psnr"
+            candidate_selfcal._image_name = self._image_name + "_cand" + str(k)
+            candidate_selfcal.solint = list(self.solint)
+            for key, value in candidate.items():
+                if key == "solint":
+                    candidate_selfcal.solint[current_iteration] = value
+                else:
+                    setattr(candidate_selfcal, key, value)
+            candidate_objects.append(candidate_selfcal)
+
+        max_workers = self.candidate_workers
+        if max_workers is None:
+            max_workers = len(candidates)
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _evaluate_candidate, candidate_selfcal, caltable + "_cand" + str(k),
+                    current_iteration
+                ) for k, candidate_selfcal in enumerate(candidate_objects)
+            ]
+            results = [future.result() for future in futures]
+
+        for candidate, result in zip(candidates, results):
+            print("Candidate {0} - PSNR: {1:0.3f}".format(candidate, result["psnr"]))
+        best = max(range(len(results)), key=lambda k: results[k]["psnr"])
+        for k, result in enumerate(results):
+            if k != best:
+                shutil.rmtree(result["visfile"], ignore_errors=True)
+                shutil.rmtree(result["visfile"] + ".flagversions", ignore_errors=True)
+                shutil.rmtree(result["visfile"] + ".flagstore", ignore_errors=True)
+                shutil.rmtree(result["visfile"] + ".solvecache", ignore_errors=True)
+                shutil.rmtree(caltable + "_cand" + str(k), ignore_errors=True)
+                # Like the images of rejected iterations, they are deleted by the managed workspace
+                self._track_artifact(result["imagename"], "rejected", "image")
+
+        # Promoting the best candidate
+        print("Promoting candidate {0}".format(candidates[best]))
+        for key, value in candidates[best].items():
+            if key != "solint":
+                setattr(self, key, value)
+        self.solint = list(self.solint)
+        self.solint[current_iteration] = candidates[best]["solint"]
+        self._caltables[-1] = caltable + "_cand" + str(best)
+        self._caltables_versions = results[best]["caltables_versions"]
+        self.input_caltable = results[best]["input_caltable"]
+        # The current measurement set has not been modified and is the state to go back to
+        self._mark_artifact(self._psnr_visfile_backup, "intermediate")
+        self._psnr_visfile_backup = self.visfile
+        self.visfile = results[best]["visfile"]
+        self.imager.inputvis = results[best]["visfile"]
+        self._track_artifact(self.visfile, "accepted", "ms")
+        self.imager.psnr = results[best]["psnr"]
+        self.imager.peak = results[best]["peak"]
+        self.imager.stdv = results[best]["stdv"]
+        self._last_image = results[best]["imagename"]
+        self._psnr_history.append(self.imager.psnr)
+
     def _finish_selfcal_iteration(self, current_iteration: int = 0) -> bool:
+        """
+        Protected method that finishes self-calibration iterations. It decides whether the iteration is kept and
+        records it in the run manifest.
+
+        Parameters
+        ----------
+        current_iteration :
+            Iteration number during the self-calibration loop
+
+        Returns
+        -------
+        True if the self-calibration loop has to stop
+        """
+        stop = self._check_psnr_iteration(current_iteration)
+        # The model of an accepted iteration belongs to the measurement set state that is kept, while a rejected
+        # one is discarded with its state
+        if not stop and self._last_image is not None:
+            self._accepted_model = self._last_image
+        self._last_image = None
+
+        iteration_record = {
+            "iteration": current_iteration,
+            "solint": self.solint[current_iteration],
+            "accepted": not stop,
+            "psnr": None if self._proxy_rejected else self.imager.psnr
+        }
+        if self._proxy_rejected:
+            iteration_record["rejected_by"] = "proxy"
+            self._proxy_rejected = False
+        if self._quality is not None:
+            iteration_record["quality"] = self._quality
+            self._quality = None
+        if self.varchange_imager is not None:
+            iteration_record["imager"] = {
+                key: value[current_iteration]
+                for key, value in self.varchange_imager.items()
+            }
+        if self.varchange_selfcal is not None:
+            iteration_record["selfcal"] = {
+                key: value[current_iteration]
+                for key, value in self.varchange_selfcal.items()
+            }
+        self._iterations.append(iteration_record)
+        self._working_ms_flag_version = ""
+        self._completed_versions = len(self._caltables_versions)
+        self._finished = stop or current_iteration + 1 >= self._loops
+        self._collect_artifacts()
+        self._write_run_manifest()
+        self._write_trace()
+        return stop
+
+    def _rollback_iteration(self) -> None:
+        """
+        Protected method that discards the calibration table of the current iteration and brings the measurement
+        set back to the last accepted state
+        """
+        rejected_caltable = self._caltables.pop()
+        rejected_visfile = self.visfile
+        if self.rollback_mode == "checkpoint":
+            # Restoring the flags and the last accepted columns in place. Only the virtual model is deleted, the
+            # model column is restored from the checkpoint
+            self._restore_flag_version(caltable_version=self._caltables_versions[-1])
+            delmod(vis=self.visfile, otf=True, scr=False)
+            self._checkpoint.restore(self.visfile, "accepted")
+        else:
+            self._wait_for_snapshot()
+            self._restore_selfcal(caltable_version=self._caltables_versions[-1])
+            # Restoring to last MS
+            self.visfile = self._psnr_visfile_backup
+            self.imager.inputvis = self._psnr_visfile_backup
+        if rejected_visfile != self.visfile:
+            self._track_artifact(rejected_visfile, "rejected", "ms")
+        if rejected_caltable != self.input_caltable:
+            self._track_artifact(rejected_caltable, "rejected")
+
+    def _check_psnr_iteration(self, current_iteration: int = 0) -> bool:
         """
         Protected method that finishes self-calibration iterations. If the PSNR of the current iteration improves then
         a new dataset is created and the measurement set file name is changed. Otherwise the flags are restored to the
@@ -347,6 +1087,12 @@ class Selfcal(metaclass=ABCMeta):
         -------
 
         """
+        if self._proxy_rejected:
+            # The iteration was not imaged, so there is no PSNR nor image to discard
+            print("Restoring to last MS and exiting loop...")
+            self._rollback_iteration()
+            return True
+
         if self.restore_psnr:
             if len(self._psnr_history) > 1:
 
@@ -361,12 +1107,12 @@ class Selfcal(metaclass=ABCMeta):
                     print(
                         "PSNR decreasing or equal in this solution interval - restoring to last MS and exiting loop..."
                     )
-                    self._restore_selfcal(caltable_version=self._caltables_versions[-1])
                     self._psnr_history.pop()
-                    self._caltables.pop()
-                    # Restoring to last MS
-                    self.visfile = self._psnr_visfile_backup
-                    self.imager.inputvis = self._psnr_visfile_backup
+                    self._rollback_iteration()
+                    self._track_artifact(
+                        self._image_name + '_' + self._calmode + str(current_iteration), "rejected",
+                        "image"
+                    )
                     return True
                 else:
                     print(
@@ -374,10 +1120,22 @@ class Selfcal(metaclass=ABCMeta):
                         format(current_iteration)
                     )
 
-                    if current_iteration + 1 < self._loops:
+                    if current_iteration + 1 < self._loops and self.rollback_mode == "checkpoint":
+                        self._checkpoint_accepted_state()
+                    elif current_iteration + 1 < self._loops and self.async_snapshot:
+                        # The accepted state is copied in the background and becomes the backup while the next
+                        # iteration keeps working on the current visfile
+                        self._mark_artifact(self._psnr_visfile_backup, "intermediate")
+                        self._psnr_visfile_backup = self._copy_directory_during_iterations(
+                            current_iteration, background=True
+                        )
+                        self._track_artifact(self._psnr_visfile_backup, "accepted", "ms")
+                    elif current_iteration + 1 < self._loops:
                         current_visfile = self._copy_directory_during_iterations(current_iteration)
+                        self._track_artifact(current_visfile, "accepted", "ms")
 
-                        # Saving old visfile name
+                        # Saving old visfile name, the previous backup is superseded
+                        self._mark_artifact(self._psnr_visfile_backup, "intermediate")
                         self._psnr_visfile_backup = self.visfile
                         # Changing visfile attribute to new current_visfile for selfcal and imager
                         self.visfile = current_visfile
@@ -388,6 +1146,170 @@ class Selfcal(metaclass=ABCMeta):
         else:
             return False
 
+    def _solve_timebin(self) -> float:
+        """
+        Protected method that calculates the averaging time of the solve copy of the measurement set. It is the
+        shortest solution interval of the loop, and never longer than the solutions of the pre-applied calibration
+        table so they can still be applied on the averaged data.
+
+        Returns
+        -------
+        The averaging time in seconds. Zero means no time averaging and infinity averages whole scans
+        """
+        solints = []
+        for solint in self.solint:
+            for candidate in solint if isinstance(solint, list) else [solint]:
+                solints.append(
+                    parse_solint(candidate["solint"] if isinstance(candidate, dict) else candidate)
+                )
+        timebin = min(solints)
+        if self.input_caltable is not None and self.input_caltable != "":
+            with open_table(self.input_caltable) as mytb:
+                timebin = min(timebin, float(np.min(mytb.getcol("INTERVAL"))))
+        return timebin
+
+    def _solve_vis(self) -> str:
+        """
+        Protected method that returns the measurement set the gains are solved on. It is the current measurement
+        set, or its averaged copy if solve_average is True and there is a model column to average.
+
+        Returns
+        -------
+        The absolute path to the measurement set
+        """
+        if not self.solve_average or "MODEL_DATA" not in metadata.colnames(self.visfile):
+            return self.visfile
+        timebin = self._solve_timebin()
+        if timebin <= 0.0 and self.solve_chanbin == 1:
+            return self.visfile
+        if self._solve_cache is None:
+            # Copies of the working measurement set share its DATA column, so the averaged copy is kept next to the
+            # first one and reused after the measurement set is copied
+            self._solve_cache = SolveCache(self.visfile + ".solvecache")
+            self._track_artifact(self._solve_cache.directory, "intermediate")
+        return self._solve_cache.get(self.visfile, timebin, self.solve_chanbin)
+
+    def plan_solints(
+        self, candidates: list = None, min_good_fraction: float = 0.9, apply: bool = False
+    ) -> list:
+        """
+        Public method that plans the solution interval schedule from the expected SNR of the solutions. A time
+        pyramid of the current measurement set is built in one pass and the SNR of every antenna and interval is
+        estimated from the model and the visibility weights of each candidate, without running gaincal. The
+        schedule keeps the candidates, from the longest to the shortest, where at least min_good_fraction of the
+        solutions reach minsnr, so iterations that cannot be solved are skipped. The measurement set needs a model
+        column, e.g. from a previous self-calibration or an imager run with save_model.
+
+        Parameters
+        ----------
+        candidates :
+            Candidate solution intervals. Default are the solution intervals of this object
+        min_good_fraction :
+            Minimum fraction of solutions with SNR above minsnr
+        apply :
+            Whether to replace the solution intervals of this object with the schedule. The variables that change
+            through the iterations must have one value per planned solution interval
+
+        Returns
+        -------
+        The list with the planned solution intervals. A ValueError is raised if no candidate reaches minsnr
+        """
+        if candidates is None:
+            candidates = []
+            for solint in self.solint:
+                for candidate in solint if isinstance(solint, list) else [solint]:
+                    candidates.append(
+                        candidate["solint"] if isinstance(candidate, dict) else candidate
+                    )
+        # Longest intervals first, without duplicates
+        candidates = sorted(set(candidates), key=parse_solint, reverse=True)
+        if "MODEL_DATA" not in metadata.colnames(self.visfile):
+            raise ValueError("Error, the solution interval planner needs a MODEL_DATA column")
+
+        finite = [
+            parse_solint(solint) for solint in candidates if np.isfinite(parse_solint(solint))
+        ]
+        base_solint = "{0}s".format(min(finite)) if finite and min(finite) > 0.0 else "int"
+        with tracer.span("plan_solints", candidates=len(candidates)):
+            pyramid = TimePyramid(
+                self.visfile,
+                field=self.imager.field,
+                spw=self.imager.spw,
+                uvrange=self.uvrange,
+                base_solint=base_solint
+            )
+            schedule = []
+            for solint in candidates:
+                snr = pyramid.expected_snr(
+                    solint,
+                    combine=self.combine,
+                    gaintype="T" if self.gaintype == "T" else "G",
+                    minblperant=self.minblperant
+                )
+                solved = snr[snr > 0.0]
+                good_fraction = np.mean(solved >= self.minsnr) if solved.size > 0 else 0.0
+                print(
+                    "Solint {0}: median expected SNR {1:0.2f} - {2:0.1f}% of the solutions above minsnr"
+                    .format(
+                        solint,
+                        np.median(solved) if solved.size > 0 else 0.0, 100.0 * good_fraction
+                    )
+                )
+                if good_fraction >= min_good_fraction:
+                    schedule.append(solint)
+
+        if not schedule:
+            raise ValueError("Error, none of the candidate solution intervals reaches minsnr")
+        if apply:
+            # The variables that change through the iterations cannot be mapped to a different schedule
+            self._check_varchange(len(schedule))
+            self.solint = schedule
+            self._loops = len(schedule)
+        return schedule
+
+    def _applycal(self, gaintable: list = None, spwmap: list = None) -> bool:
+        """
+        Protected method that applies the calibration tables to the current measurement set using the selected apply
+        engine
+
+        Parameters
+        ----------
+        gaintable :
+            List of calibration tables to apply
+        spwmap :
+            Spectral window map of the calibration tables
+
+        Returns
+        -------
+        True if the residual outliers were also flagged
+        """
+        print("Applying calibration tables to {0} file".format(self.visfile))
+        with tracer.span("applycal", engine=self.apply_engine, vis=self.visfile):
+            if self.apply_engine == "native":
+                return apply_gains(
+                    vis=self.visfile,
+                    gaintables=gaintable,
+                    spwmaps=spwmap,
+                    field=self.imager.field,
+                    spw=self.imager.spw,
+                    interp=self.interp,
+                    applymode=self.applymode,
+                    flag_residuals=self.flag_dataset
+                )
+            applycal(
+                vis=self.visfile,
+                field=self.imager.field,
+                spw=self.imager.spw,
+                spwmap=spwmap,
+                gaintable=gaintable,
+                gainfield='',
+                calwt=False,
+                flagbackup=False,
+                interp=self.interp,
+                applymode=self.applymode
+            )
+        return False
+
     def _flag_dataset(
         self, datacolumn=None, mode="rflag", timedevscale=3.0, freqdevscale=3.0
     ) -> None:
@@ -420,29 +1342,40 @@ class Selfcal(metaclass=ABCMeta):
 
         print("Flagging {0} data column using {1}".format(datacolumn, mode))
 
-        flagdata(
-            vis=self.visfile,
-            mode=mode,
-            datacolumn=datacolumn,
-            field=self.imager.field,
-            timecutoff=5.0,
-            freqcutoff=5.0,
-            freqfit='line',
-            flagdimension='freq',
-            extendflags=False,
-            timedevscale=timedevscale,
-            freqdevscale=freqdevscale,
-            spectralmax=500,
-            extendpols=False,
-            growaround=False,
-            flagneartime=False,
-            flagnearfreq=False,
-            ntime="scan",
-            action='apply',
-            flagbackup=True,
-            overwrite=True,
-            writeflags=True
-        )
+        with tracer.span("flag_dataset", mode=mode, vis=self.visfile):
+            if mode == "native":
+                native_flagdata(
+                    vis=self.visfile,
+                    datacolumn=datacolumn,
+                    field=self.imager.field,
+                    spw=self.imager.spw,
+                    timedevscale=timedevscale,
+                    freqdevscale=freqdevscale
+                )
+                return
+            flagdata(
+                vis=self.visfile,
+                mode=mode,
+                datacolumn=datacolumn,
+                field=self.imager.field,
+                timecutoff=5.0,
+                freqcutoff=5.0,
+                freqfit='line',
+                flagdimension='freq',
+                extendflags=False,
+                timedevscale=timedevscale,
+                freqdevscale=freqdevscale,
+                spectralmax=500,
+                extendpols=False,
+                growaround=False,
+                flagneartime=False,
+                flagnearfreq=False,
+                ntime="scan",
+                action='apply',
+                flagbackup=self.flag_backend == "flagmanager",
+                overwrite=True,
+                writeflags=True
+            )
 
     def _ismodel_in_dataset(self) -> bool:
         """
@@ -452,13 +1385,7 @@ class Selfcal(metaclass=ABCMeta):
         -------
         None
         """
-        tb.open(tablename=self.visfile)
-        columns = tb.colnames()
-        tb.close()
-        if "MODEL_DATA" in columns:
-            return True
-        else:
-            return False
+        return is_column_in_ms(self.visfile, "MODEL_DATA")
 
     def _set_attributes_from_dicts(self, current_iteration: int = 0) -> None:
         """
@@ -548,6 +1475,14 @@ class Selfcal(metaclass=ABCMeta):
     def _uvadd(self):
         uvsub(vis=self.visfile, reverse=True)
 
+    @abstractmethod
+    def _calibrate(self, caltable: str = "", current_iteration: int = 0) -> bool:
+        """
+        Abstract method that solves and applies the gains of one self-calibration iteration. Returns True if the
+        residual outliers were flagged while applying the gains
+        """
+        pass
+
     @abstractmethod
     def run(self):
         """
@@ -0,0 +1,286 @@
+import copy
+import csv
+import itertools
+import multiprocessing
+import os
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+from ..imaging.imager import Imager
+
+# Directories created next to the measurement sets of a point
+COMPANION_SUFFIXES = ("", ".flagversions", ".flagstore", ".solvecache", ".checkpoints")
+
+# Environment variables that bound the threads of the numerical libraries of each worker
+THREAD_LIMIT_VARIABLES = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS"
+)
+
+
+@contextmanager
+def _thread_limits(threads: int = 1):
+    """
+    Context manager that sets the thread limits of the numerical libraries in the environment. Spawned worker
+    processes inherit the environment before they import NumPy or casatools, so the limits are set around the
+    pool instead of in the worker initializer.
+    """
+    previous = {variable: os.environ.get(variable) for variable in THREAD_LIMIT_VARIABLES}
+    for variable in THREAD_LIMIT_VARIABLES:
+        os.environ[variable] = str(threads)
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def _remove_visfiles(visfile: str = "") -> None:
+    """
+    Function that deletes the measurement sets of a point, which are named after its input measurement set, and
+    their companion directories
+    """
+    point_directory = os.path.dirname(visfile)
+    path_object = Path(visfile)
+    suffixes = tuple(path_object.suffix + companion for companion in COMPANION_SUFFIXES)
+    for file_name in os.listdir(point_directory):
+        path = os.path.join(point_directory, file_name)
+        if file_name.startswith(path_object.stem) and file_name.endswith(suffixes):
+            if os.path.islink(path):
+                os.remove(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _run_point(
+    selfcal_class: type,
+    imager: Imager,
+    kwargs: dict = None,
+    visfile: str = "",
+    keep_visfiles: bool = False
+) -> dict:
+    """
+    Function that runs the self-calibration of one point of the grid in a worker process. The point directory is
+    created here with a symbolic link to the input measurement set, so the working copy that the self-calibration
+    makes at start is the only copy of the point and it only exists while the point is running.
+
+    Returns
+    -------
+    A dictionary with the PSNR history, the wall time and the full traceback of the error of the point, if any
+    """
+    start = time.perf_counter()
+    point_directory = os.path.dirname(kwargs["visfile"])
+    try:
+        if os.path.exists(point_directory):
+            shutil.rmtree(point_directory)
+        os.makedirs(point_directory)
+        os.symlink(os.path.abspath(visfile), kwargs["visfile"])
+
+        selfcal = selfcal_class(imager=imager, **kwargs)
+        selfcal.run()
+        result = {
+            "psnr_history": list(selfcal._psnr_history),
+            "visfile": selfcal.visfile,
+            "wall_time_s": time.perf_counter() - start,
+            "error": ""
+        }
+    except Exception:
+        result = {
+            "psnr_history": [],
+            "visfile": "",
+            "wall_time_s": time.perf_counter() - start,
+            "error": traceback.format_exc().strip()
+        }
+    if not keep_visfiles and os.path.isdir(point_directory):
+        _remove_visfiles(kwargs["visfile"])
+    return result
+
+
+class ParameterSweep:
+
+    def __init__(
+        self,
+        selfcal_class: type = None,
+        imager: Imager = None,
+        visfile: str = "",
+        grid: dict = None,
+        workdir: str = "",
+        max_workers: int = None,
+        threads_per_worker: int = 1,
+        snapshot_mode: str = "copy",
+        keep_visfiles: bool = False,
+        **kwargs
+    ):
+        """
+        Driver that runs one independent self-calibration per point of a parameter grid in a bounded process pool.
+        Every point works on its own snapshot of the measurement set inside its own directory, and the PSNR
+        histories of all the points are collected in a single results table.
+
+        Parameters
+        ----------
+        selfcal_class :
+            Self-calibration class to run, e.g. Phasecal
+        imager :
+            Imager object used as template for every point
+        visfile :
+            Absolute path to the input measurement set. It is never modified
+        grid :
+            Dictionary with the values of each parameter, e.g {"imager.robust": [-0.5, 0.5], "minsnr": [2.0, 3.0]}.
+            Keys starting with "imager." are imager attributes and the rest are self-calibration arguments
+        workdir :
+            Absolute path to the directory where the points and the results table are written
+        max_workers :
+            Maximum number of points run at once. Default is the number of CPUs divided by threads_per_worker
+        threads_per_worker :
+            Number of threads each worker may use in OpenMP, OpenBLAS and MKL
+        snapshot_mode :
+            Snapshot mode of the working copy of each point ("copy" or "link"), see snapshot_ms
+        keep_visfiles :
+            Whether to keep the measurement sets of the points after they finish. Otherwise they are deleted as soon
+            as each point finishes
+        kwargs :
+            Self-calibration arguments shared by every point
+        """
+        self.selfcal_class = selfcal_class
+        self.imager = imager
+        self.visfile = visfile
+        self.grid = grid if grid is not None else {}
+        self.workdir = workdir
+        self.max_workers = max_workers
+        self.threads_per_worker = threads_per_worker
+        self.snapshot_mode = snapshot_mode
+        self.keep_visfiles = keep_visfiles
+        self.kwargs = kwargs
+
+        if self.snapshot_mode not in ("copy", "link"):
+            raise ValueError("Error, snapshot_mode should be either 'copy' or 'link'")
+        if self.threads_per_worker < 1:
+            raise ValueError("Error, threads_per_worker should be at least 1")
+        if self.max_workers is None:
+            self.max_workers = max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+
+    def points(self) -> list:
+        """
+        Returns the list of points of the grid as dictionaries of parameter values
+        """
+        keys = list(self.grid.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*self.grid.values())]
+
+    def _prepare_point(self, k: int = 0, point: dict = None) -> tuple:
+        """
+        Returns the imager and self-calibration arguments of a point. The point directory and its measurement set
+        are created by the worker that runs it
+        """
+        point_directory = os.path.join(os.path.abspath(self.workdir), "point{0}".format(k))
+        point_visfile = os.path.join(point_directory, os.path.basename(self.visfile.rstrip("/")))
+
+        imager = copy.deepcopy(self.imager)
+        imager.inputvis = point_visfile
+        imager.output = os.path.join(point_directory, os.path.basename(self.imager.output))
+        kwargs = dict(self.kwargs)
+        kwargs["visfile"] = point_visfile
+        kwargs["output_caltables"] = point_directory + os.sep
+        kwargs["snapshot_mode"] = self.snapshot_mode
+        for key, value in point.items():
+            if key.startswith("imager."):
+                setattr(imager, key[len("imager."):], value)
+            else:
+                kwargs[key] = value
+        return imager, kwargs
+
+    def run(self, results_file: str = "sweep_results.csv") -> list:
+        """
+        Runs every point of the grid and writes the results table. Each row is appended as soon as its point
+        finishes, so the table keeps the finished points if the sweep is interrupted. A point whose worker process
+        fails, e.g. because it was killed, is recorded with the error instead of stopping the sweep.
+
+        Parameters
+        ----------
+        results_file :
+            Name of the CSV results table inside workdir
+
+        Returns
+        -------
+        A list with one dictionary per point with its parameters, PSNR history, wall time and error
+        """
+        os.makedirs(self.workdir, exist_ok=True)
+        points = self.points()
+        prepared = [self._prepare_point(k, point) for k, point in enumerate(points)]
+
+        with _thread_limits(self.threads_per_worker), ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            sweep_start = time.perf_counter()
+            futures = {
+                executor.submit(
+                    _run_point, self.selfcal_class, imager, kwargs, self.visfile, self.keep_visfiles
+                ): k
+                for k, (imager, kwargs) in enumerate(prepared)
+            }
+            results = []
+            with open(os.path.join(self.workdir, results_file), "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self._fieldnames())
+                writer.writeheader()
+                f.flush()
+                for future in as_completed(futures):
+                    k = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        # The worker process died (BrokenProcessPool) or the result could not be unpickled.
+                        # The start of the point is unknown, so its wall time is bounded by the sweep time
+                        result = {
+                            "psnr_history": [],
+                            "visfile": "",
+                            "wall_time_s": time.perf_counter() - sweep_start,
+                            "error": traceback.format_exc().strip()
+                        }
+                        if not self.keep_visfiles and os.path.isdir(
+                            os.path.dirname(prepared[k][1]["visfile"])
+                        ):
+                            _remove_visfiles(prepared[k][1]["visfile"])
+                    print(
+                        "Point {0} {1}: {2}".format(
+                            k, points[k],
+                            result["error"].splitlines()[-1] if result["error"] else "PSNR " +
+                            " -> ".join("{0:0.3f}".format(psnr) for psnr in result["psnr_history"])
+                        )
+                    )
+                    results.append({"point": k, **points[k], **result})
+                    writer.writerow(self._result_row(results[-1]))
+                    f.flush()
+
+        return sorted(results, key=lambda result: result["point"])
+
+    def _fieldnames(self) -> list:
+        """
+        Returns the columns of the results table
+        """
+        return ["point"] + list(self.grid.keys()) + [
+            "iterations", "psnr_start", "psnr_end", "psnr_history", "wall_time_s", "error"
+        ]
+
+    def _result_row(self, result: dict = None) -> dict:
+        """
+        Returns the row of the results table of a point
+        """
+        history = result["psnr_history"]
+        row = {key: result[key] for key in ["point"] + list(self.grid.keys())}
+        row.update(
+            {
+                "iterations": max(len(history) - 1, 0),
+                "psnr_start": history[0] if history else "",
+                "psnr_end": history[-1] if history else "",
+                "psnr_history": ";".join("{0:0.4f}".format(psnr) for psnr in history),
+                "wall_time_s": "{0:0.2f}".format(result["wall_time_s"]),
+                "error": result["error"]
+            }
+        )
+        return row
@@ -0,0 +1,333 @@
+import numpy as np
+
+from ..utils.selfcal_utils import parse_solint
+from .phase_solver import (
+    _coherency_chunks, _read_rows, _select_visibilities, dense_baselines, flag_minblperant,
+    solve_phase_intervals
+)
+
+
+def _merge_bins(level: dict, keys: np.ndarray) -> dict:
+    """
+    Function that sums the bins of a pyramid level that share the same (group, bin) key
+
+    Returns
+    -------
+    A dictionary with the merged bins, without width
+    """
+    _, first, index = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    index = index.ravel()
+    nbins = first.size
+    coherency = np.zeros((nbins, ) + level["coherency"].shape[1:], dtype=np.complex128)
+    weight = np.zeros((nbins, ) + level["weight"].shape[1:], dtype=np.float64)
+    np.add.at(coherency, index, level["coherency"])
+    np.add.at(weight, index, level["weight"])
+    start = np.full(nbins, np.inf)
+    end = np.full(nbins, -np.inf)
+    np.minimum.at(start, index, level["start"])
+    np.maximum.at(end, index, level["end"])
+    return {
+        "group": keys[first, 0],
+        "bin": keys[first, 1],
+        "start": start,
+        "end": end,
+        "scan": level["scan"][first],
+        "field": level["field"][first],
+        "coherency": coherency,
+        "weight": weight
+    }
+
+
+class TimePyramid:
+
+    def __init__(
+        self,
+        vis: str = "",
+        field: str = "",
+        spw: str = "",
+        uvrange: str = "",
+        base_solint: str = "int",
+        chunk_rows: int = 100000
+    ):
+        """
+        Multi-resolution time pyramid of the model-divided visibilities. One streaming pass over the measurement set
+        reduces DATA, MODEL_DATA, WEIGHT and FLAG to the weighted sums of V_pq conj(M_pq) and |M_pq|^2 of every
+        baseline, spectral window and parallel hand in bins of base_solint. Each level of the pyramid doubles the
+        bin width of the previous one until every scan is a single bin, so the coherencies of any solution
+        interval are aggregated from the coarsest level that divides it instead of reading the data again.
+        Memory grows with the number of base bins times the number of spectral windows and baselines.
+
+        Parameters
+        ----------
+        vis :
+            Input visibility measurement set. It needs a MODEL_DATA column
+        field :
+            Select field
+        spw :
+            Select spectral window/channels
+        uvrange :
+            Select data within uvrange (default units meters)
+        base_solint :
+            Width of the finest bins, e.g "15s". "int" uses the median integration time
+        chunk_rows :
+            Maximum number of rows read at once
+        """
+        self.vis = vis
+        self.field = field
+        self.spw = spw
+        self.uvrange = uvrange
+        self.base_solint = base_solint
+        self.chunk_rows = chunk_rows
+
+        selection = _select_visibilities(vis, field, spw)
+        self.antenna_names = selection["antenna_names"]
+        self.spws = selection["spws"]
+        rows = _read_rows(vis, selection)
+
+        width = parse_solint(base_solint)
+        if np.isinf(width):
+            raise ValueError("Error, the base solution interval of the pyramid should be finite")
+        if width == 0.0:
+            width = float(np.median(rows["interval"]))
+
+        nant = len(self.antenna_names)
+        antenna1, antenna2 = np.triu_indices(nant, k=1)
+        # Each baseline is stored once, whatever the order of its antennas in the measurement set
+        baseline_index = np.zeros((nant, nant), dtype=np.int64)
+        baseline_index[antenna1, antenna2] = np.arange(antenna1.size)
+        baseline_index[antenna2, antenna1] = np.arange(antenna1.size)
+        self._antenna1 = antenna1
+        self._antenna2 = antenna2
+
+        # Bins start at the beginning of each scan like the solution intervals of the solvers
+        _, group = np.unique(rows["scan"], return_inverse=True)
+        group = group.ravel()
+        scan_start = np.full(group.max() + 1, np.inf)
+        np.minimum.at(scan_start, group, rows["time"])
+        bins = np.floor((rows["time"] - scan_start[group]) / width + 1e-6).astype(np.int64)
+        keys = np.stack([group, bins], axis=-1)
+        _, first, row_bin = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        row_bin = row_bin.ravel()
+        nbins = first.size
+
+        coherency = np.zeros((nbins, len(self.spws), 2, antenna1.size), dtype=np.complex128)
+        weight = np.zeros((nbins, len(self.spws), 2, antenna1.size), dtype=np.float64)
+        chunks = _coherency_chunks(vis, selection, uvrange, chunk_rows)
+        for rows_index, spw_id, row_antenna1, row_antenna2, visibility_model, model_power in chunks:
+            spw_index = self.spws.index(spw_id)
+            visibility_model = np.where(
+                row_antenna1 < row_antenna2, visibility_model, np.conj(visibility_model)
+            )
+            pol_index = np.arange(visibility_model.shape[0])[:, None]
+            baseline = baseline_index[row_antenna1, row_antenna2][None, :]
+            index = (
+                (row_bin[rows_index][None, :] * len(self.spws) + spw_index) * 2 + pol_index
+            ) * antenna1.size + baseline
+            unique_index, inverse = np.unique(index.ravel(), return_inverse=True)
+            coherency.ravel()[unique_index] += np.bincount(
+                inverse, weights=visibility_model.real.ravel()
+            ) + 1j * np.bincount(inverse, weights=visibility_model.imag.ravel())
+            weight.ravel()[unique_index] += np.bincount(inverse, weights=model_power.ravel())
+
+        start = np.full(nbins, np.inf)
+        end = np.full(nbins, -np.inf)
+        np.minimum.at(start, row_bin, rows["time"] - 0.5 * rows["interval"])
+        np.maximum.at(end, row_bin, rows["time"] + 0.5 * rows["interval"])
+        level = {
+            "width": width,
+            "group": group[first],
+            "bin": bins[first],
+            "start": start,
+            "end": end,
+            "scan": rows["scan"][first],
+            "field": rows["field"][first],
+            "coherency": coherency,
+            "weight": weight
+        }
+        self.levels = [level]
+        while np.any(level["bin"] > 0):
+            level = _merge_bins(level, np.stack([level["group"], level["bin"] // 2], axis=-1))
+            level["width"] = 2.0 * self.levels[-1]["width"]
+            self.levels.append(level)
+
+    @property
+    def widths(self) -> list:
+        """
+        Returns the bin width in seconds of each level
+        """
+        return [level["width"] for level in self.levels]
+
+    def _level_for(self, solint: float = np.inf) -> dict:
+        """
+        Returns the coarsest level whose bins tile the solution interval
+        """
+        if np.isinf(solint):
+            return self.levels[-1]
+        for level in self.levels[::-1]:
+            ratio = solint / level["width"]
+            if ratio >= 1.0 - 1e-6 and abs(ratio - np.round(ratio)) < 1e-6:
+                return level
+        return self.levels[0]
+
+    def aggregate(
+        self,
+        solint: str = "inf",
+        combine: str = "",
+        gaintype: str = "G",
+        dense: bool = True
+    ) -> dict:
+        """
+        Aggregates the pyramid into the coherencies of a solution interval. Intervals that are not a multiple of the
+        base bin width, and scans combined with a finite interval, are approximated by whole base bins. "int" returns
+        the base bins.
+
+        Parameters
+        ----------
+        solint :
+            Solution interval: e.g "inf", "60s", "int"
+        combine :
+            Data axes to combine for solving ("scan" and/or "spw")
+        gaintype :
+            Type of gain solution ("G" solves each parallel hand, "T" solves both together)
+        dense :
+            Whether to expand the baselines into antenna matrices. Otherwise the coherencies and weights have shape
+            (interval, spw, pol, baseline) and the antennas of each baseline are returned as antenna1 and antenna2
+
+        Returns
+        -------
+        A dictionary with the Hermitian coherencies and symmetric weights with shape
+        (interval, spw, pol, antenna, antenna), the antennas of each baseline, the start, end, scan and field of each
+        interval and the spectral window of each solution
+        """
+        solint = parse_solint(solint)
+        combine_scan = "scan" in combine
+        level = self.levels[0] if solint == 0.0 else self._level_for(solint)
+        group = level["group"]
+        if combine_scan and solint > 0.0:
+            group = np.zeros(group.shape, dtype=np.int64)
+        if solint == 0.0:
+            bins = level["bin"]
+        elif np.isinf(solint):
+            bins = np.zeros(level["bin"].shape, dtype=np.int64)
+        elif combine_scan:
+            bins = np.floor((level["start"] - level["start"].min()) / solint +
+                            1e-6).astype(np.int64)
+        else:
+            bins = np.floor(level["bin"] * level["width"] / solint + 1e-6).astype(np.int64)
+        merged = _merge_bins(level, np.stack([group, bins], axis=-1))
+
+        coherency = merged["coherency"]
+        weight = merged["weight"]
+        if "spw" in combine:
+            coherency = coherency.sum(axis=1, keepdims=True)
+            weight = weight.sum(axis=1, keepdims=True)
+        if gaintype == "T":
+            coherency = coherency.sum(axis=2, keepdims=True)
+            weight = weight.sum(axis=2, keepdims=True)
+
+        if dense:
+            nant = len(self.antenna_names)
+            coherency = dense_baselines(coherency, self._antenna1, self._antenna2, nant)
+            weight = dense_baselines(weight, self._antenna1, self._antenna2, nant)
+        return {
+            "coherency": coherency,
+            "weight": weight,
+            "antenna1": self._antenna1,
+            "antenna2": self._antenna2,
+            "interval_start": merged["start"],
+            "interval_end": merged["end"],
+            "interval_scan": merged["scan"],
+            "interval_field": merged["field"],
+            "spws": [min(self.spws)] if "spw" in combine else list(self.spws)
+        }
+
+    def antenna_snr(
+        self,
+        solint: str = "inf",
+        combine: str = "",
+        gaintype: str = "G",
+        minblperant: int = 4,
+        maxiter: int = 100,
+        tolerance: float = 1e-6,
+        batch_intervals: int = 64
+    ) -> np.ndarray:
+        """
+        Calculates the signal-to-noise ratio of the phase-only solutions of a solution interval
+
+        Parameters
+        ----------
+        solint :
+            Solution interval: e.g "inf", "60s", "int"
+        combine :
+            Data axes to combine for solving ("scan" and/or "spw")
+        gaintype :
+            Type of gain solution ("G" solves each parallel hand, "T" solves both together)
+        minblperant :
+            Minimum baseline per antenna. Antennas below it have zero SNR
+        maxiter :
+            Maximum number of solver iterations
+        tolerance :
+            Convergence tolerance of the solver
+        batch_intervals :
+            Number of solution intervals solved at once
+
+        Returns
+        -------
+        The SNR of every solution with shape (interval, spw, pol, antenna)
+        """
+        aggregated = self.aggregate(solint, combine, gaintype, dense=False)
+        _, snr, antenna_ok = solve_phase_intervals(
+            aggregated["coherency"],
+            aggregated["weight"],
+            self._antenna1,
+            self._antenna2,
+            len(self.antenna_names),
+            minblperant=minblperant,
+            maxiter=maxiter,
+            tolerance=tolerance,
+            batch_intervals=batch_intervals
+        )
+        return np.where(antenna_ok, snr, 0.0)
+
+    def expected_snr(
+        self,
+        solint: str = "inf",
+        combine: str = "",
+        gaintype: str = "G",
+        minblperant: int = 4,
+        batch_intervals: int = 64
+    ) -> np.ndarray:
+        """
+        Estimates the signal-to-noise ratio of the solutions of a solution interval from the model and the
+        visibility weights only, without solving. With a perfect model the SNR of antenna p is
+        sqrt(sum_q w_pq |M_pq|^2), so the estimate is an upper limit that is cheap enough to scan many intervals.
+
+        Parameters
+        ----------
+        solint :
+            Solution interval: e.g "inf", "60s", "int"
+        combine :
+            Data axes to combine for solving ("scan" and/or "spw")
+        gaintype :
+            Type of gain solution ("G" solves each parallel hand, "T" solves both together)
+        minblperant :
+            Minimum baseline per antenna. Antennas below it have zero SNR
+        batch_intervals :
+            Number of solution intervals whose antenna matrices are held in memory at once
+
+        Returns
+        -------
+        The SNR of every solution with shape (interval, spw, pol, antenna)
+        """
+        weight = self.aggregate(solint, combine, gaintype, dense=False)["weight"]
+        nant = len(self.antenna_names)
+        snr = np.zeros(weight.shape[:-1] + (nant, ))
+        # The antenna matrices are expanded in batches of intervals like the solver does
+        for start in range(0, weight.shape[0], batch_intervals):
+            batch_weight = dense_baselines(
+                weight[start:start + batch_intervals], self._antenna1, self._antenna2, nant
+            )
+            antenna_ok = flag_minblperant(batch_weight, minblperant)
+            snr[start:start +
+                batch_intervals] = np.where(antenna_ok, np.sqrt(batch_weight.sum(axis=-1)), 0.0)
+        return snr
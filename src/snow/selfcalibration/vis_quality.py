@@ -0,0 +1,214 @@
+from itertools import combinations
+
+import numpy as np
+from casatools import ms
+
+from ..utils.ms_metadata import metadata, open_table
+from .phase_solver import PARALLEL_HANDS
+
+
+def closure_phase_sums(
+    antenna1: np.ndarray, antenna2: np.ndarray, time_index: np.ndarray, ratio: np.ndarray,
+    nantennas: int
+) -> tuple:
+    """
+    Function that calculates the closure phases of every antenna triangle and time slot of the ratio between the
+    corrected and the model visibilities. The closure phases are returned as the sum of their unit phasors so they
+    can be accumulated over chunks of rows.
+
+    Parameters
+    ----------
+    antenna1 :
+        First antenna of each row
+    antenna2 :
+        Second antenna of each row
+    time_index :
+        Time slot index of each row, starting at zero
+    ratio :
+        Complex ratio between the corrected and the model visibilities of each row. Flagged rows are nan
+    nantennas :
+        Number of antennas
+
+    Returns
+    -------
+    tuple:
+        A tuple with the sum of the closure phasors and the number of closure phases
+    """
+    if nantennas < 3 or ratio.size == 0:
+        return 0.0j, 0
+    matrix = np.full((time_index.max() + 1, nantennas, nantennas), np.nan, dtype=np.complex128)
+    matrix[time_index, antenna1, antenna2] = ratio
+    matrix[time_index, antenna2, antenna1] = np.conj(ratio)
+    i, j, k = np.array(list(combinations(range(nantennas), 3))).T
+    closure = matrix[:, i, j] * matrix[:, j, k] * matrix[:, k, i]
+    closure = closure[np.isfinite(closure) & (closure != 0.0)]
+    return np.sum(closure / np.abs(closure)), closure.size
+
+
+def caltable_snr(caltable: str = "") -> float:
+    """
+    Function that calculates the median signal-to-noise ratio of the unflagged solutions of a calibration table
+
+    Parameters
+    ----------
+    caltable :
+        Absolute path to the calibration table
+
+    Returns
+    -------
+    The median SNR, or nan if every solution is flagged
+    """
+    with open_table(caltable) as mytb:
+        snr = mytb.getcol("SNR")
+        flag = mytb.getcol("FLAG")
+    if np.all(flag):
+        return np.nan
+    return float(np.median(snr[~flag]))
+
+
+def caltable_solutions(caltable: str = "") -> int:
+    """
+    Function that counts the unflagged solutions of a calibration table
+
+    Parameters
+    ----------
+    caltable :
+        Absolute path to the calibration table
+
+    Returns
+    -------
+    The number of unflagged solutions of every polarization, channel and row
+    """
+    with open_table(caltable) as mytb:
+        flag = mytb.getcol("FLAG")
+    return int(np.count_nonzero(~flag))
+
+
+def visibility_quality(
+    vis: str = "",
+    caltable: str = None,
+    field: str = "",
+    spw: str = "",
+    chunk_rows: int = 100000,
+    sample_flags: list = None
+) -> dict:
+    """
+    Function that calculates fast quality metrics of the calibrated visibilities in a single pass over the
+    measurement set, without imaging:
+
+    - residual_rms: weighted RMS of CORRECTED_DATA - MODEL_DATA (DATA if there is no CORRECTED_DATA column)
+    - closure_phase_scatter: circular standard deviation in degrees of the closure phases of the ratio between the
+      corrected and the model visibilities, averaged over channels and parallel hands
+    - gain_snr: median SNR of the calibration table solutions, if a calibration table is given
+    - gain_solutions: number of unflagged calibration table solutions, if a calibration table is given
+    - nsamples: number of unflagged visibility samples of the measurement
+    - sample_flags: flags of the measured sample, bit-packed per chunk of rows, to measure the same sample again
+
+    Parameters
+    ----------
+    vis :
+        Input visibility measurement set. It needs a MODEL_DATA column
+    caltable :
+        Calibration table whose solutions SNR is calculated
+    field :
+        Select field
+    spw :
+        Select spectral window
+    chunk_rows :
+        Maximum number of rows read at once
+    sample_flags :
+        The sample_flags of a previous measurement with the same selection and chunk_rows. They are used instead of
+        the FLAG column, so both measurements use the same sample even if flags were added in between
+
+    Returns
+    -------
+    A dictionary with the quality metrics
+    """
+    colnames = metadata.colnames(vis)
+    if "MODEL_DATA" not in colnames:
+        raise ValueError("The visibility quality metrics need a MODEL_DATA column in " + vis)
+    data_column = "CORRECTED_DATA" if "CORRECTED_DATA" in colnames else "DATA"
+    nantennas = len(metadata.antennas(vis)["name"])
+
+    myms = ms()
+    selection = myms.msseltoindex(vis=vis, field=field, spw=spw)
+    myms.done()
+
+    with open_table(vis + "/DATA_DESCRIPTION") as mytb:
+        dd_spw = mytb.getcol("SPECTRAL_WINDOW_ID")
+        dd_pol = mytb.getcol("POLARIZATION_ID")
+    with open_table(vis + "/POLARIZATION") as mytb:
+        corr_types = [mytb.getcell("CORR_TYPE", row) for row in range(mytb.nrows())]
+
+    ddids = [ddid for ddid in range(len(dd_spw)) if spw == "" or dd_spw[ddid] in selection["spw"]]
+    where = "ANTENNA1 != ANTENNA2 && DATA_DESC_ID IN [{0}]".format(",".join(map(str, ddids)))
+    if field != "":
+        where += " && FIELD_ID IN [{0}]".format(",".join(map(str, selection["field"])))
+
+    squared_residual = 0.0
+    weight_sum = 0.0
+    phasor_sum = 0.0j
+    nclosures = 0
+    nsamples = 0
+    chunk_flags = []
+    with open_table(vis) as mytb:
+        selected = mytb.query(where)
+        for ddid in ddids:
+            parallel_hands = [
+                c for c, corr_type in enumerate(corr_types[dd_pol[ddid]])
+                if corr_type in PARALLEL_HANDS
+            ]
+            subtable = selected.query("DATA_DESC_ID=={0}".format(ddid))
+            for start in range(0, subtable.nrows(), chunk_rows):
+                nrow = min(chunk_rows, subtable.nrows() - start)
+                time = subtable.getcol("TIME", startrow=start, nrow=nrow)
+                antenna1 = subtable.getcol("ANTENNA1", startrow=start, nrow=nrow)
+                antenna2 = subtable.getcol("ANTENNA2", startrow=start, nrow=nrow)
+                # Arrays are (correlation, channel, row)
+                data = subtable.getcol(data_column, startrow=start, nrow=nrow)
+                model = subtable.getcol("MODEL_DATA", startrow=start, nrow=nrow)
+                if sample_flags is not None:
+                    flag = np.unpackbits(sample_flags[len(chunk_flags)],
+                                         count=data.size).reshape(data.shape).astype(bool)
+                else:
+                    flag = subtable.getcol("FLAG", startrow=start, nrow=nrow)
+                chunk_flags.append(np.packbits(flag))
+                nsamples += int(np.count_nonzero(~flag))
+                weight = subtable.getcol("WEIGHT", startrow=start, nrow=nrow)[:, None, :] * ~flag
+
+                squared_residual += np.sum(weight * np.abs(data - model)**2)
+                weight_sum += np.sum(weight)
+
+                weight = weight[parallel_hands]
+                numerator = np.sum(
+                    weight * data[parallel_hands] * np.conj(model[parallel_hands]), axis=(0, 1)
+                )
+                denominator = np.sum(weight * np.abs(model[parallel_hands])**2, axis=(0, 1))
+                ratio = np.full(nrow, np.nan, dtype=np.complex128)
+                valid = denominator > 0.0
+                ratio[valid] = numerator[valid] / denominator[valid]
+                _, time_index = np.unique(time, return_inverse=True)
+                chunk_phasor_sum, chunk_nclosures = closure_phase_sums(
+                    antenna1, antenna2, time_index, ratio, nantennas
+                )
+                phasor_sum += chunk_phasor_sum
+                nclosures += chunk_nclosures
+            subtable.close()
+        selected.close()
+
+    quality = {
+        "residual_rms": float(np.sqrt(squared_residual /
+                                      weight_sum)) if weight_sum > 0.0 else np.nan,
+        "closure_phase_scatter": np.nan,
+        "gain_snr": np.nan,
+        "gain_solutions": 0,
+        "nsamples": nsamples,
+        "sample_flags": chunk_flags
+    }
+    if nclosures > 0:
+        resultant = min(np.abs(phasor_sum) / nclosures, 1.0)
+        quality["closure_phase_scatter"] = float(np.degrees(np.sqrt(-2.0 * np.log(resultant))))
+    if caltable is not None and caltable != "":
+        quality["gain_snr"] = caltable_snr(caltable)
+        quality["gain_solutions"] = caltable_solutions(caltable)
+    return quality
@@ -1,2 +1,14 @@
 from .image_utils import nanrms, rms, get_header, get_hdu, get_hdul, get_data, get_header_and_data, export_ms_to_fits, calculate_psnr_fits, calculate_psnr_ms, reproject
-from .selfcal_utils import is_column_in_ms, get_table_rows, calculate_number_antennas
+from .instrumentation import Tracer, tracer
+from .parallel_utils import is_multims, get_sub_ms_names, is_mpi_enabled, get_mpi_world_size
+from .ms_metadata import MSMetadata, metadata, open_table
+from .selfcal_utils import is_column_in_ms, get_table_rows, calculate_number_antennas, parse_solint, parse_uvrange
+from .snapshot_utils import MUTABLE_COLUMNS, reflink_or_copy, get_mutable_storage_managers, snapshot_ms
+from .column_checkpoint import ColumnCheckpoint
+from .run_manifest import RunManifest, checksum_path
+from .flag_utils import MAD_TO_STD, robust_deviation, residual_outlier_flags
+from .imaging_cache import ImagingCache, fingerprint_ms, parameters_key
+from .solve_cache import SolveCache
+from .flag_store import FlagStore, rle_encode, rle_decode
+from .workspace import Workspace, parse_size
+from .uv_coverage import uv_coverage_signature, coverage_change
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .ms_metadata import open_table
+
+
+class ColumnCheckpoint:
+
+    def __init__(
+        self,
+        directory: str = "",
+        columns: tuple = ("CORRECTED_DATA", "FLAG", "FLAG_ROW", "MODEL_DATA"),
+        chunk_rows: int = 100000,
+        compress: bool = False
+    ):
+        """
+        Store that saves and restores a set of measurement set columns in row chunks. Each checkpoint is saved
+        under its own label as one numpy file per column, data description and chunk of rows, so rolling back a
+        self-calibration iteration only rewrites the columns that were mutated instead of the whole measurement set.
+
+        Parameters
+        ----------
+        directory :
+            Absolute path to the directory where the checkpoints are saved
+        columns :
+            Columns to save. Columns that are not present in the measurement set are recorded as absent, and are
+            reset (CORRECTED_DATA is set to DATA) or removed when the checkpoint is restored
+        chunk_rows :
+            Maximum number of rows read or written at once
+        compress :
+            Whether to compress the saved chunks or not
+        """
+        self.directory = directory
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+
+    def _label_path(self, label: str = "") -> str:
+        return os.path.join(self.directory, label)
+
+    def _chunk_path(self, label: str = "", column: str = "", ddid: int = 0, start: int = 0) -> str:
+        extension = ".npz" if self.compress else ".npy"
+        return os.path.join(
+            self._label_path(label), column, "ddid{0}_{1}{2}".format(ddid, start, extension)
+        )
+
+    def exists(self, label: str = "") -> bool:
+        """
+        Returns True if a checkpoint with the given label has been saved
+        """
+        return os.path.exists(os.path.join(self._label_path(label), "checkpoint.json"))
+
+    def delete(self, label: str = "") -> None:
+        """
+        Deletes the checkpoint with the given label if it exists
+        """
+        if os.path.exists(self._label_path(label)):
+            shutil.rmtree(self._label_path(label))
+
+    def save(self, ms_name: str = "", label: str = "") -> None:
+        """
+        Saves the checkpoint columns of a measurement set under a label, overwriting any previous checkpoint with
+        the same label.
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set
+        label :
+            Name of the checkpoint
+        """
+        self.delete(label)
+        with open_table(ms_name) as mytb:
+            nrows = mytb.nrows()
+            columns = [column for column in self.columns if column in mytb.colnames()]
+            absent_columns = [column for column in self.columns if column not in columns]
+            ddids = np.unique(mytb.getcol("DATA_DESC_ID")).tolist()
+            for column in columns:
+                os.makedirs(os.path.join(self._label_path(label), column))
+            for ddid in ddids:
+                subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid))
+                for start in range(0, subtable.nrows(), self.chunk_rows):
+                    nrow = min(self.chunk_rows, subtable.nrows() - start)
+                    for column in columns:
+                        data = subtable.getcol(column, startrow=start, nrow=nrow)
+                        chunk_name = self._chunk_path(label, column, ddid, start)
+                        if self.compress:
+                            np.savez_compressed(chunk_name, data=data)
+                        else:
+                            np.save(chunk_name, data)
+                subtable.close()
+        with open(os.path.join(self._label_path(label), "checkpoint.json"), "w") as f:
+            json.dump(
+                {
+                    "nrows": nrows,
+                    "columns": columns,
+                    "absent_columns": absent_columns,
+                    "ddids": ddids
+                }, f
+            )
+
+    def restore(self, ms_name: str = "", label: str = "") -> None:
+        """
+        Restores in place the checkpoint columns of a measurement set from a label. Columns that were absent when
+        the checkpoint was saved and have been created since then are brought back to their initial state:
+        CORRECTED_DATA is set to DATA and any other column is removed
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set
+        label :
+            Name of the checkpoint
+        """
+        if not self.exists(label):
+            raise FileNotFoundError("The checkpoint " + label + " does not exist")
+        with open(os.path.join(self._label_path(label), "checkpoint.json"), "r") as f:
+            metadata = json.load(f)
+        with open_table(ms_name, nomodify=False) as mytb:
+            if mytb.nrows() != metadata["nrows"]:
+                raise ValueError(
+                    "The checkpoint " + label + " does not match the number of rows of " + ms_name
+                )
+            created_columns = [
+                column for column in metadata.get("absent_columns", []) if column in mytb.colnames()
+            ]
+            for ddid in metadata["ddids"]:
+                subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid))
+                for start in range(0, subtable.nrows(), self.chunk_rows):
+                    if "CORRECTED_DATA" in created_columns:
+                        nrow = min(self.chunk_rows, subtable.nrows() - start)
+                        subtable.putcol(
+                            "CORRECTED_DATA",
+                            subtable.getcol("DATA", startrow=start, nrow=nrow),
+                            startrow=start
+                        )
+                    for column in metadata["columns"]:
+                        if column not in subtable.colnames():
+                            continue
+                        chunk_name = self._chunk_path(label, column, ddid, start)
+                        if self.compress:
+                            with np.load(chunk_name) as chunk:
+                                data = chunk["data"]
+                        else:
+                            data = np.load(chunk_name)
+                        subtable.putcol(column, data, startrow=start)
+                subtable.close()
+            removed_columns = [column for column in created_columns if column != "CORRECTED_DATA"]
+            if removed_columns:
+                mytb.removecols(removed_columns)
+            mytb.flush()
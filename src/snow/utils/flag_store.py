@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .ms_metadata import open_table
+
+FLAG_COLUMNS = ("FLAG", "FLAG_ROW")
+
+
+def rle_encode(x: np.ndarray) -> np.ndarray:
+    """
+    Function that run-length encodes a boolean array as its first value followed by the positions where the value
+    toggles
+
+    Parameters
+    ----------
+    x :
+        Boolean numpy array
+
+    Returns
+    -------
+    An int64 array with the first value and the toggle positions of the flattened array
+    """
+    x = x.ravel()
+    if x.size == 0:
+        return np.zeros(1, dtype=np.int64)
+    toggles = np.flatnonzero(x[1:] != x[:-1]) + 1
+    return np.concatenate([[int(x[0])], toggles]).astype(np.int64)
+
+
+def rle_decode(encoded: np.ndarray, shape: tuple) -> np.ndarray:
+    """
+    Function that decodes a run-length encoded boolean array
+
+    Parameters
+    ----------
+    encoded :
+        Array returned by rle_encode
+    shape :
+        Shape of the decoded array
+
+    Returns
+    -------
+    The boolean numpy array
+    """
+    toggles = np.zeros(int(np.prod(shape)), dtype=bool)
+    if toggles.size == 0:
+        return toggles.reshape(shape)
+    toggles[encoded[1:]] = True
+    toggles[0] ^= bool(encoded[0])
+    return np.logical_xor.accumulate(toggles).reshape(shape)
+
+
+class FlagStore:
+
+    def __init__(self, directory: str = "", chunk_rows: int = 100000):
+        """
+        Incremental flag version store. The flags of the first saved version are kept as the base, and every
+        version only stores the run-length encoded XOR between its flags and the base for the chunks of rows that
+        differ. With mostly static flags a version takes a few bytes instead of a full copy of the FLAG column.
+
+        Parameters
+        ----------
+        directory :
+            Absolute path to the directory of the store
+        chunk_rows :
+            Maximum number of rows read or written at once
+        """
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def _version_path(self, version: str = "") -> str:
+        return os.path.join(self.directory, "versions", version + ".npz")
+
+    def _base_path(self) -> str:
+        return os.path.join(self.directory, "base.npz")
+
+    def _load_index(self) -> dict:
+        if not os.path.exists(self._index_path()):
+            return {"nrows": None, "chunks": {}, "versions": []}
+        with open(self._index_path(), "r") as f:
+            return json.load(f)
+
+    def _save_index(self, index: dict = None) -> None:
+        temporary_path = self._index_path() + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temporary_path, self._index_path())
+
+    def _read_chunks(self, ms_name: str = ""):
+        """
+        Generator that yields the key, the column and the flags of every chunk of rows of a measurement set
+        """
+        with open_table(ms_name) as mytb:
+            ddids = np.unique(mytb.getcol("DATA_DESC_ID")).tolist()
+            for ddid in ddids:
+                subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid))
+                for start in range(0, subtable.nrows(), self.chunk_rows):
+                    nrow = min(self.chunk_rows, subtable.nrows() - start)
+                    for column in FLAG_COLUMNS:
+                        key = "{0}_ddid{1}_{2}".format(column, ddid, start)
+                        yield key, subtable.getcol(column, startrow=start, nrow=nrow)
+                subtable.close()
+
+    def versions(self) -> list:
+        """
+        Returns the names of the saved versions
+        """
+        return list(self._load_index()["versions"])
+
+    def exists(self, version: str = "") -> bool:
+        """
+        Returns True if a version with the given name has been saved
+        """
+        return version in self._load_index()["versions"]
+
+    def delete(self, version: str = "") -> None:
+        """
+        Deletes a version if it exists
+        """
+        index = self._load_index()
+        if version in index["versions"]:
+            os.remove(self._version_path(version))
+            index["versions"].remove(version)
+            self._save_index(index)
+
+    def clear(self) -> None:
+        """
+        Deletes the store and all its versions
+        """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+    def save(self, ms_name: str = "", version: str = "") -> int:
+        """
+        Saves the current flags of a measurement set as a version, overwriting any previous version with the same
+        name. The first saved version also becomes the base of the store.
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set
+        version :
+            Name of the version
+
+        Returns
+        -------
+        The number of bytes written for the version
+        """
+        os.makedirs(os.path.join(self.directory, "versions"), exist_ok=True)
+        index = self._load_index()
+        nrows = self._nrows(ms_name)
+        if index["nrows"] is None:
+            base = {}
+            for key, flags in self._read_chunks(ms_name):
+                base[key] = rle_encode(flags)
+                index["chunks"][key] = list(flags.shape)
+            np.savez_compressed(self._base_path(), **base)
+            index["nrows"] = nrows
+        elif index["nrows"] != nrows:
+            raise ValueError(
+                "The flag store " + self.directory + " does not match the number of rows of " +
+                ms_name
+            )
+
+        changed = {}
+        with np.load(self._base_path()) as base:
+            for key, flags in self._read_chunks(ms_name):
+                difference = flags ^ rle_decode(base[key], tuple(index["chunks"][key]))
+                if np.any(difference):
+                    changed[key] = rle_encode(difference)
+        np.savez_compressed(self._version_path(version), **changed)
+        if version not in index["versions"]:
+            index["versions"].append(version)
+        self._save_index(index)
+        return os.path.getsize(self._version_path(version))
+
+    def restore(self, ms_name: str = "", version: str = "") -> None:
+        """
+        Restores in place the flags of a measurement set from a version
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set
+        version :
+            Name of the version
+        """
+        index = self._load_index()
+        if version not in index["versions"]:
+            raise FileNotFoundError("The flag version " + version + " does not exist")
+        if self._nrows(ms_name) != index["nrows"]:
+            raise ValueError(
+                "The flag store " + self.directory + " does not match the number of rows of " +
+                ms_name
+            )
+        with np.load(self._base_path()
+                     ) as base, np.load(self._version_path(version)
+                                        ) as changed, open_table(ms_name, nomodify=False) as mytb:
+            for key, shape in index["chunks"].items():
+                column, ddid, start = key.rsplit("_", 2)
+                flags = rle_decode(base[key], tuple(shape))
+                if key in changed.files:
+                    flags ^= rle_decode(changed[key], tuple(shape))
+                subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid[len("ddid"):]))
+                subtable.putcol(column, flags, startrow=int(start))
+                subtable.close()
+            mytb.flush()
+
+    @staticmethod
+    def _nrows(ms_name: str = "") -> int:
+        with open_table(ms_name) as mytb:
+            return mytb.nrows()
@@ -0,0 +1,68 @@
+import warnings
+from typing import Tuple
+
+import numpy as np
+
+# Scale factor between the median absolute deviation and the standard deviation of a normal distribution
+MAD_TO_STD = 1.4826
+
+
+def robust_deviation(x: np.ndarray, axis: int = -1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Function that calculates the median and the MAD-based standard deviation of an array along one axis,
+    discarding nan values.
+
+    Parameters
+    ----------
+    x :
+        Input numpy array where flagged values are nan
+    axis :
+        Axis along which the statistics are calculated
+
+    Returns
+    -------
+    tuple:
+        A tuple with the median and the robust standard deviation, keeping the reduced axis
+    """
+    median = np.nanmedian(x, axis=axis, keepdims=True)
+    deviation = MAD_TO_STD * np.nanmedian(np.abs(x - median), axis=axis, keepdims=True)
+    return median, deviation
+
+
+def residual_outlier_flags(
+    residual: np.ndarray,
+    flag: np.ndarray,
+    timedevscale: float = 3.0,
+    freqdevscale: float = 3.0
+) -> np.ndarray:
+    """
+    Function that flags residual visibility outliers. A sample is flagged if its residual amplitude deviates from
+    the median more than timedevscale times the robust deviation along time or more than freqdevscale times the
+    robust deviation along frequency.
+
+    Parameters
+    ----------
+    residual :
+        Complex residual visibilities with shape (correlation, channel, time)
+    flag :
+        Current flags with the same shape as the residuals
+    timedevscale :
+        Flag a point if its deviation along time is larger than timedevscale times the robust deviation
+    freqdevscale :
+        Flag a point if its deviation along frequency is larger than freqdevscale times the robust deviation
+
+    Returns
+    -------
+    The updated flags
+    """
+    amplitude = np.where(flag, np.nan, np.abs(residual))
+    if np.all(flag):
+        return flag
+    with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+        # Fully flagged slices give nan statistics and never flag anything
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        time_median, time_deviation = robust_deviation(amplitude, axis=2)
+        freq_median, freq_deviation = robust_deviation(amplitude, axis=1)
+        outliers = (np.abs(amplitude - time_median) > timedevscale * time_deviation
+                    ) | (np.abs(amplitude - freq_median) > freqdevscale * freq_deviation)
+    return flag | outliers
@@ -6,7 +6,8 @@ import numpy as np
 from astropy.io import fits
 from astropy.wcs import WCS
 from astropy.stats import sigma_clipped_stats
-from casatasks import exportfits, imstat
+from casatasks import exportfits
+from casatools import image
 from reproject import reproject_interp
 
 
@@ -154,16 +155,52 @@ def export_ms_to_fits(msname: str = "") -> str:
     return fitsfile_name
 
 
+def _is_scaled_fits(hdu: fits.PrimaryHDU = None) -> bool:
+    """
+    Function that returns True if the pixels of a FITS image are scaled with BSCALE and BZERO or have BLANK values.
+    It has to be called before the data is read, since astropy removes these keywords once it scales the data.
+    """
+    header = hdu.header
+    return header.get("BSCALE", 1) != 1 or header.get("BZERO", 0) != 0 or "BLANK" in header
+
+
+def _read_fits_window(
+    hdu: fits.PrimaryHDU = None,
+    rows: slice = slice(None),
+    columns: slice = slice(None),
+    scaled: bool = False
+) -> np.ndarray:
+    """
+    Function that reads a window of rows and columns of every plane of a FITS image without loading the rest of it.
+    Scaled images cannot be memory mapped, so they are read whole once through hdu.data, which applies the scaling
+    and converts the BLANK values to NaN.
+
+    Returns
+    -------
+    A numpy array with shape (plane, row, column), where the planes run over the frequency and Stokes axes
+    """
+    leading = (slice(None), ) * (len(hdu.shape) - 2)
+    if scaled:
+        window = hdu.data[leading + (rows, columns)]
+    else:
+        window = hdu.section[leading + (rows, columns)]
+    return window.reshape((-1, ) + window.shape[-2:])
+
+
 def calculate_psnr_fits(
     signal_fits_name: str = "",
     residual_fits_name: str = "",
     pixels: int = None,
     sigma: float = 5,
     use_sigma_clipped_stats: bool = True,
-) -> Tuple[float, float, float]:
+    per_plane: bool = False,
+    chunk_pixels: int = 2**24
+) -> Tuple[Union[float, np.ndarray], Union[float, np.ndarray], Union[float, np.ndarray]]:
     """
     Function that calculates the peak signal-to-noise ratio of a reconstruction with images resulting in FITS files.
-    The peak is calculated from the restored image, the RMS is calculated in area of the residual image.
+    The peak is calculated from the restored image, the RMS is calculated in area of the residual image. Only the
+    noise window is read from the residual image and the restored image is read in blocks of rows, so at most one
+    block is held in memory. Images scaled with BSCALE and BZERO are held in memory.
 
     Parameters
     ----------
@@ -177,33 +214,94 @@ def calculate_psnr_fits(
         Number of sigma noise values to calculate the noise in the residual image
     use_sigma_clipped_stats:
         Whether to use astropy sigma_clipped_stats to calculate the mad_std of the residual image
+    per_plane :
+        Whether to calculate the statistics of each frequency and Stokes plane of a cube separately
+    chunk_pixels :
+        Maximum number of pixels of the restored image read at once
 
     Returns
     -------
     tuple:
-        A tuple with the peak signal-to-noise, the peak and the RMS
+        A tuple with the peak signal-to-noise, the peak and the RMS. With per_plane they are arrays with one value
+        per plane
     """
-    signal_data = get_data(signal_fits_name)
-    res_data = get_data(residual_fits_name)
+    with fits.open(signal_fits_name, memmap=True) as hdul:
+        hdu = hdul[0]
+        scaled = _is_scaled_fits(hdu)
+        nrows, ncolumns = hdu.shape[-2:]
+        nplanes = int(np.prod(hdu.shape[:-2]))
+        block_rows = max(1, chunk_pixels // max(ncolumns * nplanes, 1))
+        peak = np.full(nplanes, -np.inf)
+        for start in range(0, nrows, block_rows):
+            block = _read_fits_window(hdu, rows=slice(start, start + block_rows), scaled=scaled)
+            block = np.where(np.isnan(block), -np.inf, block)
+            peak = np.maximum(peak, block.reshape(nplanes, -1).max(axis=1))
+    peak[np.isinf(peak)] = np.nan
+
+    with fits.open(residual_fits_name, memmap=True) as hdul:
+        res_data = _read_fits_window(
+            hdul[0],
+            rows=slice(0, pixels),
+            columns=slice(0, pixels),
+            scaled=_is_scaled_fits(hdul[0])
+        )
+    res_data = res_data.reshape(res_data.shape[0], -1)
+    if not per_plane:
+        res_data = res_data.ravel()
+        peak = np.nanmax(peak)
 
+    axis = -1 if per_plane else None
     if use_sigma_clipped_stats:
-        _, _, noise = sigma_clipped_stats(
-            data=res_data[0:pixels, 0:pixels], sigma=sigma, stdfunc="mad_std"
-        )
+        _, _, noise = sigma_clipped_stats(data=res_data, sigma=sigma, stdfunc="mad_std", axis=axis)
     else:
-        noise = nanrms(res_data[0:pixels, 0:pixels])
-    peak = np.nanmax(signal_data)
+        noise = nanrms(res_data, axis=axis)
     peak_signal_to_noise = peak / noise
 
     return peak_signal_to_noise, peak, noise
 
 
-def calculate_psnr_ms(signal_ms_name: str = "",
-                      residual_ms_name: str = "",
-                      pixels: int = None) -> Tuple[float, float, float]:
+def _casa_image_blocks(shape: list = None, pixels: int = None, chunk_pixels: int = 2**24):
+    """
+    Generator that yields the bottom-left and top-right corners of blocks of rows of a CASA image. Each block spans
+    every plane of the other axes and has at most chunk_pixels pixels, or a single row. If pixels is given, only the
+    bottom-left box of pixels x pixels is covered.
+    """
+    shape = list(shape)
+    if pixels is not None:
+        shape[0] = min(pixels, shape[0])
+        shape[1] = min(pixels, shape[1])
+    row_pixels = int(np.prod(shape)) // shape[1]
+    block_rows = max(1, chunk_pixels // max(row_pixels, 1))
+    for start in range(0, shape[1], block_rows):
+        blc = [0] * len(shape)
+        trc = [length - 1 for length in shape]
+        blc[1] = start
+        trc[1] = min(start + block_rows, shape[1]) - 1
+        yield blc, trc
+
+
+def _read_casa_image(ia: image = None, blc: list = None, trc: list = None) -> np.ndarray:
+    """
+    Function that reads the finite, unmasked pixels of a block of an opened CASA image
+    """
+    data = ia.getchunk(blc=blc, trc=trc)
+    mask = ia.getchunk(blc=blc, trc=trc, getmask=True)
+    return data[mask & np.isfinite(data)]
+
+
+def calculate_psnr_ms(
+    signal_ms_name: str = "",
+    residual_ms_name: str = "",
+    pixels: int = None,
+    use_mad: bool = False,
+    chunk_pixels: int = 2**24
+) -> Tuple[float, float, float]:
     """
     Function that calculates the peak signal-to-noise ratio of a reconstruction with images resulting in CASA files.
-    The peak is calculated from the restored image, the RMS is calculated in area of the residual image.
+    The peak is calculated from the restored image and the RMS from the residual image, both in the same
+    bottom-left box of pixels x pixels like imstat with a box. The images are read in blocks of rows through the
+    image tool in a single pass, so only the box is read and neither image is held in memory. Masked and non-finite
+    pixels are ignored like imstat does.
 
     Parameters
     ----------
@@ -212,21 +310,51 @@ def calculate_psnr_ms(signal_ms_name: str = "",
     residual_ms_name :
         The absolute path to the residual image
     pixels :
-        Number of pixels on where to calculate the RMS
+        Number of pixels of the side of the box where the peak and the RMS are calculated. Default is None, and it
+        means the whole images
+    use_mad :
+        Whether to calculate the noise as the median absolute deviation scaled to a standard deviation instead of
+        the RMS. The pixels of the noise box are then held in memory
+    chunk_pixels :
+        Maximum number of pixels read at once
 
     Returns
     -------
     tuple:
         A tuple with the peak signal-to-noise, the peak and the RMS
     """
-    box = ""
-    if pixels is not None:
-        box = "0,0," + str(pixels - 1) + "," + str(pixels - 1)
-
-    stats_signal = imstat(signal_ms_name, box=box)
-    stats_residuals = imstat(residual_ms_name, box=box)
-    peak = stats_signal["max"][0]
-    stdv = stats_residuals["rms"][0]
+    ia = image()
+    ia.open(signal_ms_name)
+    try:
+        peak = -np.inf
+        for blc, trc in _casa_image_blocks(ia.shape(), pixels, chunk_pixels):
+            values = _read_casa_image(ia, blc, trc)
+            if values.size > 0:
+                peak = max(peak, float(values.max()))
+    finally:
+        ia.close()
+
+    ia.open(residual_ms_name)
+    try:
+        squares = 0.0
+        count = 0
+        noise_values = []
+        for blc, trc in _casa_image_blocks(ia.shape(), pixels, chunk_pixels):
+            values = _read_casa_image(ia, blc, trc)
+            if use_mad:
+                noise_values.append(values)
+            else:
+                squares += float(np.sum(np.square(values, dtype=np.float64)))
+                count += values.size
+    finally:
+        ia.close()
+        ia.done()
+
+    if use_mad:
+        noise_values = np.concatenate(noise_values)
+        stdv = float(1.4826 * np.median(np.abs(noise_values - np.median(noise_values))))
+    else:
+        stdv = np.sqrt(squares / count) if count > 0 else np.nan
     psnr = peak / stdv
     return psnr, peak, stdv
 
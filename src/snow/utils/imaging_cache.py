@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Union
+
+import numpy as np
+
+from .column_checkpoint import ColumnCheckpoint
+from .ms_metadata import metadata, open_table
+from .parallel_utils import get_sub_ms_names, is_multims
+from .run_manifest import checksum_path
+from .snapshot_utils import _storage_manager_file
+from .workspace import _disk_usage, parse_size
+
+
+def fingerprint_ms(
+    ms_name: str = "",
+    excluded_columns: tuple = ("MODEL_DATA", ),
+    included_columns: tuple = None,
+    checksums: dict = None
+) -> str:
+    """
+    Function that fingerprints the state of a measurement set from the relative path, size and modification time of
+    the storage manager files of its main table. Storage managers that only hold excluded columns are skipped, so
+    writing the model column does not change the fingerprint. Copies made with shutil.copytree or snapshot_ms keep
+    the modification times and therefore share the fingerprint of their source. A multi-MS is fingerprinted from
+    its sub-MSs. If a dictionary of checksums is given, the storage manager files are fingerprinted from their
+    content instead of their modification time, so the fingerprint only changes when the data change.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    excluded_columns :
+        Columns whose storage managers are not part of the fingerprint
+    included_columns :
+        If given, only the storage managers that hold at least one of these columns are part of the fingerprint
+    checksums :
+        Dictionary of previous checksums of the storage manager files, updated in place as in checksum_path. Default
+        is None, and it means that the modification times are used
+
+    Returns
+    -------
+    The hexadecimal fingerprint
+    """
+    if is_multims(ms_name):
+        # The main table of a multi-MS only references its sub-MSs
+        sha = hashlib.sha256()
+        for sub_ms_name in get_sub_ms_names(ms_name):
+            sha.update(
+                fingerprint_ms(sub_ms_name, excluded_columns, included_columns, checksums).encode()
+            )
+        return sha.hexdigest()
+
+    with open_table(ms_name) as mytb:
+        dminfo = mytb.getdminfo()
+        nrows = mytb.nrows()
+    excluded_seqnrs = set()
+    for dm in dminfo.values():
+        if all(column in excluded_columns for column in dm["COLUMNS"]):
+            excluded_seqnrs.add(int(dm["SEQNR"]))
+        elif included_columns is not None and not any(
+            column in included_columns for column in dm["COLUMNS"]
+        ):
+            excluded_seqnrs.add(int(dm["SEQNR"]))
+
+    sha = hashlib.sha256()
+    sha.update(str(nrows).encode())
+    for file_name in sorted(os.listdir(ms_name)):
+        match = _storage_manager_file.match(file_name)
+        if match is None or int(match.group(1)) in excluded_seqnrs:
+            continue
+        path = os.path.join(ms_name, file_name)
+        if checksums is not None:
+            sha.update("{0}:{1}".format(file_name, checksum_path(path, checksums)).encode())
+        else:
+            stat = os.stat(path)
+            sha.update("{0}:{1}:{2}".format(file_name, stat.st_size, stat.st_mtime_ns).encode())
+    return sha.hexdigest()
+
+
+def parameters_key(parameters: dict = None, signature: str = "") -> str:
+    """
+    Function that calculates the key shared by the runs with the same parameters on the same data
+
+    Parameters
+    ----------
+    parameters :
+        Dictionary with the parameters. Values that are not JSON serializable are converted to strings
+    signature :
+        Signature of the data, e.g. a measurement set fingerprint or a uv coverage signature
+
+    Returns
+    -------
+    The hexadecimal key
+    """
+    sha = hashlib.sha256()
+    sha.update(signature.encode())
+    sha.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+    return sha.hexdigest()
+
+
+def _list_products(imagename: str = "") -> dict:
+    directory = os.path.dirname(os.path.abspath(imagename))
+    basename = os.path.basename(imagename)
+    products = {}
+    for product in os.listdir(directory):
+        # Products are named like <imagename>.image (tclean) or <imagename>-image.fits (WSClean), so other image
+        # names that share the prefix are not matched
+        if product.startswith((basename + ".", basename + "-")):
+            path = os.path.join(directory, product)
+            products[product[len(basename):]] = os.stat(path).st_mtime_ns
+    return products
+
+
+def _add_model_column(ms_name: str = "") -> None:
+    """
+    Function that adds a MODEL_DATA column with the same description as the DATA column
+    """
+    with open_table(ms_name, nomodify=False) as mytb:
+        description = mytb.getcoldesc("DATA")
+        description["comment"] = "The model data column"
+        mytb.addcols(
+            {"MODEL_DATA": description}, {
+                "TYPE": "TiledShapeStMan",
+                "NAME": "ModelTiled",
+                "SPEC": {
+                    "DEFAULTTILESHAPE": np.array([4, 32, 128], dtype=np.int32)
+                }
+            }
+        )
+    metadata.invalidate(ms_name)
+
+
+class ImagingCache:
+
+    def __init__(self, directory: str = "", max_size: Union[int, float, str] = None):
+        """
+        Content-addressed store of imaging results. Each entry keeps the image products written by an imager, the
+        resulting statistics and the model column, and is keyed on the state of the input measurement set and the
+        imager parameters. The state of the measurement set is checksummed from the content of its storage managers,
+        and the checksums are kept in the store so unchanged files are not read again. Every entry holds a copy of the model column, so the store can be bounded in size, in
+        which case the least recently used entries are evicted after each save.
+
+        Parameters
+        ----------
+        directory :
+            Absolute path to the directory where the entries are saved
+        max_size :
+            Maximum disk usage of the entries, in bytes or as a string with units, e.g "50GB". Default is None, and
+            it means no bound
+        """
+        self.directory = directory
+        self.max_size = None if max_size is None else parse_size(max_size)
+
+    def key(self, ms_name: str = "", parameters: dict = None) -> str:
+        """
+        Calculates the cache key of an imaging run
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the input measurement set
+        parameters :
+            Dictionary with the imager parameters
+
+        Returns
+        -------
+        The hexadecimal key
+        """
+        checksums_file = os.path.join(self.directory, "checksums.json")
+        checksums = {}
+        if os.path.exists(checksums_file):
+            with open(checksums_file, "r") as f:
+                checksums = json.load(f)
+        fingerprint = fingerprint_ms(ms_name, checksums=checksums)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(checksums_file, "w") as f:
+            # Files that have been deleted, e.g. with their measurement set, are dropped
+            json.dump({path: value for path, value in checksums.items() if os.path.exists(path)}, f)
+        return parameters_key(parameters, fingerprint)
+
+    def _entry_path(self, key: str = "") -> str:
+        return os.path.join(self.directory, key)
+
+    def exists(self, key: str = "") -> bool:
+        """
+        Returns True if an entry with the given key has been saved
+        """
+        return os.path.exists(os.path.join(self._entry_path(key), "stats.json"))
+
+    def snapshot_products(self, imagename: str = "") -> dict:
+        """
+        Lists the products that already exist for an image name so the new ones can be detected after imaging
+
+        Parameters
+        ----------
+        imagename :
+            Absolute path to the output image name
+
+        Returns
+        -------
+        A dictionary with the product suffixes and their modification times
+        """
+        return _list_products(imagename)
+
+    def save(
+        self,
+        key: str = "",
+        imagename: str = "",
+        ms_name: str = "",
+        statistics: dict = None,
+        previous_products: dict = None,
+        save_model: bool = True
+    ) -> None:
+        """
+        Saves the result of an imaging run
+
+        Parameters
+        ----------
+        key :
+            Cache key of the imaging run
+        imagename :
+            Absolute path to the output image name
+        ms_name :
+            Absolute path to the input measurement set
+        statistics :
+            Dictionary with the psnr, peak and stdv of the run
+        previous_products :
+            Products that existed before the run, as returned by snapshot_products
+        save_model :
+            Whether the model column was written by the imager
+        """
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            shutil.rmtree(entry_path)
+        products_path = os.path.join(entry_path, "products")
+        os.makedirs(products_path)
+        if previous_products is None:
+            previous_products = {}
+        suffixes = [
+            suffix for suffix, mtime in _list_products(imagename).items()
+            if previous_products.get(suffix) != mtime
+        ]
+        for suffix in suffixes:
+            source = imagename + suffix
+            destination = os.path.join(products_path, "product" + suffix)
+            if os.path.isdir(source):
+                shutil.copytree(source, destination)
+            else:
+                shutil.copy2(source, destination)
+
+        if save_model and "MODEL_DATA" in metadata.colnames(ms_name):
+            ColumnCheckpoint(directory=entry_path, columns=("MODEL_DATA", )).save(ms_name, "model")
+
+        with open(os.path.join(entry_path, "stats.json"), "w") as f:
+            json.dump({"statistics": statistics, "suffixes": suffixes}, f)
+        if self.max_size is not None:
+            self.evict(keep=key)
+
+    def evict(self, keep: str = "") -> int:
+        """
+        Deletes the least recently used entries while the disk usage of the store is over max_size
+
+        Parameters
+        ----------
+        keep :
+            Key of an entry that is never evicted, e.g. the one that has just been saved
+
+        Returns
+        -------
+        The number of evicted entries
+        """
+        if self.max_size is None or not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        usage = 0
+        seen = set()
+        for key in os.listdir(self.directory):
+            if not self.exists(key):
+                continue
+            size = _disk_usage(self._entry_path(key), seen)[0]
+            usage += size
+            if key != keep:
+                last_used = os.stat(os.path.join(self._entry_path(key), "stats.json")).st_mtime
+                entries.append((last_used, key, size))
+
+        evicted = 0
+        for _, key, size in sorted(entries):
+            if usage <= self.max_size:
+                break
+            shutil.rmtree(self._entry_path(key))
+            usage -= size
+            evicted += 1
+        return evicted
+
+    def load(self, key: str = "", imagename: str = "", ms_name: str = "") -> dict:
+        """
+        Restores the result of an imaging run, copying its products to the image name and restoring the model
+        column of the measurement set
+
+        Parameters
+        ----------
+        key :
+            Cache key of the imaging run
+        imagename :
+            Absolute path to the output image name
+        ms_name :
+            Absolute path to the input measurement set
+
+        Returns
+        -------
+        A dictionary with the psnr, peak and stdv of the run
+        """
+        entry_path = self._entry_path(key)
+        with open(os.path.join(entry_path, "stats.json"), "r") as f:
+            entry = json.load(f)
+
+        checkpoint = ColumnCheckpoint(directory=entry_path, columns=("MODEL_DATA", ))
+        if checkpoint.exists("model"):
+            if "MODEL_DATA" not in metadata.colnames(ms_name):
+                _add_model_column(ms_name)
+            checkpoint.restore(ms_name, "model")
+
+        for suffix in entry["suffixes"]:
+            source = os.path.join(entry_path, "products", "product" + suffix)
+            destination = imagename + suffix
+            if os.path.isdir(destination):
+                shutil.rmtree(destination)
+            elif os.path.exists(destination):
+                os.remove(destination)
+            if os.path.isdir(source):
+                shutil.copytree(source, destination)
+            else:
+                shutil.copy2(source, destination)
+        # The modification time of the statistics marks the last use of the entry
+        os.utime(os.path.join(entry_path, "stats.json"))
+        return entry["statistics"]
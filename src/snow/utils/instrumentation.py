@@ -0,0 +1,158 @@
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _read_io_counters() -> dict:
+    """
+    Function that reads the storage I/O counters of the current process from /proc/self/io. Returns zeros on
+    platforms that do not provide them.
+    """
+    counters = {"read_bytes": 0, "write_bytes": 0}
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                key, value = line.split(":")
+                if key in counters:
+                    counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is the peak of the whole process lifetime, in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _cpu_time() -> float:
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+
+class Tracer:
+
+    def __init__(self):
+        """
+        Lightweight recorder of timed spans. Each span stores its wall time, the CPU time of the process and its
+        children, the peak resident set size and the bytes read and written to storage. The operating system only
+        reports the peak resident set size of the whole process lifetime, so each span stores that lifetime peak
+        (lifetime_max_rss_mb) and how much the span raised it (max_rss_growth_mb). A growth of zero means the span
+        stayed below an earlier peak, not that it used no memory. Spans can be nested and
+        opened from several threads, and are exported in the Chrome trace event format (chrome://tracing, Perfetto).
+        CPU time and I/O are measured for the whole process, so concurrent spans share them.
+        """
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.events = []
+
+    def reset(self) -> None:
+        """
+        Drops every recorded span
+        """
+        with self._lock:
+            self._origin = time.perf_counter()
+            self.events = []
+
+    @contextmanager
+    def span(self, name: str = "", category: str = "selfcal", **kwargs):
+        """
+        Context manager that records the block it wraps as a span
+
+        Parameters
+        ----------
+        name :
+            Name of the stage
+        category :
+            Category of the stage
+        kwargs :
+            Extra arguments stored with the span, e.g. the measurement set or the solution interval
+        """
+        io_start = _read_io_counters()
+        cpu_start = _cpu_time()
+        rss_start = _max_rss_mb()
+        wall_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_end = time.perf_counter()
+            cpu_end = _cpu_time()
+            io_end = _read_io_counters()
+            rss_end = _max_rss_mb()
+            args = {
+                "cpu_time_s": cpu_end - cpu_start,
+                "lifetime_max_rss_mb": rss_end,
+                "max_rss_growth_mb": rss_end - rss_start,
+                "read_bytes": io_end["read_bytes"] - io_start["read_bytes"],
+                "write_bytes": io_end["write_bytes"] - io_start["write_bytes"]
+            }
+            args.update({key: str(value) for key, value in kwargs.items()})
+            with self._lock:
+                self.events.append(
+                    {
+                        "name": name,
+                        "cat": category,
+                        "ph": "X",
+                        "ts": (wall_start - self._origin) * 1e6,
+                        "dur": (wall_end - wall_start) * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                        "args": args
+                    }
+                )
+
+    def summary(self) -> dict:
+        """
+        Aggregates the recorded spans per stage name
+
+        Returns
+        -------
+        A dictionary with the number of calls, the wall and CPU time in seconds, the largest growth of the peak
+        resident set size in MB and the bytes read and written of each stage
+        """
+        summary = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            stage = summary.setdefault(
+                event["name"], {
+                    "calls": 0,
+                    "wall_time_s": 0.0,
+                    "cpu_time_s": 0.0,
+                    "max_rss_growth_mb": 0.0,
+                    "read_bytes": 0,
+                    "write_bytes": 0
+                }
+            )
+            stage["calls"] += 1
+            stage["wall_time_s"] += event["dur"] / 1e6
+            stage["cpu_time_s"] += event["args"]["cpu_time_s"]
+            stage["max_rss_growth_mb"] = max(
+                stage["max_rss_growth_mb"], event["args"]["max_rss_growth_mb"]
+            )
+            stage["read_bytes"] += event["args"]["read_bytes"]
+            stage["write_bytes"] += event["args"]["write_bytes"]
+        return summary
+
+    def save(self, path: str = "") -> None:
+        """
+        Writes the recorded spans as a Chrome trace JSON file
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the output JSON file
+        """
+        with self._lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(trace, f)
+        os.replace(temporary_path, path)
+
+
+tracer = Tracer()
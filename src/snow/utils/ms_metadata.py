@@ -0,0 +1,140 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from casatools import table
+
+from .parallel_utils import get_sub_ms_names
+
+
+@contextmanager
+def open_table(table_name: str = "", nomodify: bool = True):
+    """
+    Context manager that opens a CASA table with its own table tool and always closes it, even if an exception is
+    raised while the table is being used
+
+    Parameters
+    ----------
+    table_name :
+        Absolute path to the CASA table
+    nomodify :
+        Whether to open the table in read-only mode or not
+
+    Yields
+    ------
+    The opened table tool
+    """
+    mytb = table()
+    mytb.open(tablename=table_name, nomodify=nomodify)
+    try:
+        yield mytb
+    finally:
+        mytb.close()
+        mytb.done()
+
+
+class MSMetadata:
+
+    def __init__(self):
+        """
+        Cache of measurement set metadata (column names, number of rows, antennas, spectral windows and fields).
+        Entries are kept per table path and are invalidated when the modification time or size of the table.dat file
+        of the table changes, so repeated queries during the self-calibration loop do not reopen the tables.
+        """
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(table_name: str = "") -> tuple:
+        stat = os.stat(os.path.join(table_name, "table.dat"))
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        # Columns added to a multi-MS are added to its sub-MSs
+        for sub_ms_name in get_sub_ms_names(table_name):
+            stat = os.stat(os.path.join(sub_ms_name, "table.dat"))
+            stamp += (stat.st_mtime_ns, stat.st_size)
+        return stamp
+
+    def _get(self, table_name: str = "", item: str = "", loader=None):
+        if table_name == "":
+            raise ValueError("Measurement Set File cannot be empty")
+        if not os.path.exists(table_name):
+            raise FileNotFoundError("The Measurement Set File does not exist")
+        key = (os.path.realpath(table_name), item)
+        stamp = self._stamp(table_name)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        with open_table(table_name) as mytb:
+            value = loader(mytb)
+        with self._lock:
+            self._cache[key] = (stamp, value)
+        return value
+
+    def invalidate(self, table_name: str = None) -> None:
+        """
+        Drops the cached entries of a table, or every entry if no table is given
+
+        Parameters
+        ----------
+        table_name :
+            Absolute path to the CASA table
+        """
+        with self._lock:
+            if table_name is None:
+                self._cache.clear()
+            else:
+                path = os.path.realpath(table_name)
+                for key in [key for key in self._cache if key[0] == path]:
+                    del self._cache[key]
+
+    def colnames(self, table_name: str = "") -> list:
+        """
+        Returns the column names of a table
+        """
+        return self._get(table_name, "colnames", lambda mytb: list(mytb.colnames()))
+
+    def nrows(self, table_name: str = "") -> int:
+        """
+        Returns the number of rows of a table
+        """
+        return self._get(table_name, "nrows", lambda mytb: mytb.nrows())
+
+    def antennas(self, ms_name: str = "") -> dict:
+        """
+        Returns the names and row flags of the ANTENNA table of a measurement set
+        """
+        return self._get(
+            os.path.join(ms_name, "ANTENNA"), "antennas", lambda mytb: {
+                "name": list(mytb.getcol("NAME")),
+                "flag_row": mytb.getcol("FLAG_ROW")
+            }
+        )
+
+    def spectral_windows(self, ms_name: str = "") -> dict:
+        """
+        Returns the number of channels and the channel frequencies of each spectral window of a measurement set
+        """
+
+        def loader(mytb):
+            num_chan = mytb.getcol("NUM_CHAN")
+            return {
+                "num_chan": num_chan,
+                "chan_freq": [mytb.getcell("CHAN_FREQ", row) for row in range(len(num_chan))]
+            }
+
+        return self._get(os.path.join(ms_name, "SPECTRAL_WINDOW"), "spectral_windows", loader)
+
+    def fields(self, ms_name: str = "") -> dict:
+        """
+        Returns the names and phase directions of the FIELD table of a measurement set
+        """
+        return self._get(
+            os.path.join(ms_name, "FIELD"), "fields", lambda mytb: {
+                "name": list(mytb.getcol("NAME")),
+                "phase_dir": mytb.getcol("PHASE_DIR")
+            }
+        )
+
+
+metadata = MSMetadata()
@@ -0,0 +1,51 @@
+import os
+
+
+def is_multims(ms_name: str = "") -> bool:
+    """
+    Function that returns True if a measurement set is a multi-MS created by partition
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    """
+    return os.path.isdir(os.path.join(ms_name, "SUBMSS"))
+
+
+def get_sub_ms_names(ms_name: str = "") -> list:
+    """
+    Function that returns the absolute paths to the sub-MSs of a multi-MS, or an empty list for a regular
+    measurement set
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    """
+    if not is_multims(ms_name):
+        return []
+    submss = os.path.join(ms_name, "SUBMSS")
+    return [os.path.join(submss, sub_ms_name) for sub_ms_name in sorted(os.listdir(submss))]
+
+
+def is_mpi_enabled() -> bool:
+    """
+    Function that returns True if CASA is running under MPI with casampi, e.g. when launched with mpicasa or
+    mpirun. casampi is optional, so False is returned when it is not installed.
+    """
+    try:
+        from casampi.MPIEnvironment import MPIEnvironment
+    except ImportError:
+        return False
+    return bool(MPIEnvironment.is_mpi_enabled)
+
+
+def get_mpi_world_size() -> int:
+    """
+    Function that returns the number of MPI processes CASA is running on, or 1 when MPI is not enabled
+    """
+    if not is_mpi_enabled():
+        return 1
+    from casampi.MPIEnvironment import MPIEnvironment
+    return int(MPIEnvironment.mpi_world_size)
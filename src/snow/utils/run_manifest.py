@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+
+
+def _manifest_files(path: str = "") -> list:
+    """
+    Function that lists the files of a file or directory that are part of its checksum, in sorted order
+    """
+    if os.path.isdir(path):
+        file_names = []
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                file_names.append(os.path.join(root, file_name))
+    else:
+        file_names = [path]
+    # Lock files are rewritten every time a table is opened
+    return [file_name for file_name in sorted(file_names) if not file_name.endswith("table.lock")]
+
+
+def checksum_path(path: str = "", cache: dict = None) -> str:
+    """
+    Function that calculates the SHA-256 checksum of a file or of all the files inside a directory (e.g. a
+    calibration table). Files are visited in sorted order and their relative paths are part of the checksum.
+
+    Parameters
+    ----------
+    path :
+        Absolute path to the file or directory
+    cache :
+        Dictionary of previous checksums, updated in place. If the relative path, size and modification time of
+        every file are the same as when the cached checksum was calculated, the files are not read again
+
+    Returns
+    -------
+    The hexadecimal checksum
+    """
+    file_names = _manifest_files(path)
+    if cache is not None:
+        signature = []
+        for file_name in file_names:
+            stat = os.stat(file_name)
+            signature.append([os.path.relpath(file_name, path), stat.st_size, stat.st_mtime_ns])
+        if path in cache and cache[path][0] == signature:
+            return cache[path][1]
+
+    sha = hashlib.sha256()
+    for file_name in file_names:
+        sha.update(os.path.relpath(file_name, path).encode())
+        with open(file_name, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    checksum = sha.hexdigest()
+    if cache is not None:
+        cache[path] = (signature, checksum)
+    return checksum
+
+
+class RunManifest:
+
+    def __init__(self, path: str = ""):
+        """
+        JSON manifest that persists the state of a self-calibration run so it can be resumed after a crash
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the JSON manifest file
+        """
+        self.path = path
+
+    def exists(self) -> bool:
+        """
+        Returns True if the manifest file has been written
+        """
+        return os.path.exists(self.path)
+
+    def load(self) -> dict:
+        """
+        Reads the manifest
+
+        Returns
+        -------
+        A dictionary with the state of the run
+        """
+        with open(self.path, "r") as f:
+            state = json.load(f)
+        return state
+
+    def save(self, state: dict = None) -> None:
+        """
+        Writes the manifest atomically so an interrupted write never leaves a corrupted file behind
+
+        Parameters
+        ----------
+        state :
+            Dictionary with the state of the run
+        """
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(temporary_path, self.path)
+
+    def verify_checksums(self, state: dict = None, cache: dict = None) -> None:
+        """
+        Checks that the artifacts recorded in the manifest have not changed since they were written
+
+        Parameters
+        ----------
+        state :
+            Dictionary with the state of the run
+        cache :
+            Dictionary of checksums passed to checksum_path, updated in place
+        """
+        for artifact, checksum in state["checksums"].items():
+            if not os.path.exists(artifact):
+                raise FileNotFoundError(
+                    "The artifact " + artifact + " recorded in " + self.path + " does not exist"
+                )
+            if checksum_path(artifact, cache) != checksum:
+                raise ValueError(
+                    "The artifact " + artifact + " has changed since " + self.path + " was written"
+                )
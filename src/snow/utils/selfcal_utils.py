@@ -1,8 +1,10 @@
-import os
+from typing import Tuple
 
-from casatools import table
+import astropy.units as u
+import numpy as np
+from astropy.units import Quantity
 
-tb = table()
+from .ms_metadata import metadata
 
 
 def is_column_in_ms(ms_name: str = "", column_name: str = "") -> bool:
@@ -20,19 +22,7 @@ def is_column_in_ms(ms_name: str = "", column_name: str = "") -> bool:
         -------
         True if column_name exists False otherwise
     """
-    if ms_name != "":
-        if os.path.exists(ms_name):
-            # Check if data_column is present in measurement set file
-            tb.open(tablename=ms_name)
-            col_names = tb.colnames()
-            if column_name in col_names:
-                return True
-            else:
-                return False
-        else:
-            raise FileNotFoundError("The Measurement Set File does not exist")
-    else:
-        raise ValueError("Measurement Set File cannot be empty")
+    return column_name in metadata.colnames(ms_name)
 
 
 def get_table_rows(ms_table: str = "") -> int:
@@ -50,10 +40,7 @@ def get_table_rows(ms_table: str = "") -> int:
         The number of rows of the measurement set table
 
     """
-    tb.open(tablename=ms_table)
-    rows = tb.nrows()
-    tb.close()
-    return rows
+    return metadata.nrows(ms_table)
 
 
 def calculate_number_antennas(ms_name: str = "") -> int:
@@ -70,14 +57,64 @@ def calculate_number_antennas(ms_name: str = "") -> int:
     nrows :
         Number of non-flagged antennas
     """
-    if ms_name != "":
-        if os.path.exists(ms_name):
-            tb.open(tablename=ms_name + "/ANTENNA")
-            query_table = tb.taql("select NAME from " + ms_name + "/ANTENNA" + " where !FLAG_ROW")
-            nrows = len(query_table.getcol("NAME"))
-            tb.close()
-            return nrows
-        else:
-            raise FileNotFoundError("The Measurement Set File does not exist")
+    return int(np.sum(~metadata.antennas(ms_name)["flag_row"]))
+
+
+def parse_solint(solint: str = "inf") -> float:
+    """
+    Function that converts a CASA solution interval string into seconds
+
+    Parameters
+    ----------
+    solint :
+        Solution interval: e.g "inf", "int", "60s", "3.5min", "1h". Numbers without units are seconds
+
+    Returns
+    -------
+    The solution interval in seconds. "inf" returns numpy infinity and "int" returns zero
+    """
+    solint = solint.strip()
+    if solint == "inf":
+        return np.inf
+    elif solint == "int":
+        return 0.0
+    try:
+        return float(solint)
+    except ValueError:
+        return Quantity(solint).to(u.s).value
+
+
+def parse_uvrange(uvrange: str = "") -> Tuple[float, float, bool]:
+    """
+    Function that converts a CASA uvrange string into lower and upper limits
+
+    Parameters
+    ----------
+    uvrange :
+        uvrange string: e.g "0~100km", ">60klambda", "<1000m". Default unit is meters
+
+    Returns
+    -------
+    tuple:
+        A tuple with the lower limit, the upper limit and whether the limits are in wavelengths (True) or meters
+    """
+    uvrange = uvrange.strip()
+    if uvrange == "":
+        return 0.0, np.inf, False
+    scales = {"lambda": 1.0, "klambda": 1e3, "Mlambda": 1e6, "m": 1.0, "km": 1e3}
+    unit = "m"
+    for candidate in sorted(scales.keys(), key=len, reverse=True):
+        if uvrange.endswith(candidate):
+            unit = candidate
+            uvrange = uvrange[:-len(candidate)].strip()
+            break
+    in_wavelengths = unit.endswith("lambda")
+    if uvrange.startswith(">"):
+        lower, upper = float(uvrange[1:]), np.inf
+    elif uvrange.startswith("<"):
+        lower, upper = 0.0, float(uvrange[1:])
+    elif "~" in uvrange:
+        lower, upper = (float(value) for value in uvrange.split("~"))
     else:
-        raise ValueError("Measurement Set File cannot be empty")
+        raise ValueError("Unrecognized uvrange " + uvrange)
+    return lower * scales[unit], upper * scales[unit], in_wavelengths
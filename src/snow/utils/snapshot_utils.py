@@ -0,0 +1,193 @@
+import fcntl
+import os
+import re
+import shutil
+
+from .instrumentation import tracer
+from .ms_metadata import open_table
+from .parallel_utils import get_sub_ms_names, is_multims
+
+# Linux ioctl request number to clone a file into another one sharing its extents (copy-on-write)
+FICLONE = 0x40049409
+
+# Columns that are written by gaincal/applycal/flagdata/tclean/statwt during self-calibration
+MUTABLE_COLUMNS = (
+    "CORRECTED_DATA", "MODEL_DATA", "FLAG", "FLAG_ROW", "WEIGHT", "SIGMA", "WEIGHT_SPECTRUM",
+    "SIGMA_SPECTRUM"
+)
+
+_storage_manager_file = re.compile(r"^table\.f(\d+)")
+
+
+def reflink_or_copy(src: str = "", dst: str = "") -> str:
+    """
+    Function that clones a file using a copy-on-write reflink (FICLONE) when the filesystem supports it,
+    falling back to a regular copy otherwise.
+
+    Parameters
+    ----------
+    src :
+        Absolute path to the source file
+    dst :
+        Absolute path to the destination file
+
+    Returns
+    -------
+    The destination path
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def get_mutable_storage_managers(table_name: str = "", columns: tuple = MUTABLE_COLUMNS) -> set:
+    """
+    Function that returns the sequence numbers of the storage managers holding any of the given columns. For a
+    multi-MS the storage managers of its first sub-MS are returned, since partition creates every sub-MS with the
+    same layout
+
+    Parameters
+    ----------
+    table_name :
+        Absolute path to the CASA table
+    columns :
+        Column names that are considered mutable
+
+    Returns
+    -------
+    A set with the storage manager sequence numbers
+    """
+    if is_multims(table_name):
+        table_name = get_sub_ms_names(table_name)[0]
+    with open_table(table_name) as mytb:
+        dminfo = mytb.getdminfo()
+    seqnrs = set()
+    for dm in dminfo.values():
+        if any(column in columns for column in dm["COLUMNS"]):
+            seqnrs.add(int(dm["SEQNR"]))
+    return seqnrs
+
+
+def _link_table(
+    table_name: str = "",
+    snapshot_name: str = "",
+    mutable_storage_managers: set = None,
+    skip: tuple = ()
+) -> tuple:
+    """
+    Function that hard-links the immutable storage manager files of a table and clones the rest of its files and
+    subtables, keeping symbolic links as they are
+
+    Returns
+    -------
+    tuple:
+        A tuple with the number of hard-linked and copied bytes
+    """
+    os.makedirs(snapshot_name)
+    linked_bytes = 0
+    copied_bytes = 0
+    for entry in os.scandir(table_name):
+        if entry.name in skip:
+            continue
+        destination = os.path.join(snapshot_name, entry.name)
+        if entry.is_symlink():
+            os.symlink(os.readlink(entry.path), destination)
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.copytree(entry.path, destination, symlinks=True, copy_function=reflink_or_copy)
+            continue
+        size = entry.stat(follow_symlinks=False).st_size
+        match = _storage_manager_file.match(entry.name)
+        if match is not None and int(match.group(1)) not in mutable_storage_managers:
+            try:
+                os.link(entry.path, destination)
+                linked_bytes += size
+                continue
+            except OSError:
+                # Hard links are not possible across filesystems
+                pass
+        reflink_or_copy(entry.path, destination)
+        copied_bytes += size
+    return linked_bytes, copied_bytes
+
+
+def snapshot_ms(
+    ms_name: str = "",
+    snapshot_name: str = "",
+    mode: str = "copy",
+    mutable_columns: tuple = MUTABLE_COLUMNS,
+    mutable_storage_managers: set = None
+) -> str:
+    """
+    Function that creates a snapshot of a measurement set. In "copy" mode the whole directory tree is copied.
+    In "link" mode the storage manager files of the main table that only hold columns that are never written
+    during self-calibration (e.g. DATA, UVW, TIME) are hard-linked, while the rest of the files and all the
+    subtables are cloned with a reflink when the filesystem supports it or copied otherwise. This way the
+    cost of a snapshot scales with the size of the mutated columns instead of the size of the measurement set.
+
+    A multi-MS is snapshotted sub-MS by sub-MS, keeping the symbolic links between their subtables.
+
+    NOTE: Hard-linked files are shared between the measurement set and its snapshot, so the "link" mode must only
+    be used when the columns not listed in mutable_columns are not modified in place afterwards.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    snapshot_name :
+        Absolute path to the snapshot
+    mode :
+        Snapshot mode ("copy" or "link")
+    mutable_columns :
+        Columns whose storage manager files are physically copied in "link" mode
+    mutable_storage_managers :
+        Sequence numbers of the storage managers to copy in "link" mode. If None they are calculated from
+        mutable_columns
+
+    Returns
+    -------
+    The absolute path to the snapshot
+    """
+    with tracer.span("ms_copy", ms=ms_name, mode=mode):
+        if mode == "copy":
+            # Sub-MSs of a multi-MS share their subtables through symbolic links
+            shutil.copytree(ms_name, snapshot_name, symlinks=True)
+        elif mode == "link":
+            if is_multims(ms_name):
+                if mutable_storage_managers is None:
+                    mutable_storage_managers = get_mutable_storage_managers(
+                        ms_name, mutable_columns
+                    )
+                # The main table of a multi-MS only references its sub-MSs and is always copied
+                linked_bytes, copied_bytes = _link_table(
+                    ms_name, snapshot_name, set(), skip=("SUBMSS", )
+                )
+                os.makedirs(os.path.join(snapshot_name, "SUBMSS"))
+                for sub_ms_name in get_sub_ms_names(ms_name):
+                    sub_linked_bytes, sub_copied_bytes = _link_table(
+                        sub_ms_name,
+                        os.path.join(snapshot_name, "SUBMSS", os.path.basename(sub_ms_name)),
+                        mutable_storage_managers
+                    )
+                    linked_bytes += sub_linked_bytes
+                    copied_bytes += sub_copied_bytes
+            else:
+                if mutable_storage_managers is None:
+                    mutable_storage_managers = get_mutable_storage_managers(
+                        ms_name, mutable_columns
+                    )
+                linked_bytes, copied_bytes = _link_table(
+                    ms_name, snapshot_name, mutable_storage_managers
+                )
+            print(
+                "Snapshot {0}: {1:0.3f} GB hard-linked, {2:0.3f} GB copied".format(
+                    snapshot_name, linked_bytes / 1e9, copied_bytes / 1e9
+                )
+            )
+        else:
+            raise ValueError("Snapshot mode should be either 'copy' or 'link'")
+    return snapshot_name
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+from casatasks import mstransform
+
+from .imaging_cache import fingerprint_ms
+from .instrumentation import tracer
+from .ms_metadata import open_table
+
+# Averaging time in seconds used for infinite solution intervals
+SCAN_TIMEBIN = 1.0e7
+
+# Columns that change during self-calibration and are refreshed in the averaged copy
+REFRESHED_COLUMNS = ("MODEL_DATA", "FLAG", "FLAG_ROW")
+
+
+class SolveCache:
+
+    def __init__(self, directory: str = "", max_new_flags: float = 0.05, chunk_rows: int = 100000):
+        """
+        Cache of time and frequency averaged copies of a measurement set used to solve the gains. An averaged copy
+        keeps DATA, MODEL_DATA, WEIGHT and FLAG at the solve resolution and is keyed on the state of the DATA
+        column and on the averaging, so it is kept across iterations and across copies of the measurement set that
+        share the same DATA. When the model or the flags change, only MODEL_DATA and FLAG are averaged again and
+        written into the existing copy. The averaged DATA keeps the flags it was built with, so the copy is rebuilt
+        when more than max_new_flags of its unflagged samples have been flagged since then. Only the latest copy is
+        kept.
+
+        Parameters
+        ----------
+        directory :
+            Absolute path to the directory where the averaged copies are saved
+        max_new_flags :
+            Maximum fraction of the unflagged averaged samples that can be flagged after the copy was built before
+            the averaged DATA is rebuilt
+        chunk_rows :
+            Maximum number of rows read or written at once while refreshing the copy
+        """
+        self.directory = directory
+        self.max_new_flags = max_new_flags
+        self.chunk_rows = chunk_rows
+
+    def key(self, ms_name: str = "", timebin: float = 0.0, chanbin: int = 1) -> str:
+        """
+        Calculates the cache key of an averaged copy
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set
+        timebin :
+            Averaging time in seconds
+        chanbin :
+            Number of channels averaged together
+
+        Returns
+        -------
+        The hexadecimal key
+        """
+        sha = hashlib.sha256()
+        sha.update(
+            fingerprint_ms(ms_name, excluded_columns=(), included_columns=("DATA", )).encode()
+        )
+        sha.update("{0}:{1}".format(timebin, chanbin).encode())
+        return sha.hexdigest()
+
+    def clear(self) -> None:
+        """
+        Deletes the cache and all its averaged copies
+        """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+    @staticmethod
+    def _average(
+        ms_name: str = "",
+        output_ms: str = "",
+        datacolumn: str = "data,model",
+        timebin: float = 0.0,
+        chanbin: int = 1
+    ) -> None:
+        mstransform(
+            vis=ms_name,
+            outputvis=output_ms,
+            datacolumn=datacolumn,
+            keepflags=True,
+            timeaverage=timebin > 0.0,
+            # The averaging stops at scan boundaries, so a bin longer than the observation averages scans
+            timebin="{0}s".format(SCAN_TIMEBIN if np.isinf(timebin) else timebin),
+            chanaverage=chanbin > 1,
+            chanbin=chanbin
+        )
+
+    def _refresh(self, averaged_ms: str = "", refreshed_ms: str = "") -> bool:
+        """
+        Copies the averaged model and flags of refreshed_ms, whose DATA column holds the averaged model, into the
+        cached copy
+
+        Returns
+        -------
+        False if the copies do not match or too many samples were flagged, and the copy has to be rebuilt
+        """
+        new_flags = 0
+        unflagged = 0
+        with open_table(refreshed_ms) as source, open_table(averaged_ms, nomodify=False) as target:
+            if source.nrows() != target.nrows():
+                return False
+            for start in range(0, target.nrows(), self.chunk_rows):
+                nrow = min(self.chunk_rows, target.nrows() - start)
+                flag = source.getcol("FLAG", startrow=start, nrow=nrow)
+                previous_flag = target.getcol("FLAG", startrow=start, nrow=nrow)
+                if flag.shape != previous_flag.shape:
+                    return False
+                new_flags += np.count_nonzero(flag & ~previous_flag)
+                unflagged += np.count_nonzero(~previous_flag)
+                target.putcol(
+                    "MODEL_DATA", source.getcol("DATA", startrow=start, nrow=nrow), startrow=start
+                )
+                target.putcol("FLAG", flag, startrow=start)
+                target.putcol(
+                    "FLAG_ROW",
+                    source.getcol("FLAG_ROW", startrow=start, nrow=nrow),
+                    startrow=start
+                )
+            target.flush()
+        return new_flags <= self.max_new_flags * max(unflagged, 1)
+
+    def get(self, ms_name: str = "", timebin: float = 0.0, chanbin: int = 1) -> str:
+        """
+        Returns the averaged copy of a measurement set, creating it if the cached copy is missing or stale and
+        refreshing its model and flags if they changed
+
+        Parameters
+        ----------
+        ms_name :
+            Absolute path to the measurement set. It needs a MODEL_DATA column
+        timebin :
+            Averaging time in seconds. Zero disables the time averaging and infinity averages whole scans. Scan
+            boundaries are never crossed
+        chanbin :
+            Number of channels averaged together
+
+        Returns
+        -------
+        The absolute path to the averaged measurement set
+        """
+        key = self.key(ms_name, timebin, chanbin)
+        averaged_ms = os.path.join(self.directory, key[:16] + ".ms")
+        state_file = os.path.join(self.directory, key[:16] + ".json")
+        refresh_fingerprint = fingerprint_ms(
+            ms_name, excluded_columns=(), included_columns=REFRESHED_COLUMNS
+        )
+        if os.path.exists(averaged_ms) and os.path.exists(state_file):
+            with open(state_file, "r") as f:
+                if json.load(f)["refresh_fingerprint"] == refresh_fingerprint:
+                    return averaged_ms
+            refreshed_ms = os.path.join(self.directory, "refresh.ms")
+            if os.path.exists(refreshed_ms):
+                shutil.rmtree(refreshed_ms)
+            with tracer.span("solve_refresh", vis=ms_name, timebin=timebin, chanbin=chanbin):
+                self._average(ms_name, refreshed_ms, "model", timebin, chanbin)
+                refreshed = self._refresh(averaged_ms, refreshed_ms)
+            shutil.rmtree(refreshed_ms)
+            if refreshed:
+                with open(state_file, "w") as f:
+                    json.dump({"refresh_fingerprint": refresh_fingerprint}, f)
+                return averaged_ms
+
+        # Stale copies are never used again
+        self.clear()
+        os.makedirs(self.directory)
+        with tracer.span("solve_average", vis=ms_name, timebin=timebin, chanbin=chanbin):
+            self._average(ms_name, averaged_ms, "data,model", timebin, chanbin)
+        with open(state_file, "w") as f:
+            json.dump({"refresh_fingerprint": refresh_fingerprint}, f)
+        return averaged_ms
@@ -0,0 +1,82 @@
+import hashlib
+from typing import Tuple
+
+import numpy as np
+
+from .ms_metadata import open_table
+from .parallel_utils import get_sub_ms_names, is_multims
+
+
+def uv_coverage_signature(ms_name: str = "", chunk_rows: int = 100000) -> Tuple[str, np.ndarray]:
+    """
+    Function that summarises the sampling of a measurement set, which determines the PSF and the imaging weights,
+    independently of the visibilities. One pass reads UVW, FLAG, FLAG_ROW and WEIGHT_SPECTRUM (or WEIGHT) and
+    returns a digest of their content together with the unflagged weight of every row. Unlike the modification
+    times of the storage managers, the signature does not change when a task rewrites the same flags. A multi-MS is
+    summarised from its sub-MSs.
+
+    Parameters
+    ----------
+    ms_name :
+        Absolute path to the measurement set
+    chunk_rows :
+        Maximum number of rows read at once
+
+    Returns
+    -------
+    tuple:
+        The hexadecimal digest and an array with the unflagged weight of each row
+    """
+    ms_names = get_sub_ms_names(ms_name) if is_multims(ms_name) else [ms_name]
+    sha = hashlib.sha256()
+    row_weights = []
+    for sub_ms_name in ms_names:
+        with open_table(sub_ms_name) as mytb:
+            has_weight_spectrum = "WEIGHT_SPECTRUM" in mytb.colnames() and mytb.nrows() > 0
+            has_weight_spectrum = has_weight_spectrum and mytb.iscelldefined("WEIGHT_SPECTRUM", 0)
+            ddids = np.unique(mytb.getcol("DATA_DESC_ID")).tolist()
+            for ddid in ddids:
+                subtable = mytb.query("DATA_DESC_ID=={0}".format(ddid))
+                for start in range(0, subtable.nrows(), chunk_rows):
+                    nrow = min(chunk_rows, subtable.nrows() - start)
+                    uvw = subtable.getcol("UVW", startrow=start, nrow=nrow)
+                    flag = subtable.getcol("FLAG", startrow=start, nrow=nrow)
+                    flag |= subtable.getcol("FLAG_ROW", startrow=start, nrow=nrow)[None, None, :]
+                    if has_weight_spectrum:
+                        weight = subtable.getcol("WEIGHT_SPECTRUM", startrow=start, nrow=nrow)
+                    else:
+                        weight = np.broadcast_to(
+                            subtable.getcol("WEIGHT", startrow=start, nrow=nrow)[:, None, :],
+                            flag.shape
+                        )
+                    weight = np.where(flag, 0.0, weight)
+                    sha.update(np.ascontiguousarray(uvw).tobytes())
+                    sha.update(np.packbits(flag).tobytes())
+                    sha.update(np.ascontiguousarray(weight, dtype=np.float32).tobytes())
+                    row_weights.append(weight.sum(axis=(0, 1)))
+                subtable.close()
+    return sha.hexdigest(), np.concatenate(row_weights) if row_weights else np.zeros(0)
+
+
+def coverage_change(previous: np.ndarray = None, current: np.ndarray = None) -> float:
+    """
+    Function that calculates the relative change between the unflagged row weights of two signatures
+
+    Parameters
+    ----------
+    previous :
+        Row weights of the previous signature
+    current :
+        Row weights of the current signature
+
+    Returns
+    -------
+    The sum of the absolute weight differences divided by the total previous weight. Signatures with a different
+    number of rows are infinitely apart
+    """
+    if previous is None or current is None or previous.shape != current.shape:
+        return np.inf
+    total = np.sum(np.abs(previous))
+    if total == 0.0:
+        return 0.0 if not np.any(current) else np.inf
+    return float(np.sum(np.abs(current - previous)) / total)
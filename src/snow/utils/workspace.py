@@ -0,0 +1,235 @@
+import os
+import shutil
+import time
+from typing import Union
+
+import astropy.units as u
+from astropy.units import Quantity
+
+ROLES = ("accepted", "rejected", "intermediate")
+
+# Directories that belong to a measurement set and are deleted with it
+COMPANION_SUFFIXES = (".flagversions", ".flagstore", ".solvecache", ".checkpoints")
+
+
+def parse_size(size: Union[int, float, str] = 0) -> int:
+    """
+    Function that converts a disk size into bytes
+
+    Parameters
+    ----------
+    size :
+        Number of bytes or a string with units, e.g "500GB", "1.5TB"
+
+    Returns
+    -------
+    The size in bytes
+    """
+    if isinstance(size, str):
+        size = size.strip()
+        try:
+            return int(float(size))
+        except ValueError:
+            return int(Quantity(size).to(u.byte).value)
+    return int(size)
+
+
+def _disk_usage(path: str = "", seen: set = None) -> tuple:
+    """
+    Function that calculates the disk usage of a file or directory. Hard-linked files are counted once per seen set.
+
+    Returns
+    -------
+    tuple:
+        A tuple with the used bytes and the bytes that would be freed by deleting the path
+    """
+    if seen is None:
+        seen = set()
+    used = 0
+    freed = 0
+    if os.path.isdir(path) and not os.path.islink(path):
+        paths = (
+            os.path.join(root, file_name) for root, _, file_names in os.walk(path)
+            for file_name in file_names
+        )
+    else:
+        paths = [path]
+    for file_path in paths:
+        try:
+            stat = os.lstat(file_path)
+        except FileNotFoundError:
+            continue
+        size = stat.st_blocks * 512
+        if stat.st_nlink <= 1:
+            freed += size
+        if (stat.st_dev, stat.st_ino) not in seen:
+            seen.add((stat.st_dev, stat.st_ino))
+            used += size
+    return used, freed
+
+
+class Workspace:
+
+    def __init__(self, disk_budget: Union[int, float, str] = None, verbose: bool = True):
+        """
+        Registry of the artifacts created during self-calibration (measurement set copies, calibration tables and
+        image products) and of their role. Rejected artifacts are deleted as soon as they are released, and
+        intermediate artifacts are deleted from the oldest while the workspace is over its disk budget. Accepted
+        artifacts are never deleted. Paths that are not registered, such as the input measurement set, are never
+        touched.
+
+        Parameters
+        ----------
+        disk_budget :
+            Maximum disk usage of the registered artifacts, in bytes or as a string with units (e.g "500GB"). None
+            means no limit
+        verbose :
+            Whether to print the reclaimed space
+        """
+        self.disk_budget = parse_size(disk_budget) if disk_budget is not None else None
+        self.verbose = verbose
+        self.reclaimed_bytes = 0
+        self._artifacts = {}
+
+    def track(self, path: str = "", role: str = "intermediate", kind: str = "file") -> None:
+        """
+        Registers an artifact or changes its role
+
+        Parameters
+        ----------
+        path :
+            Absolute path to the artifact
+        role :
+            Role of the artifact ("accepted", "rejected" or "intermediate")
+        kind :
+            "ms" for measurement sets, whose companion directories are deleted with them, "image" for image
+            name prefixes, whose products (CASA "<name>.<product>" or WSClean "<name>-<product>.fits") are deleted
+            with them, or "file" for any other file or directory
+        """
+        if role not in ROLES:
+            raise ValueError("Error, role should be one of " + ", ".join(ROLES))
+        if path is None or path == "":
+            return
+        path = os.path.abspath(path)
+        if path in self._artifacts:
+            self._artifacts[path]["role"] = role
+        else:
+            self._artifacts[path] = {"role": role, "kind": kind, "created": time.time()}
+
+    def mark(self, path: str = "", role: str = "intermediate") -> None:
+        """
+        Changes the role of a registered artifact. Paths that are not registered are ignored
+        """
+        if path is None or path == "":
+            return
+        path = os.path.abspath(path)
+        if path in self._artifacts:
+            self.track(path, role)
+
+    def role(self, path: str = "") -> str:
+        """
+        Returns the role of an artifact, or None if it is not registered
+        """
+        artifact = self._artifacts.get(os.path.abspath(path))
+        return artifact["role"] if artifact is not None else None
+
+    def artifacts(self, role: str = None, kind: str = None) -> list:
+        """
+        Returns the registered artifacts with a given role and kind, or all of them, from the oldest to the newest
+        """
+        return [
+            path for path, artifact in
+            sorted(self._artifacts.items(), key=lambda item: item[1]["created"])
+            if (role is None or artifact["role"] == role) and
+            (kind is None or artifact["kind"] == kind)
+        ]
+
+    def _paths(self, path: str = "") -> list:
+        """
+        Returns the files and directories that make up an artifact
+        """
+        kind = self._artifacts[path]["kind"]
+        if kind == "ms":
+            return [path] + [path + suffix for suffix in COMPANION_SUFFIXES]
+        elif kind == "image":
+            directory = os.path.dirname(path)
+            basename = os.path.basename(path)
+            if not os.path.isdir(directory):
+                return []
+            return [
+                os.path.join(directory, product) for product in os.listdir(directory)
+                if product.startswith((basename + ".", basename + "-"))
+            ]
+        return [path]
+
+    def usage(self) -> int:
+        """
+        Returns the disk usage in bytes of the registered artifacts, counting hard-linked files once
+        """
+        seen = set()
+        used = 0
+        for path in self._artifacts:
+            for artifact_path in self._paths(path):
+                used += _disk_usage(artifact_path, seen)[0]
+        return used
+
+    def delete(self, path: str = "") -> int:
+        """
+        Deletes a registered artifact and forgets it
+
+        Returns
+        -------
+        The number of bytes freed. Files still hard-linked from other paths are not counted
+        """
+        path = os.path.abspath(path)
+        if path not in self._artifacts:
+            return 0
+        freed = 0
+        for artifact_path in self._paths(path):
+            if not os.path.lexists(artifact_path):
+                continue
+            freed += _disk_usage(artifact_path)[1]
+            if os.path.isdir(artifact_path) and not os.path.islink(artifact_path):
+                shutil.rmtree(artifact_path, ignore_errors=True)
+            else:
+                os.remove(artifact_path)
+        del self._artifacts[path]
+        self.reclaimed_bytes += freed
+        return freed
+
+    def collect(self) -> int:
+        """
+        Deletes every rejected artifact and, while the disk usage is over the budget, the oldest intermediate ones
+
+        Returns
+        -------
+        The number of bytes freed
+        """
+        freed = 0
+        for path in self.artifacts("rejected"):
+            freed += self.delete(path)
+        if self.disk_budget is not None:
+            intermediates = self.artifacts("intermediate")
+            usage = self.usage()
+            while intermediates and usage > self.disk_budget:
+                freed += self.delete(intermediates.pop(0))
+                usage = self.usage()
+        if self.verbose and freed > 0:
+            print(
+                "Workspace: reclaimed {0:0.3f} GB ({1:0.3f} GB in total) - {2:0.3f} GB in use".
+                format(freed / 1e9, self.reclaimed_bytes / 1e9,
+                       self.usage() / 1e9)
+            )
+        return freed
+
+    def report(self) -> dict:
+        """
+        Returns a dictionary with the reclaimed bytes, the disk usage and the number of artifacts per role
+        """
+        return {
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "usage_bytes": self.usage(),
+            "disk_budget": self.disk_budget,
+            "artifacts": {role: len(self.artifacts(role))
+                          for role in ROLES}
+        }
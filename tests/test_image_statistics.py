@@ -0,0 +1,75 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("astropy")
+casatools = pytest.importorskip("casatools")
+casatasks = pytest.importorskip("casatasks")
+
+from astropy.io import fits  # noqa: E402
+
+from snow.utils import calculate_psnr_fits, calculate_psnr_ms  # noqa: E402
+
+
+def write_casa_image(path, data):
+    ia = casatools.image()
+    ia.fromarray(outfile=str(path), pixels=data, overwrite=True)
+    ia.done()
+    return str(path)
+
+
+@pytest.fixture
+def images(tmp_path):
+    rng = np.random.default_rng(1)
+    residual = rng.normal(0.0, 1.0e-3, (64, 64, 1, 1))
+    restored = residual.copy()
+    # The brightest source is outside the bottom-left box of 16 pixels
+    restored[40, 40, 0, 0] = 1.0
+    restored[8, 8, 0, 0] = 0.5
+    restored_name = write_casa_image(tmp_path / "test.image", restored)
+    residual_name = write_casa_image(tmp_path / "test.residual", residual)
+    return restored_name, residual_name
+
+
+@pytest.mark.parametrize("pixels", [None, 16])
+@pytest.mark.parametrize("chunk_pixels", [2**24, 100])
+def test_calculate_psnr_ms_matches_imstat(images, pixels, chunk_pixels):
+    restored, residual = images
+    box = "" if pixels is None else "0,0,{0},{0}".format(pixels - 1)
+
+    psnr, peak, stdv = calculate_psnr_ms(restored, residual, pixels, chunk_pixels=chunk_pixels)
+
+    imstat_peak = casatasks.imstat(restored, box=box)["max"][0]
+    imstat_rms = casatasks.imstat(residual, box=box)["rms"][0]
+    assert peak == pytest.approx(imstat_peak, rel=1e-6)
+    assert stdv == pytest.approx(imstat_rms, rel=1e-5)
+    assert psnr == pytest.approx(imstat_peak / imstat_rms, rel=1e-5)
+    assert peak == pytest.approx(1.0 if pixels is None else 0.5, rel=1e-6)
+
+
+@pytest.mark.parametrize("pixels", [None, 16])
+@pytest.mark.parametrize("chunk_pixels", [2**24, 100])
+def test_calculate_psnr_fits_scaled(tmp_path, pixels, chunk_pixels):
+    rng = np.random.default_rng(1)
+    data = rng.normal(0.0, 1.0e-3, (1, 1, 64, 64)).astype(np.float32)
+    data[0, 0, 40, 40] = 1.0
+    data[0, 0, 8, 8] = 0.5
+    hdu = fits.PrimaryHDU(data)
+    hdu.scale("int16", option="minmax")
+    hdu.writeto(tmp_path / "scaled.fits")
+    # The reference holds the same quantized values without scaling
+    unscaled = fits.getdata(tmp_path / "scaled.fits").astype(np.float32)
+    fits.PrimaryHDU(unscaled).writeto(tmp_path / "unscaled.fits")
+    scaled_name = str(tmp_path / "scaled.fits")
+    unscaled_name = str(tmp_path / "unscaled.fits")
+
+    psnr, peak, stdv = calculate_psnr_fits(
+        scaled_name, scaled_name, pixels, chunk_pixels=chunk_pixels
+    )
+    expected_psnr, expected_peak, expected_stdv = calculate_psnr_fits(
+        unscaled_name, unscaled_name, pixels, chunk_pixels=chunk_pixels
+    )
+    assert fits.getheader(scaled_name)["BITPIX"] == 16
+    assert peak == pytest.approx(expected_peak, rel=1e-6)
+    assert stdv == pytest.approx(expected_stdv, rel=1e-5)
+    assert psnr == pytest.approx(expected_psnr, rel=1e-5)
+    assert peak == pytest.approx(1.0 if pixels is None else 0.5, rel=1e-3)
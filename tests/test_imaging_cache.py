@@ -0,0 +1,122 @@
+import os
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("astropy")
+casatools = pytest.importorskip("casatools")
+
+from snow.imaging.imager import Imager  # noqa: E402
+from snow.utils import metadata, open_table  # noqa: E402
+
+NROWS = 8
+SHAPE = (2, 4)
+
+
+def column_description(value_type, ndim=0):
+    return {
+        "comment": "",
+        "dataManagerGroup": "StandardStMan",
+        "dataManagerType": "StandardStMan",
+        "keywords": {},
+        "maxlen": 0,
+        "ndim": ndim,
+        "option": 0,
+        "valueType": value_type
+    }
+
+
+def write_ms(path):
+    mytb = casatools.table()
+    mytb.create(
+        tablename=str(path),
+        tabledesc={
+            "DATA": column_description("complex", 2),
+            "DATA_DESC_ID": column_description("int")
+        }
+    )
+    mytb.addrows(NROWS)
+    data = np.random.default_rng(0).normal(size=SHAPE + (NROWS, )).astype(np.complex64)
+    mytb.putcol("DATA", data)
+    mytb.putcol("DATA_DESC_ID", np.zeros(NROWS, dtype=np.int32))
+    mytb.close()
+    mytb.done()
+    return str(path)
+
+
+class CountingImager(Imager):
+    """
+    Imager that writes a product and a model column and counts how many times it has imaged
+    """
+
+    def run(self, imagename=""):
+        self.runs = getattr(self, "runs", 0) + 1
+        with open(imagename + ".image", "w") as f:
+            f.write("image")
+        if "MODEL_DATA" in metadata.colnames(self.inputvis):
+            with open_table(self.inputvis, nomodify=False) as mytb:
+                mytb.putcol("MODEL_DATA", np.full(SHAPE + (NROWS, ), 2.0, dtype=np.complex64))
+        self.psnr, self.peak, self.stdv = 10.0, 1.0, 0.1
+
+
+@pytest.fixture
+def imager(tmp_path):
+    imager = CountingImager(cache_dir=str(tmp_path / "cache"), verbose=False)
+    # The measurement set is created after the imager, so the number of antennas is not read
+    imager.inputvis = write_ms(tmp_path / "input.ms")
+    with open_table(imager.inputvis, nomodify=False) as mytb:
+        description = mytb.getcoldesc("DATA")
+        # The model has its own storage manager, as in a measurement set written by CASA
+        mytb.addcols(
+            {"MODEL_DATA": description}, {
+                "TYPE": "StandardStMan",
+                "NAME": "ModelStandard",
+                "SPEC": {}
+            }
+        )
+    return imager
+
+
+def test_second_identical_run_skips_imaging(tmp_path, imager):
+    imager.run_cached(str(tmp_path / "first"))
+    imager.psnr = 0.0
+    os.remove(str(tmp_path / "first.image"))
+    imager.run_cached(str(tmp_path / "first"))
+
+    assert imager.runs == 1
+    assert imager.psnr == pytest.approx(10.0)
+    assert os.path.exists(str(tmp_path / "first.image"))
+
+
+def test_cache_is_keyed_on_content(tmp_path, imager):
+    imager.run_cached(str(tmp_path / "first"))
+
+    # A copy with new modification times and the same data is a cache hit
+    copy = str(tmp_path / "copy.ms")
+    shutil.copytree(imager.inputvis, copy)
+    for root, _, files in os.walk(copy):
+        for file_name in files:
+            os.utime(os.path.join(root, file_name), ns=(0, 0))
+    imager.inputvis = copy
+    imager.run_cached(str(tmp_path / "second"))
+    assert imager.runs == 1
+
+    # New data is a cache miss
+    with open_table(copy, nomodify=False) as mytb:
+        mytb.putcol("DATA", np.zeros(SHAPE + (NROWS, ), dtype=np.complex64))
+    imager.run_cached(str(tmp_path / "third"))
+    assert imager.runs == 2
+
+
+def test_load_creates_model_column(tmp_path, imager):
+    imager.run_cached(str(tmp_path / "first"))
+    with open_table(imager.inputvis, nomodify=False) as mytb:
+        mytb.removecols("MODEL_DATA")
+    metadata.invalidate(imager.inputvis)
+
+    imager.run_cached(str(tmp_path / "second"))
+
+    assert imager.runs == 1
+    with open_table(imager.inputvis) as mytb:
+        assert np.allclose(mytb.getcol("MODEL_DATA"), 2.0)
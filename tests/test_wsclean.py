@@ -0,0 +1,193 @@
+import json
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("astropy")
+pytest.importorskip("casatools")
+
+import snow.imaging.wsclean as wsclean_module  # noqa: E402
+from snow.imaging import WSClean  # noqa: E402
+
+# Fake wsclean that logs its arguments and writes the products that are not reused
+FAKE_WSCLEAN = """
+    import json
+    import os
+    import sys
+
+    import numpy as np
+    from astropy.io import fits
+
+    args = sys.argv[1:]
+    with open(os.environ["FAKE_WSCLEAN_LOG"], "a") as f:
+        f.write(json.dumps(args) + "\\n")
+    exit_code = int(os.environ.get("FAKE_WSCLEAN_EXIT", "0"))
+    if exit_code != 0:
+        sys.exit(exit_code)
+
+    name = args[args.index("-name") + 1]
+    size = int(args[args.index("-size") + 1])
+    noise = np.random.default_rng(0).normal(0.0, 1.0e-3, (1, 1, size, size))
+    image = noise.copy()
+    image[0, 0, size // 2, size // 2] = 1.0
+    products = {"image": image, "residual": noise}
+    if "-reuse-psf" not in args:
+        products["psf"] = image
+    if "-reuse-dirty" not in args:
+        products["dirty"] = image
+    for product, data in products.items():
+        fits.PrimaryHDU(data.astype(np.float32)).writeto(name + "-" + product + ".fits", overwrite=True)
+"""
+
+
+@pytest.fixture
+def fake_wsclean(tmp_path, monkeypatch):
+    bin_directory = tmp_path / "bin"
+    bin_directory.mkdir()
+    executable = bin_directory / "wsclean"
+    executable.write_text("#!" + sys.executable + "\n" + textwrap.dedent(FAKE_WSCLEAN))
+    executable.chmod(executable.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "wsclean.log"
+    monkeypatch.setenv("PATH", str(bin_directory) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_WSCLEAN_LOG", str(log))
+    monkeypatch.setattr(wsclean_module, "is_multims", lambda ms_name: False)
+    monkeypatch.setattr(wsclean_module, "uv_coverage_signature", lambda ms_name: ("uv", None))
+    monkeypatch.setattr(wsclean_module, "fingerprint_ms", lambda ms_name: "ms")
+
+    def calls():
+        if not log.exists():
+            return []
+        return [json.loads(line) for line in log.read_text().splitlines()]
+
+    return calls
+
+
+def make_imager(tmp_path, **kwargs):
+    parameters = dict(cell="0.1arcsec", M=16, N=16, niter=10, verbose=False)
+    parameters.update(kwargs)
+    imager = WSClean(**parameters)
+    # The measurement set is only passed through to wsclean
+    imager.inputvis = str(tmp_path / "input.ms")
+    return imager
+
+
+def test_build_args(tmp_path):
+    imager = make_imager(
+        tmp_path,
+        weighting="briggs",
+        robust=0.5,
+        spw="0, 1",
+        threads=4,
+        threshold=1.0e-4,
+        save_model=False,
+        extra_args=["-multiscale"]
+    )
+    args = imager._build_args(str(tmp_path / "img"), reuse_psf="previous")
+
+    assert args[:6] == ["wsclean", "-name", str(tmp_path / "img"), "-size", "16", "16"]
+    assert args[args.index("-scale") + 1] == "0.1asec"
+    assert args[args.index("-weight") + 1:args.index("-weight") + 3] == ["briggs", "0.5"]
+    assert args[args.index("-niter") + 1] == "10"
+    assert args[args.index("-threshold") + 1] == "0.0001"
+    assert args[args.index("-data-column") + 1] == "CORRECTED_DATA"
+    assert args[args.index("-spws") + 1] == "0,1"
+    assert args[args.index("-j") + 1] == "4"
+    assert args[args.index("-reuse-psf") + 1] == "previous"
+    assert "-reuse-dirty" not in args
+    assert "-no-update-model-required" in args
+    assert "-quiet" in args
+    assert args[-2:] == ["-multiscale", imager.inputvis]
+
+
+def test_build_args_natural_weighting(tmp_path):
+    imager = make_imager(tmp_path, weighting="natural", data_column="data")
+    args = imager._build_args(str(tmp_path / "img"))
+
+    assert args[args.index("-weight") + 1] == "natural"
+    assert args[args.index("-data-column") + 1] == "DATA"
+    assert "-no-update-model-required" not in args
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{
+        "weighting": "briggsbwtaper"
+    }, {
+        "spw": "0:10~20"
+    }, {
+        "data_column": "model"
+    }, {
+        "threads": 0
+    }]
+)
+def test_invalid_parameters(kwargs):
+    with pytest.raises(ValueError):
+        WSClean(**kwargs)
+
+
+def test_run_nonzero_exit(tmp_path, fake_wsclean, monkeypatch):
+    monkeypatch.setenv("FAKE_WSCLEAN_EXIT", "3")
+    imager = make_imager(tmp_path)
+
+    with pytest.raises(RuntimeError, match="exit code 3"):
+        imager.run(str(tmp_path / "img"))
+    assert len(fake_wsclean()) == 1
+
+
+def test_run_statistics(tmp_path, fake_wsclean):
+    imager = make_imager(tmp_path)
+    imager.run(str(tmp_path / "img"))
+
+    assert imager.peak == pytest.approx(1.0)
+    assert imager.stdv > 0.0
+    assert imager.psnr == pytest.approx(imager.peak / imager.stdv)
+
+
+def test_run_reuses_products(tmp_path, fake_wsclean):
+    imager = make_imager(tmp_path, reuse_psf=True, reuse_dirty=True)
+    first = str(tmp_path / "first")
+    second = str(tmp_path / "second")
+    imager.run(first)
+    imager.run(second)
+
+    first_args, second_args = fake_wsclean()
+    assert "-reuse-psf" not in first_args and "-reuse-dirty" not in first_args
+    assert second_args[second_args.index("-reuse-psf") + 1] == first
+    assert second_args[second_args.index("-reuse-dirty") + 1] == first
+    # The reused products are copied next to the products of the latest run
+    assert os.path.exists(second + "-psf.fits")
+    assert os.path.exists(second + "-dirty.fits")
+
+
+def test_run_does_not_reuse_after_changes(tmp_path, fake_wsclean, monkeypatch):
+    imager = make_imager(tmp_path, reuse_psf=True, reuse_dirty=True)
+    imager.run(str(tmp_path / "first"))
+
+    # New flags change the uv coverage and the visibilities
+    monkeypatch.setattr(wsclean_module, "uv_coverage_signature", lambda ms_name: ("new uv", None))
+    monkeypatch.setattr(wsclean_module, "fingerprint_ms", lambda ms_name: "new ms")
+    imager.run(str(tmp_path / "second"))
+    # A different robust parameter changes the PSF
+    imager.robust = 0.0
+    imager.run(str(tmp_path / "third"))
+
+    for args in fake_wsclean()[1:]:
+        assert "-reuse-psf" not in args
+        assert "-reuse-dirty" not in args
+
+
+def test_run_reuses_psf_only(tmp_path, fake_wsclean, monkeypatch):
+    imager = make_imager(tmp_path, reuse_psf=True, reuse_dirty=True)
+    imager.run(str(tmp_path / "first"))
+
+    # A new model changes the visibilities but not the uv coverage
+    monkeypatch.setattr(wsclean_module, "fingerprint_ms", lambda ms_name: "new ms")
+    imager.run(str(tmp_path / "second"))
+
+    second_args = fake_wsclean()[1]
+    assert second_args[second_args.index("-reuse-psf") + 1] == str(tmp_path / "first")
+    assert "-reuse-dirty" not in second_args